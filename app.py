@@ -5,13 +5,99 @@ import pandas as pd
 from portfolio_management.data.data_loader import DataLoader
 from portfolio_management.portfolio.portfolio import Portfolio
 from portfolio_management.portfolio.optimizer import PortfolioOptimizer
-from portfolio_management.monte_carlo.simulation import MonteCarloSimulation
+from portfolio_management.monte_carlo.jobs import JobRunner, SimulationJob
+from portfolio_management.monte_carlo.simulation import project_scenarios
+from portfolio_management.utils.instrumentation import Instrumentation
 from portfolio_management.utils.helpers import (
     plot_interactive_simulation_results,
     get_simulation_insights,
     display_optimal_weights
 )
 
+# Simulations running at once across all sessions; more are queued
+JOB_WORKERS = 2
+# Seconds between progress updates of a running simulation
+PROGRESS_INTERVAL = 0.5
+# A job whose page has not polled it for this long is cancelled
+ABANDON_AFTER = 30
+# Finished scenario tensors kept for reuse across all sessions
+MAX_SCENARIO_JOBS = 2
+# Upper bound on one float32 scenario tensor, paths x days x assets
+MAX_SCENARIO_VALUES = 500_000_000
+
+# Bounded caches shared across reruns: every widget interaction re-executes
+# the script, so anything keyed only by the data inputs is reused as long as
+# those inputs are unchanged. They are filled from the job worker, which
+# reports its own progress, hence no spinners.
+@st.cache_data(max_entries=16, show_spinner=False)
+def load_prices(tickers, start_date, end_date):
+    data_loader = DataLoader()
+    stock_data = data_loader.load_data(list(tickers), start_date, end_date)
+    return stock_data, data_loader.last_report.failed
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def load_return_statistics(tickers, start_date, end_date):
+    stock_data, _ = load_prices(tickers, start_date, end_date)
+    portfolio = Portfolio(stock_data)
+    portfolio.calculate_returns()
+    # Daily returns and their statistics for the simulation, annualized
+    # statistics for the optimizer
+    return (portfolio.returns, portfolio.statistics) + portfolio.statistics.annualized()
+
+
+@st.cache_resource
+def job_runner():
+    # One pool for every session of the deployment, which also keeps the
+    # scenarios of the most recent runs for reuse
+    return JobRunner(max_workers=JOB_WORKERS, max_jobs=MAX_SCENARIO_JOBS)
+
+
+def load_returns(data_key):
+    stock_data, _ = load_prices(*data_key)
+    if stock_data.empty:
+        raise ValueError('Failed to load stock data. Please check the tickers and date range.')
+    returns, statistics, _, _ = load_return_statistics(*data_key)
+    return returns, statistics
+
+
+def format_seconds(seconds):
+    if seconds is None:
+        return 'estimating...'
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    return f'{minutes}m {seconds:02d}s' if minutes else f'{seconds}s'
+
+
+def show_insights(final_portfolio_values, initial_investment):
+    for key, value in get_simulation_insights(final_portfolio_values, initial_investment).items():
+        st.write(f"**{key}:** {value}")
+
+
+@st.fragment(run_every=PROGRESS_INTERVAL)
+def job_progress(job, weights, initial_investment):
+    # Reruns on its own every PROGRESS_INTERVAL seconds while the rest of
+    # the page stays as it is, and reruns the whole page once the job
+    # leaves the state it was rendered in
+    job.touch()
+    if job.state != st.session_state.get('rendered_job_state'):
+        st.rerun()
+    if job.state == 'queued':
+        st.info('Waiting for a free simulation worker...')
+    elif job.state == 'loading':
+        st.info('Loading prices...')
+    else:
+        st.progress(job.progress, text=(
+            f'{job.paths_done:,} of {job.num_simulations:,} paths simulated, '
+            f'about {format_seconds(job.eta)} left'
+        ))
+    if st.button('Cancel Simulation'):
+        job.cancel()
+    if weights is not None and job.paths_done:
+        st.subheader(f'Interim Insights ({job.paths_done:,} paths):')
+        final_growth = job.completed_growth()[-1]
+        show_insights(project_scenarios(final_growth, weights, initial_investment), initial_investment)
+
+
 def main():
     st.title('Portfolio Management with Monte Carlo Simulation')
 
@@ -153,66 +239,134 @@ def main():
             step=1,
             help='Investment period in days (e.g., 252 for one year).'
         )
+    seed = st.number_input(
+        'Random Seed:',
+        value=0,
+        min_value=0,
+        step=1,
+        help='Seed for the random scenarios. Keeping it fixed reuses the same scenarios when only the weights change.'
+    )
 
-    # Button to Run Simulation
-    run_simulation = st.button('Run Monte Carlo Simulation')
-    if run_simulation:
-        # Load data
-        data_loader = DataLoader()
-        stock_data = data_loader.load_data(tickers, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
+    show_performance = st.sidebar.checkbox(
+        'Show performance panel',
+        value=False,
+        help='Time each stage of the run and show wall time, CPU time and peak memory.'
+    )
+    instrumentation = Instrumentation(enabled=show_performance)
 
-        if stock_data.empty:
-            st.error('Failed to load stock data. Please check the tickers and date range.')
+    # Data loading and the simulation run as a background job, so the page
+    # stays responsive and can show progress, interim results and a cancel
+    # button. Jobs live in the shared runner, keyed by their inputs: running
+    # the same inputs again, from any session, reuses the job and its
+    # scenarios. The session only remembers the key of its last run. Jobs
+    # simulate per-asset scenarios and the weights are applied afterwards,
+    # so editing them re-projects the same scenarios.
+    data_key = (tuple(tickers), start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
+    run_key = (data_key, int(time_horizon), int(num_simulations), int(seed))
+    if st.button('Run Monte Carlo Simulation'):
+        scenario_values = int(num_simulations) * int(time_horizon) * len(tickers)
+        if scenario_values > MAX_SCENARIO_VALUES:
+            st.error(f'{scenario_values:,} simulated values (paths x days x stocks) is over the limit of '
+                     f'{MAX_SCENARIO_VALUES:,}. Reduce the number of simulations or the time horizon.')
             return
+        previous_key = st.session_state.get('run_key')
+        previous_job = job_runner().get(previous_key)
+        if previous_key != run_key and previous_job is not None:
+            previous_job.cancel()
+        st.session_state['run_key'] = run_key
+        job_runner().start(run_key, lambda: SimulationJob(
+            lambda: load_returns(data_key), int(num_simulations), int(time_horizon), seed=int(seed),
+            abandon_after=ABANDON_AFTER, key=run_key
+        ))
+
+    if 'run_key' not in st.session_state:
+        return
+    job = job_runner().get(st.session_state['run_key'])
+    if job is None:
+        st.info('The scenarios of the last run were dropped to free memory. '
+                'Click "Run Monte Carlo Simulation" to simulate them again.')
+        return
+    job.touch()
+    st.session_state['rendered_job_state'] = job.state
+    if job.key != run_key:
+        st.info('The inputs changed since the last run. Click "Run Monte Carlo Simulation" to simulate them.')
+        return
+    if job.state == 'failed':
+        st.error(str(job.error))
+        return
+    if job.state in ('queued', 'loading') or (job.state == 'cancelled' and job.returns is None):
+        if job.state == 'cancelled':
+            st.warning('Simulation cancelled.')
+        else:
+            job_progress(job, None, initial_investment)
+        return
+
+    _, failed_tickers = load_prices(*data_key)
+    if failed_tickers:
+        st.warning(f"Could not load data for: {', '.join(failed_tickers)}")
+
+    # Daily returns plus annualized returns and covariance
+    with instrumentation.span('calculate_returns'):
+        returns, _, expected_returns, covariance_matrix = load_return_statistics(*data_key)
 
-        # Create portfolio
-        portfolio = Portfolio(stock_data)
-        portfolio.calculate_returns()
-
-        # Annualize returns and covariance
-        expected_returns = portfolio.returns.mean() * 252
-        covariance_matrix = portfolio.returns.cov() * 252
-
-        # Determine weights
-        if investment_option == 'Use Weights and Initial Investment':
-            if optimize:
-                optimizer = PortfolioOptimizer(
-                    expected_returns,
-                    covariance_matrix,
-                    risk_free_rate=risk_free_rate
-                )
+    # Determine weights
+    if investment_option == 'Use Weights and Initial Investment':
+        if optimize:
+            optimizer = PortfolioOptimizer(
+                expected_returns,
+                covariance_matrix,
+                risk_free_rate=risk_free_rate
+            )
+            with instrumentation.span('optimize', balanced=balanced) as span:
                 if balanced:
                     weights = optimizer.minimize_volatility(target_return=expected_returns.mean())
-                    st.subheader('Optimal Balanced Portfolio Weights:')
                 else:
                     weights = optimizer.maximize_sharpe_ratio()
-                    st.subheader('Optimal Portfolio Weights to Maximize Sharpe Ratio:')
-                display_optimal_weights(tickers, weights, streamlit_display=True)
+                span.set(iterations=optimizer.last_iterations)
+            if balanced:
+                st.subheader('Optimal Balanced Portfolio Weights:')
             else:
-                st.subheader('Using Custom Weights:')
-                display_optimal_weights(tickers, weights, streamlit_display=True)
+                st.subheader('Optimal Portfolio Weights to Maximize Sharpe Ratio:')
+            display_optimal_weights(tickers, weights, streamlit_display=True)
         else:
-            # Weights have been calculated from dollar amounts
-            st.subheader('Calculated Weights from Dollar Amounts:')
+            st.subheader('Using Custom Weights:')
             display_optimal_weights(tickers, weights, streamlit_display=True)
-            st.write(f"**Total Investment Amount:** ${initial_investment:.2f}")
-
-        # Perform Monte Carlo Simulation
-        simulation = MonteCarloSimulation(portfolio.returns, initial_investment, weights)
-        all_cumulative_returns, final_portfolio_values = simulation.run_simulation(
-            int(num_simulations), int(time_horizon)
-        )
+    else:
+        # Weights have been calculated from dollar amounts
+        st.subheader('Calculated Weights from Dollar Amounts:')
+        display_optimal_weights(tickers, weights, streamlit_display=True)
+        st.write(f"**Total Investment Amount:** ${initial_investment:.2f}")
 
-        # Analyze Results
+    if job.state == 'simulating':
         st.header('4. Simulation Results')
-        st.subheader('Monte Carlo Simulation Insights:')
-        insights = get_simulation_insights(final_portfolio_values, initial_investment)
-        for key, value in insights.items():
-            st.write(f"**{key}:** {value}")
-
-        # Plot results
-        st.subheader('Interactive Plots')
-        plot_interactive_simulation_results(all_cumulative_returns, final_portfolio_values, end_date)
+        job_progress(job, weights, initial_investment)
+        return
+    if job.state == 'cancelled':
+        st.warning(f'Simulation cancelled; results cover the {job.paths_done:,} paths completed.')
+        if not job.paths_done:
+            return
+
+    # Project the simulated scenarios onto the weights
+    with instrumentation.span('run_simulation', horizon=int(time_horizon)) as span:
+        all_cumulative_returns = project_scenarios(job.completed_growth(), weights, initial_investment)
+        final_portfolio_values = all_cumulative_returns[-1].copy()
+        span.count(job.paths_done, 'paths')
+
+    # Analyze Results
+    st.header('4. Simulation Results')
+    st.subheader('Monte Carlo Simulation Insights:')
+    with instrumentation.span('get_simulation_insights'):
+        show_insights(final_portfolio_values, initial_investment)
+
+    # Plot results
+    st.subheader('Interactive Plots')
+    with instrumentation.span('plot'):
+        plot_interactive_simulation_results(all_cumulative_returns, final_portfolio_values, end_date, mode='fan')
+
+    if show_performance:
+        st.subheader('Performance')
+        st.dataframe(pd.concat([job.instrumentation.to_frame(), instrumentation.to_frame()], ignore_index=True),
+                     use_container_width=True)
 
 if __name__ == '__main__':
     main()
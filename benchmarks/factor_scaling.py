@@ -0,0 +1,84 @@
+"""Compare the dense and factor-model covariance across universe sizes on synthetic data.
+
+    python -m benchmarks.factor_scaling --assets 100 250 500 1000 2000 --factors 10
+
+For each universe size, times building the covariance (sample covariance and
+its factorization, or a PCA factor model), simulating paths from it, and the
+volatility and gradient evaluations PortfolioOptimizer's SLSQP path makes.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.suite import synthetic_returns
+from portfolio_management.monte_carlo.simulation import MonteCarloSimulation
+from portfolio_management.portfolio.factor_model import FactorModel
+from portfolio_management.portfolio.optimizer import PortfolioOptimizer
+from portfolio_management.utils.linalg import covariance_root
+
+
+def timed(function, repeats=1):
+    seconds = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        value = function()
+        seconds.append(time.perf_counter() - started)
+    return min(seconds), value
+
+
+def run(asset_counts, num_factors, num_simulations, time_horizon, num_observations, max_slsqp_assets):
+    rows = []
+    for num_assets in asset_counts:
+        returns = synthetic_returns(num_observations, num_assets)
+        expected_returns = returns.mean().values * 252
+        weights = np.full(num_assets, 1 / num_assets)
+
+        fit_seconds = {}
+        fit_seconds['dense'], covariance_matrix = timed(lambda: returns.cov())
+        factor_seconds, _ = timed(lambda: covariance_root(covariance_matrix))
+        fit_seconds['dense'] += factor_seconds
+        fit_seconds['factor'], factor_model = timed(lambda: FactorModel.from_pca(returns, num_factors))
+        models = {'dense': None, 'factor': factor_model}
+        annualized = {'dense': covariance_matrix.values * 252, 'factor': factor_model.scaled(252)}
+
+        for name, model in models.items():
+            simulation = MonteCarloSimulation(returns, 1000, factor_model=model)
+            if model is None:
+                simulation._covariance_factor = covariance_root(covariance_matrix)
+            simulate_seconds, _ = timed(lambda: simulation.run_simulation(num_simulations, time_horizon, seed=0))
+
+            covariance = annualized[name]
+            evaluate = (lambda: (PortfolioOptimizer._portfolio_volatility(weights, covariance),
+                                 PortfolioOptimizer._portfolio_volatility_gradient(weights, covariance)))
+            evaluation_seconds, _ = timed(lambda: [evaluate() for _ in range(100)], repeats=3)
+
+            slsqp_seconds = float('nan')
+            if num_assets <= max_slsqp_assets:
+                optimizer = PortfolioOptimizer(expected_returns, covariance)
+                slsqp_seconds, _ = timed(lambda: optimizer.minimize_volatility(None))
+            rows.append((num_assets, name, fit_seconds[name], num_simulations * time_horizon / simulate_seconds,
+                         evaluation_seconds / 100 * 1e6, slsqp_seconds))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--assets', type=int, nargs='+', default=[100, 250, 500, 1000, 2000])
+    parser.add_argument('--factors', type=int, default=10)
+    parser.add_argument('--paths', type=int, default=1000)
+    parser.add_argument('--horizon', type=int, default=252)
+    parser.add_argument('--observations', type=int, default=1260, help='Days of synthetic history.')
+    parser.add_argument('--max-slsqp-assets', type=int, default=500,
+                        help='Skip the SLSQP minimum-variance solve above this many assets.')
+    args = parser.parse_args()
+
+    print(f"{'assets':>7} {'model':<7} {'fit s':>8} {'path-days/s':>12} {'vol+grad us':>12} {'slsqp s':>8}")
+    rows = run(args.assets, args.factors, args.paths, args.horizon, args.observations, args.max_slsqp_assets)
+    for num_assets, model, fit_seconds, throughput, evaluation_us, slsqp_seconds in rows:
+        print(f"{num_assets:>7} {model:<7} {fit_seconds:>8.3f} {throughput:>12.4g} {evaluation_us:>12.1f} "
+              f"{slsqp_seconds:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
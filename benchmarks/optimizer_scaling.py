@@ -0,0 +1,96 @@
+"""Compare PortfolioOptimizer solvers across universe sizes on synthetic data.
+
+    python -m benchmarks.optimizer_scaling --assets 10 50 100 250 500 1000
+"""
+import argparse
+import time
+
+import numpy as np
+from scipy.optimize import minimize
+
+from portfolio_management.portfolio.optimizer import PortfolioOptimizer
+
+
+def synthetic_universe(num_assets, num_observations=1500, seed=0):
+    rng = np.random.default_rng(seed)
+    market = rng.normal(0.0004, 0.01, size=(num_observations, 1))
+    betas = rng.uniform(0.5, 1.5, size=num_assets)
+    daily_returns = market * betas + rng.normal(0.0002, 0.015, size=(num_observations, num_assets))
+    return daily_returns.mean(axis=0) * 252, np.cov(daily_returns.T) * 252
+
+
+def finite_difference_sharpe(optimizer):
+    # The solver as it was before analytic gradients: SLSQP estimates the
+    # Jacobian by finite differences
+    num_assets = len(optimizer.expected_returns)
+    return minimize(
+        optimizer._neg_sharpe_ratio,
+        x0=num_assets * [1.0 / num_assets],
+        args=(optimizer.expected_returns, optimizer.covariance_matrix, optimizer.risk_free_rate),
+        method='SLSQP',
+        bounds=tuple((0, 1) for _ in range(num_assets)),
+        constraints={'type': 'eq', 'fun': lambda weights: np.sum(weights) - 1}
+    ).x
+
+
+def finite_difference_volatility(optimizer, target_return):
+    num_assets = len(optimizer.expected_returns)
+    return minimize(
+        optimizer._portfolio_volatility,
+        x0=num_assets * [1.0 / num_assets],
+        args=(optimizer.covariance_matrix,),
+        method='SLSQP',
+        bounds=tuple((0, 1) for _ in range(num_assets)),
+        constraints=(
+            {'type': 'eq', 'fun': lambda weights: np.sum(weights) - 1},
+            {'type': 'eq', 'fun': lambda weights: np.dot(weights, optimizer.expected_returns) - target_return}
+        )
+    ).x
+
+
+def timed(function):
+    started = time.perf_counter()
+    weights = function()
+    return time.perf_counter() - started, weights
+
+
+def run(asset_counts, max_finite_difference_assets, risk_free_rate=0.02):
+    rows = []
+    for num_assets in asset_counts:
+        expected_returns, covariance_matrix = synthetic_universe(num_assets)
+        optimizer = PortfolioOptimizer(expected_returns, covariance_matrix, risk_free_rate=risk_free_rate)
+        target_return = float(np.median(expected_returns))
+        solvers = {
+            'max_sharpe/slsqp_jac': lambda: optimizer.maximize_sharpe_ratio(),
+            'max_sharpe/qp': lambda: optimizer.maximize_sharpe_ratio(method='qp'),
+            'min_vol/slsqp_jac': lambda: optimizer.minimize_volatility(target_return),
+            'min_vol/qp': lambda: optimizer.minimize_volatility(target_return, method='qp'),
+        }
+        if num_assets <= max_finite_difference_assets:
+            solvers['max_sharpe/slsqp_fd'] = lambda: finite_difference_sharpe(optimizer)
+            solvers['min_vol/slsqp_fd'] = lambda: finite_difference_volatility(optimizer, target_return)
+        for name, solver in sorted(solvers.items()):
+            seconds, weights = timed(solver)
+            objective, method = name.split('/')
+            if objective == 'max_sharpe':
+                value = -optimizer._neg_sharpe_ratio(weights, expected_returns, covariance_matrix, risk_free_rate)
+            else:
+                value = optimizer._portfolio_volatility(weights, covariance_matrix)
+            rows.append((num_assets, objective, method, seconds, value))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--assets', type=int, nargs='+', default=[10, 50, 100, 250, 500, 1000])
+    parser.add_argument('--max-finite-difference-assets', type=int, default=250,
+                        help='Skip the finite-difference baseline above this many assets.')
+    args = parser.parse_args()
+
+    print(f"{'assets':>7} {'objective':<11} {'method':<10} {'seconds':>9} {'value':>10}")
+    for num_assets, objective, method, seconds, value in run(args.assets, args.max_finite_difference_assets):
+        print(f"{num_assets:>7} {objective:<11} {method:<10} {seconds:>9.3f} {value:>10.5f}")
+
+
+if __name__ == '__main__':
+    main()
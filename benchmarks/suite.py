@@ -0,0 +1,231 @@
+"""Offline benchmarks for the simulation, optimization and analytics hot paths.
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --baseline benchmarks/baseline.json
+    python -m benchmarks.suite --save-baseline benchmarks/baseline.json
+
+Every case runs on seeded synthetic data. Wall time is the best of
+--repeats runs; peak memory is traced in one extra run so tracing does not
+skew the timings, inside the child process for cases that run in one.
+Throughput is reported per simulated path-day for every simulation case. Against a baseline, cases are matched by name and
+parameters; a case regresses when it is slower than the baseline by more
+than --tolerance, and the exit status is 1.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.optimizer_scaling import synthetic_universe
+from portfolio_management.monte_carlo.simulation import MonteCarloSimulation
+from portfolio_management.portfolio.backtest import walk_forward
+from portfolio_management.portfolio.optimizer import PortfolioOptimizer
+from portfolio_management.portfolio.portfolio import Portfolio
+from portfolio_management.utils.helpers import (
+    build_fan_chart_figure,
+    build_simulation_figure,
+    get_simulation_insights
+)
+
+SIMULATION_GRID = [(10000, 252, 5), (10000, 252, 50), (100000, 252, 5), (10000, 1260, 5)]
+QUICK_SIMULATION_GRID = [(2000, 252, 5), (2000, 252, 50)]
+BOOTSTRAP_GRID = [(10000, 252, 5), (10000, 252, 50), (2000, 252, 500)]
+QUICK_BOOTSTRAP_GRID = [(2000, 252, 5), (2000, 252, 50)]
+OPTIMIZER_ASSETS = [10, 100, 500]
+QUICK_OPTIMIZER_ASSETS = [10, 100]
+
+
+def synthetic_returns(num_observations, num_assets, seed=0):
+    rng = np.random.default_rng(seed)
+    market = rng.normal(0.0004, 0.01, size=(num_observations, 1))
+    daily_returns = market * rng.uniform(0.5, 1.5, size=num_assets) + rng.normal(0.0002, 0.015, size=(num_observations, num_assets))
+    return pd.DataFrame(daily_returns, columns=[f'ASSET{i}' for i in range(num_assets)])
+
+
+def synthetic_prices(num_observations, num_assets, seed=0):
+    returns = synthetic_returns(num_observations, num_assets, seed)
+    index = pd.bdate_range('2000-01-03', periods=num_observations, name='Date')
+    return pd.DataFrame(100 * np.cumprod(1 + returns.values, axis=0), index=index, columns=returns.columns)
+
+
+def child_peak_memory(code):
+    # tracemalloc in this process cannot see a subprocess's allocations, so
+    # the child traces itself and prints its peak
+    output = subprocess.run(
+        [sys.executable, '-X', 'tracemalloc', '-c',
+         f'{code}\nimport tracemalloc\nprint(tracemalloc.get_traced_memory()[1])'],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return int(output.split()[-1])
+
+
+def measure(function, repeats, peak_memory=None):
+    seconds = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - started)
+    if peak_memory is not None:
+        return min(seconds), peak_memory()
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(seconds), peak
+
+
+def cases(quick=False):
+    # (name, params, function, work items, throughput unit[, peak memory])
+    # Startup of a headless worker: a fresh interpreter importing the CLI,
+    # which pulls in the whole numeric core
+    yield ('import', {'module': 'portfolio_management.main'},
+           lambda: subprocess.run([sys.executable, '-c', 'import portfolio_management.main'], check=True),
+           1, 'imports/s', lambda: child_peak_memory('import portfolio_management.main'))
+
+    for num_simulations, time_horizon, num_assets in (QUICK_SIMULATION_GRID if quick else SIMULATION_GRID):
+        simulation = MonteCarloSimulation(synthetic_returns(1000, num_assets), initial_investment=1000)
+        yield (
+            'run_simulation',
+            {'paths': num_simulations, 'horizon': time_horizon, 'assets': num_assets},
+            lambda simulation=simulation, n=num_simulations, t=time_horizon: simulation.run_simulation(n, t, seed=0),
+            num_simulations * time_horizon,
+            'path-days/s',
+        )
+
+    # The bootstrap against the Gaussian engine, including a universe where
+    # the (assets x assets) product per simulated day dominates
+    for num_simulations, time_horizon, num_assets in (QUICK_BOOTSTRAP_GRID if quick else BOOTSTRAP_GRID):
+        returns = synthetic_returns(1000, num_assets)
+        for sampling in ('plain', 'stationary_bootstrap', 'block_bootstrap'):
+            simulation = MonteCarloSimulation(returns, initial_investment=1000, sampling=sampling)
+            yield (
+                'run_simulation',
+                {'paths': num_simulations, 'horizon': time_horizon, 'assets': num_assets, 'sampling': sampling},
+                lambda simulation=simulation, n=num_simulations, t=time_horizon: simulation.run_simulation(n, t, seed=0),
+                num_simulations * time_horizon,
+                'path-days/s',
+            )
+
+    for num_assets in (QUICK_OPTIMIZER_ASSETS if quick else OPTIMIZER_ASSETS):
+        expected_returns, covariance_matrix = synthetic_universe(num_assets)
+        optimizer = PortfolioOptimizer(expected_returns, covariance_matrix, risk_free_rate=0.02)
+        target_return = float(np.median(expected_returns))
+        for method in ('slsqp', 'qp'):
+            yield ('maximize_sharpe_ratio', {'assets': num_assets, 'method': method},
+                   lambda optimizer=optimizer, method=method: optimizer.maximize_sharpe_ratio(method=method),
+                   1, 'solves/s')
+            yield ('minimize_volatility', {'assets': num_assets, 'method': method},
+                   lambda optimizer=optimizer, method=method, target=target_return:
+                   optimizer.minimize_volatility(target, method=method),
+                   1, 'solves/s')
+
+    num_observations, num_assets = (750, 20) if quick else (2520, 100)
+    returns = synthetic_returns(num_observations, num_assets)
+    for strategy in ('max_sharpe', 'min_volatility'):
+        yield ('walk_forward', {'days': num_observations, 'assets': num_assets, 'strategy': strategy},
+               lambda strategy=strategy: walk_forward(returns, window=252, strategy=strategy, shrinkage=0.1),
+               num_observations - 252, 'rebalances/s')
+
+    num_simulations = 20000 if quick else 200000
+    final_portfolio_values = 1000 * np.exp(np.random.default_rng(0).normal(0.05, 0.2, num_simulations))
+    yield ('get_simulation_insights', {'paths': num_simulations},
+           lambda: get_simulation_insights(final_portfolio_values, 1000), num_simulations, 'paths/s')
+
+    num_observations, num_assets = (1000, 20) if quick else (5000, 200)
+    prices = synthetic_prices(num_observations, num_assets)
+    yield ('calculate_returns', {'days': num_observations, 'assets': num_assets},
+           lambda: Portfolio(prices).calculate_returns(), num_observations * num_assets, 'prices/s')
+
+    num_simulations, time_horizon = (2000, 252) if quick else (10000, 1260)
+    all_cumulative_returns, final_portfolio_values = MonteCarloSimulation(
+        synthetic_returns(1000, 5), initial_investment=1000
+    ).run_simulation(num_simulations, time_horizon, seed=0)
+    for mode, build in (('paths', lambda: build_simulation_figure(all_cumulative_returns, final_portfolio_values, '2024-01-01')),
+                        ('fan', lambda: build_fan_chart_figure(final_portfolio_values, '2024-01-01', all_cumulative_returns))):
+        yield ('simulation_figure', {'paths': num_simulations, 'horizon': time_horizon, 'mode': mode},
+               lambda build=build: build().to_json(), 1, 'figures/s')
+
+
+def case_key(result):
+    params = ','.join(f'{key}={value}' for key, value in sorted(result['params'].items()))
+    return f"{result['name']}[{params}]"
+
+
+def run(quick=False, repeats=3):
+    results = []
+    for name, params, function, work, unit, *peak_memory in cases(quick):
+        seconds, peak = measure(function, repeats, *peak_memory)
+        result = {
+            'name': name,
+            'params': params,
+            'seconds': seconds,
+            'peak_memory_mb': peak / 2 ** 20,
+            'throughput': work / seconds if seconds > 0 else float('inf'),
+            'unit': unit,
+        }
+        print(f"{case_key(result):<60} {seconds:>9.4f}s {result['peak_memory_mb']:>9.1f}MB "
+              f"{result['throughput']:>12.4g} {unit}", flush=True)
+        results.append(result)
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'quick': quick,
+        },
+        'results': results,
+    }
+
+
+def compare(report, baseline, tolerance):
+    baseline_seconds = {case_key(result): result['seconds'] for result in baseline['results']}
+    regressions = []
+    for result in report['results']:
+        key = case_key(result)
+        if key not in baseline_seconds:
+            continue
+        ratio = result['seconds'] / baseline_seconds[key]
+        result['baseline_ratio'] = ratio
+        if ratio > 1 + tolerance:
+            regressions.append((key, ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quick', action='store_true', help='Run the small grid only.')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', help='Write the results as JSON to this file.')
+    parser.add_argument('--baseline', help='Compare against results stored in this JSON file.')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown against the baseline, as a fraction (default 0.25).')
+    parser.add_argument('--save-baseline', help='Store the results as the new baseline in this file.')
+    args = parser.parse_args()
+
+    report = run(quick=args.quick, repeats=args.repeats)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for key, ratio in regressions:
+            print(f"REGRESSION {key}: {ratio:.2f}x baseline")
+        compared = sum('baseline_ratio' in result for result in report['results'])
+        if not regressions:
+            print(f"No regressions beyond {args.tolerance:.0%} of the baseline ({compared} cases compared)")
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import os
+import tempfile
+import pandas as pd
+from typing import Callable, List, Optional, Tuple, Union
+from portfolio_management.data.sources import clean_series, empty_series, to_timestamp
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+Fetch = Callable[[str, pd.Timestamp, pd.Timestamp], pd.Series]
+
+
+class _TickerLock:
+    # Serializes writers of one ticker across threads and processes. Readers do
+    # not lock: files are only ever swapped in whole with os.replace.
+    def __init__(self, path: str):
+        self.path = path
+        self.handle = None
+
+    def __enter__(self):
+        self.handle = open(self.path, 'a+')
+        if fcntl is not None:
+            fcntl.flock(self.handle.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if fcntl is not None:
+            fcntl.flock(self.handle.fileno(), fcntl.LOCK_UN)
+        self.handle.close()
+
+
+def _has_weekdays(start: pd.Timestamp, end: pd.Timestamp) -> bool:
+    return len(pd.bdate_range(start, end - pd.Timedelta(days=1))) > 0
+
+
+class PriceCache:
+    # One Parquet file per ticker holding adjusted closes plus the contiguous
+    # date range [coverage_start, coverage_end) that has already been fetched,
+    # so dates without trading rows are not requested again. A fetch that
+    # returns no rows for a range with weekdays in it may be a failure the
+    # source swallowed, so it is not recorded as covered and is retried on
+    # the next load.
+
+    def __init__(self, directory: str):
+        import pyarrow  # noqa: F401  (fail early if the optional dependency is missing)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, ticker: str, suffix: str = '.parquet') -> str:
+        safe_name = ''.join(c if c.isalnum() or c in '-_.^=' else '_' for c in ticker)
+        return os.path.join(self.directory, safe_name + suffix)
+
+    def read_entry(self, ticker: str) -> Tuple[Optional[pd.Series], Optional[Tuple[pd.Timestamp, pd.Timestamp]]]:
+        import pyarrow.parquet as pq
+        path = self._path(ticker)
+        if not os.path.exists(path):
+            return None, None
+        table = pq.read_table(path)
+        metadata = table.schema.metadata or {}
+        coverage = (
+            pd.Timestamp(metadata[b'coverage_start'].decode()),
+            pd.Timestamp(metadata[b'coverage_end'].decode()),
+        )
+        frame = table.to_pandas()
+        series = pd.Series(frame['adj_close'].to_numpy(), index=pd.DatetimeIndex(frame['date'], name='Date'), name=ticker)
+        return series, coverage
+
+    def _write_entry(self, ticker: str, series: pd.Series, coverage: Tuple[pd.Timestamp, pd.Timestamp]) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.table({'date': pa.array(series.index.values), 'adj_close': pa.array(series.to_numpy(dtype=float))})
+        table = table.replace_schema_metadata({
+            'ticker': ticker,
+            'coverage_start': coverage[0].isoformat(),
+            'coverage_end': coverage[1].isoformat(),
+        })
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(fd)
+        try:
+            pq.write_table(table, temp_path)
+            os.replace(temp_path, self._path(ticker))
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    @staticmethod
+    def missing_ranges(start: pd.Timestamp, end: pd.Timestamp,
+                       coverage: Optional[Tuple[pd.Timestamp, pd.Timestamp]]) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+        if start >= end:
+            return []
+        if coverage is None:
+            return [(start, end)]
+        # Fill up to the existing coverage so it stays one contiguous range
+        ranges = []
+        if start < coverage[0]:
+            ranges.append((start, coverage[0]))
+        if end > coverage[1]:
+            ranges.append((coverage[1], end))
+        return ranges
+
+    @staticmethod
+    def _slice(series: Optional[pd.Series], start: pd.Timestamp, end: pd.Timestamp, ticker: str) -> pd.Series:
+        if series is None:
+            return empty_series(ticker)
+        return series[(series.index >= start) & (series.index < end)]
+
+    def read(self, ticker: str, start_date: Union[str, pd.Timestamp], end_date: Union[str, pd.Timestamp]) -> pd.Series:
+        series, _ = self.read_entry(ticker)
+        return self._slice(series, to_timestamp(start_date), to_timestamp(end_date), ticker)
+
+    def load(self, ticker: str, start_date: Union[str, pd.Timestamp], end_date: Union[str, pd.Timestamp],
+             fetch: Fetch) -> Tuple[pd.Series, List[Tuple[pd.Timestamp, pd.Timestamp]]]:
+        start, end = to_timestamp(start_date), to_timestamp(end_date)
+        # Today's bar may still change, so coverage never extends past it
+        end_covered = min(end, pd.Timestamp.today().normalize())
+        series, coverage = self.read_entry(ticker)
+        if not self.missing_ranges(start, end_covered, coverage):
+            return self._slice(series, start, end, ticker), []
+
+        with _TickerLock(self._path(ticker, '.lock')):
+            series, coverage = self.read_entry(ticker)
+            fetched = self.missing_ranges(start, end_covered, coverage)
+            pieces = [] if series is None else [series]
+            new_coverage = coverage
+            for fetch_start, fetch_end in fetched:
+                piece = clean_series(fetch(ticker, fetch_start, fetch_end), ticker)
+                if piece.empty and _has_weekdays(fetch_start, fetch_end):
+                    continue
+                pieces.append(piece)
+                # Fetched ranges adjoin the coverage, so it stays contiguous
+                new_coverage = ((fetch_start, fetch_end) if new_coverage is None else
+                                (min(new_coverage[0], fetch_start), max(new_coverage[1], fetch_end)))
+            pieces = [piece for piece in pieces if not piece.empty]
+            merged = clean_series(pd.concat(pieces), ticker) if pieces else empty_series(ticker)
+            if new_coverage != coverage:
+                self._write_entry(ticker, merged, new_coverage)
+
+        result = self._slice(merged, start, end, ticker)
+        if end > end_covered:
+            # Served live but not cached
+            live = clean_series(fetch(ticker, end_covered, end), ticker)
+            fetched.append((end_covered, end))
+            if not live.empty:
+                result = clean_series(pd.concat([result, live]), ticker)
+        return result, fetched
@@ -1,19 +1,156 @@
+import logging
+import time
 import pandas as pd
-import yfinance as yf
-from typing import List, Dict, Union
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, List, Dict, Optional, Tuple, Union
+from portfolio_management.data.cache import PriceCache
+from portfolio_management.data.sources import PriceSource, YFinanceSource, empty_series, to_timestamp
+
+logger = logging.getLogger(__name__)
+
+DateRange = Tuple[pd.Timestamp, pd.Timestamp]
+
+
+@dataclass
+class TickerStatus:
+    ticker: str
+    status: str = 'pending'  # 'ok', 'empty' or 'error'
+    rows: int = 0
+    attempts: int = 0
+    from_cache: bool = False
+    fetched_ranges: List[DateRange] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+@dataclass
+class LoadReport:
+    statuses: Dict[str, TickerStatus]
+    seconds: float = 0.0
+
+    @property
+    def loaded(self) -> List[str]:
+        return [ticker for ticker, status in self.statuses.items() if status.status == 'ok']
+
+    @property
+    def failed(self) -> List[str]:
+        return [ticker for ticker, status in self.statuses.items() if status.status != 'ok']
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame([vars(status) for status in self.statuses.values()]).set_index('ticker')
+
 
 class DataLoader:
-    def load_data(self, tickers: List[str], start_date: Union[str, pd.Timestamp], end_date: Union[str, pd.Timestamp]) -> pd.DataFrame:
-        stock_data: Dict[str, pd.Series] = {}
+    def __init__(self, source: Optional[PriceSource] = None, cache: Optional[PriceCache] = None, offline: bool = False,
+                 max_workers: int = 8, retries: int = 3, backoff: float = 0.5):
+        if offline and cache is None:
+            raise ValueError("Offline mode requires a price cache")
+        self.source: PriceSource = source if source is not None else YFinanceSource()
+        self.cache: Optional[PriceCache] = cache
+        self.offline: bool = offline
+        self.max_workers: int = max_workers
+        self.retries: int = retries
+        self.backoff: float = backoff
+        self.last_report: Optional[LoadReport] = None
+
+    def _with_retries(self, call: Callable[[], object], status: Optional[TickerStatus] = None) -> object:
+        for attempt in range(self.retries + 1):
+            if status is not None:
+                status.attempts += 1
+            try:
+                return call()
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+
+    def _missing_ranges(self, ticker: str, start_date: pd.Timestamp, end_date: pd.Timestamp) -> List[DateRange]:
+        if self.cache is None:
+            return [(start_date, end_date)]
+        _, coverage = self.cache.read_entry(ticker)
+        end_covered = min(end_date, pd.Timestamp.today().normalize())
+        return self.cache.missing_ranges(start_date, end_covered, coverage)
+
+    def _prefetch(self, executor: ThreadPoolExecutor, tickers: List[str], start_date: pd.Timestamp,
+                  end_date: pd.Timestamp) -> Dict[Tuple[str, pd.Timestamp, pd.Timestamp], pd.Series]:
+        # Group tickers that need the same date range into multi-symbol requests
+        groups: Dict[DateRange, List[str]] = {}
         for ticker in tickers:
+            for date_range in self._missing_ranges(ticker, start_date, end_date):
+                groups.setdefault(date_range, []).append(ticker)
+
+        batches = [
+            (group[i:i + self.source.batch_size], date_range)
+            for date_range, group in groups.items()
+            for i in range(0, len(group), self.source.batch_size)
+        ]
+
+        def fetch_batch(batch: List[str], date_range: DateRange) -> Dict[str, pd.Series]:
             try:
-                data: pd.DataFrame = yf.download(ticker, start=start_date, end=end_date, progress=False)
-                if not data.empty:
-                    stock_data[ticker] = data['Adj Close']
-                else:
-                    print(f"No data found for {ticker}")
+                return self._with_retries(lambda: self.source.fetch_many(batch, *date_range))
             except Exception as e:
-                print(f"Error loading data for {ticker}: {e}")
+                # The tickers fall back to individual requests
+                logger.warning("Batch request for %s failed: %s", ','.join(batch), e)
+                return {}
+
+        prefetched = {}
+        futures = [(executor.submit(fetch_batch, batch, date_range), date_range) for batch, date_range in batches]
+        for future, (range_start, range_end) in futures:
+            for ticker, series in future.result().items():
+                prefetched[(ticker, range_start, range_end)] = series
+        return prefetched
+
+    def _load_ticker(self, ticker: str, start_date: pd.Timestamp, end_date: pd.Timestamp,
+                     prefetched: Dict[Tuple[str, pd.Timestamp, pd.Timestamp], pd.Series]) -> Tuple[TickerStatus, pd.Series]:
+        status = TickerStatus(ticker=ticker)
+
+        def fetch(fetch_ticker: str, fetch_start: pd.Timestamp, fetch_end: pd.Timestamp) -> pd.Series:
+            status.fetched_ranges.append((fetch_start, fetch_end))
+            series = prefetched.get((fetch_ticker, fetch_start, fetch_end))
+            if series is not None:
+                return series
+            return self._with_retries(lambda: self.source.fetch(fetch_ticker, fetch_start, fetch_end), status)
+
+        try:
+            if self.offline:
+                series = self.cache.read(ticker, start_date, end_date)
+            elif self.cache is not None:
+                series, _ = self.cache.load(ticker, start_date, end_date, fetch)
+            else:
+                series = fetch(ticker, start_date, end_date)
+            status.from_cache = self.cache is not None and not status.fetched_ranges
+            status.rows = len(series)
+            status.status = 'ok' if not series.empty else 'empty'
+        except Exception as e:
+            series = empty_series(ticker)
+            status.status = 'error'
+            status.error = f"{type(e).__name__}: {e}"
+        return status, series
+
+    def load_data(self, tickers: List[str], start_date: Union[str, pd.Timestamp], end_date: Union[str, pd.Timestamp]) -> pd.DataFrame:
+        started = time.perf_counter()
+        start_date, end_date = to_timestamp(start_date), to_timestamp(end_date)
+        tickers = list(dict.fromkeys(tickers))
+
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+            prefetched = {}
+            if self.source.supports_batch and not self.offline:
+                prefetched = self._prefetch(executor, tickers, start_date, end_date)
+            results = list(executor.map(lambda ticker: self._load_ticker(ticker, start_date, end_date, prefetched), tickers))
+
+        stock_data: Dict[str, pd.Series] = {}
+        for status, series in results:
+            if status.status == 'ok':
+                stock_data[status.ticker] = series
+            elif status.status == 'empty':
+                logger.warning("No data found for %s", status.ticker)
+            else:
+                logger.warning("Error loading data for %s: %s", status.ticker, status.error)
+
+        self.last_report = LoadReport(
+            statuses={status.ticker: status for status, _ in results},
+            seconds=time.perf_counter() - started,
+        )
         return pd.DataFrame(stock_data)
 
 if __name__ == "__main__":
@@ -22,4 +159,5 @@ if __name__ == "__main__":
     start_date: str = '2020-01-01'
     end_date: str = '2023-01-01'
     stock_data: pd.DataFrame = data_loader.load_data(tickers, start_date, end_date)
-    print(stock_data.head())
\ No newline at end of file
+    print(stock_data.head())
+    print(data_loader.last_report.to_frame())
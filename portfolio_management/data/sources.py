@@ -0,0 +1,150 @@
+import os
+import threading
+import pandas as pd
+from typing import Dict, List, Sequence, Union
+
+
+def to_timestamp(date: Union[str, pd.Timestamp]) -> pd.Timestamp:
+    return pd.Timestamp(date).tz_localize(None).normalize()
+
+
+def clean_series(series: pd.Series, ticker: str) -> pd.Series:
+    series = series.dropna().astype(float)
+    index = pd.DatetimeIndex(series.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    series.index = pd.DatetimeIndex(index.normalize().values, name='Date')
+    return series[~series.index.duplicated(keep='last')].sort_index().rename(ticker)
+
+
+def empty_series(ticker: str) -> pd.Series:
+    return pd.Series(dtype=float, name=ticker, index=pd.DatetimeIndex([], name='Date'))
+
+
+class PriceSource:
+    # Sources that can serve several tickers in one request set supports_batch
+    # and override fetch_many; batch_size caps the symbols per request.
+    supports_batch: bool = False
+    batch_size: int = 1
+
+    # Adjusted closes for a ticker over [start_date, end_date), indexed by date
+    def fetch(self, ticker: str, start_date: pd.Timestamp, end_date: pd.Timestamp) -> pd.Series:
+        raise NotImplementedError
+
+    def fetch_many(self, tickers: Sequence[str], start_date: pd.Timestamp, end_date: pd.Timestamp) -> Dict[str, pd.Series]:
+        return {ticker: self.fetch(ticker, start_date, end_date) for ticker in tickers}
+
+
+class YFinanceSource(PriceSource):
+    supports_batch = True
+
+    # yf.download keeps module-level state, so concurrent calls can mix up
+    # results; batch downloads are serialized (yfinance threads them itself)
+    # while single-symbol fetches go through Ticker.history, which is safe.
+    # yfinance itself is imported on the first fetch, so loaders that only
+    # read the cache or other sources never pay for it.
+    #
+    # yfinance logs failed requests and returns an empty frame instead of
+    # raising. Single fetches make it raise (raise_errors=True before 1.0,
+    # config.debug.hide_exceptions = False since), so DataLoader retries
+    # them and reports the error. A batch download hides its failures, so
+    # tickers it returned no rows for are left out of the batch result and
+    # the loader fetches them one by one; when 0.2.x records every ticker
+    # as failed in yf.shared._ERRORS, the batch itself raises.
+    _download_lock = threading.Lock()
+
+    def __init__(self, batch_size: int = 50):
+        self.batch_size = batch_size
+
+    @staticmethod
+    def _raising_history_options(yf) -> dict:
+        debug = getattr(getattr(yf, 'config', None), 'debug', None)
+        if debug is None:
+            return {'raise_errors': True}
+        debug.hide_exceptions = False
+        return {}
+
+    def fetch(self, ticker: str, start_date: pd.Timestamp, end_date: pd.Timestamp) -> pd.Series:
+        import yfinance as yf
+        data: pd.DataFrame = yf.Ticker(ticker).history(start=start_date, end=end_date, auto_adjust=False,
+                                                       **self._raising_history_options(yf))
+        if data.empty or 'Adj Close' not in data:
+            return empty_series(ticker)
+        return clean_series(data['Adj Close'], ticker)
+
+    def fetch_many(self, tickers: Sequence[str], start_date: pd.Timestamp, end_date: pd.Timestamp) -> Dict[str, pd.Series]:
+        import yfinance as yf
+        with self._download_lock:
+            data: pd.DataFrame = yf.download(list(tickers), start=start_date, end=end_date, progress=False, auto_adjust=False)
+            errors = dict(getattr(getattr(yf, 'shared', None), '_ERRORS', None) or {})
+        errors = {ticker.upper(): error for ticker, error in errors.items()}
+        if all(ticker.upper() in errors for ticker in tickers):
+            raise ConnectionError(f"Download failed for {','.join(tickers)}: {next(iter(errors.values()))}")
+        if data.empty:
+            return {}
+        adj_close = data['Adj Close']
+        if isinstance(adj_close, pd.Series):
+            adj_close = adj_close.to_frame(tickers[0])
+        series = {ticker: clean_series(adj_close[ticker], ticker) for ticker in tickers if ticker in adj_close}
+        return {ticker: prices for ticker, prices in series.items() if not prices.empty}
+
+
+class DirectorySource(PriceSource):
+    # Reads <directory>/<ticker>.csv or .parquet files indexed by date, using
+    # the 'Adj Close' column when present and the first column otherwise
+    def __init__(self, directory: str, file_format: str = 'csv'):
+        if file_format not in ('csv', 'parquet'):
+            raise ValueError(f"Unsupported file format: {file_format}")
+        self.directory = directory
+        self.file_format = file_format
+
+    def _read(self, path: str) -> pd.DataFrame:
+        if self.file_format == 'parquet':
+            return pd.read_parquet(path)
+        return pd.read_csv(path, index_col=0, parse_dates=True)
+
+    def fetch(self, ticker: str, start_date: pd.Timestamp, end_date: pd.Timestamp) -> pd.Series:
+        path = os.path.join(self.directory, f"{ticker}.{self.file_format}")
+        if not os.path.exists(path):
+            return empty_series(ticker)
+        frame = self._read(path)
+        series = frame['Adj Close'] if 'Adj Close' in frame.columns else frame.iloc[:, 0]
+        series = clean_series(series, ticker)
+        return series[(series.index >= to_timestamp(start_date)) & (series.index < to_timestamp(end_date))]
+
+
+class InMemorySource(PriceSource):
+    # Serves fixed price histories; records every request so tests can assert on
+    # them. Tickers listed in `failures` raise on their first N requests, those
+    # in `empty_failures` come back empty, as from a source that swallows errors.
+    def __init__(self, prices: Union[pd.DataFrame, Dict[str, pd.Series]], batch_size: int = 1,
+                 failures: Union[Dict[str, int], None] = None, empty_failures: Union[Dict[str, int], None] = None):
+        self.prices: Dict[str, pd.Series] = {
+            ticker: clean_series(pd.Series(series), ticker) for ticker, series in dict(prices).items()
+        }
+        self.supports_batch = batch_size > 1
+        self.batch_size = batch_size
+        self.failures: Dict[str, int] = dict(failures or {})
+        self.empty_failures: Dict[str, int] = dict(empty_failures or {})
+        self.requests: List[tuple] = []
+        self.batch_requests: List[tuple] = []
+
+    def _serve(self, ticker: str, start_date: pd.Timestamp, end_date: pd.Timestamp) -> pd.Series:
+        if self.failures.get(ticker, 0) > 0:
+            self.failures[ticker] -= 1
+            raise ConnectionError(f"Simulated failure for {ticker}")
+        series = self.prices.get(ticker)
+        if self.empty_failures.get(ticker, 0) > 0:
+            self.empty_failures[ticker] -= 1
+            series = None
+        if series is None:
+            return empty_series(ticker)
+        return series[(series.index >= to_timestamp(start_date)) & (series.index < to_timestamp(end_date))]
+
+    def fetch(self, ticker: str, start_date: pd.Timestamp, end_date: pd.Timestamp) -> pd.Series:
+        self.requests.append((ticker, to_timestamp(start_date), to_timestamp(end_date)))
+        return self._serve(ticker, start_date, end_date)
+
+    def fetch_many(self, tickers: Sequence[str], start_date: pd.Timestamp, end_date: pd.Timestamp) -> Dict[str, pd.Series]:
+        self.batch_requests.append((tuple(tickers), to_timestamp(start_date), to_timestamp(end_date)))
+        return {ticker: self._serve(ticker, start_date, end_date) for ticker in tickers}
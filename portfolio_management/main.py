@@ -1,80 +1,111 @@
+"""Run portfolio configs headless.
+
+    python -m portfolio_management.main config.json
+    python -m portfolio_management.main --batch configs/ --output results.parquet --workers 8
+    python -m portfolio_management.main --batch configs.jsonl --output results.csv
+
+A batch is a directory of JSON configs or a JSONL file with one config per
+line, each shaped like config.json. An interrupted batch resumes from the
+checkpoint next to --output unless --no-resume is given.
+"""
+import argparse
 import json
+import logging
+
+from portfolio_management.data.cache import PriceCache
 from portfolio_management.data.data_loader import DataLoader
-from portfolio_management.portfolio.portfolio import Portfolio
-from portfolio_management.portfolio.optimizer import PortfolioOptimizer
 from portfolio_management.monte_carlo.simulation import MonteCarloSimulation
+from portfolio_management.portfolio.portfolio import Portfolio
+from portfolio_management.runner import CONFIG_DEFAULTS, resolve_weights, run_batch
+from portfolio_management.utils.instrumentation import Instrumentation
 from portfolio_management.utils.helpers import (
-    plot_simulation_results,
-    print_simulation_insights,
+    build_fan_chart_figure,
+    get_simulation_insights,
     display_optimal_weights
 )
 
-def main():
+
+def run_single(config_path, data_loader, plot=None, profile=False):
     # Load configuration
-    with open('config.json', 'r') as f:
-        config = json.load(f)
-
-    # Extract configuration parameters
-    tickers = config.get('tickers', [])
-    start_date = config.get('start_date')
-    end_date = config.get('end_date')
-    initial_investment = config.get('initial_investment', 1000)
-    num_simulations = config.get('num_simulations', 10000)
-    time_horizon = config.get('time_horizon', 252)
-    risk_free_rate = config.get('risk_free_rate', 0.0)
-    custom_weights = config.get('weights')
-    optimization_config = config.get('optimization', {})
-    optimize = optimization_config.get('optimize', False)
-    balanced = optimization_config.get('balanced', True)
+    with open(config_path, 'r') as f:
+        config = {**CONFIG_DEFAULTS, **json.load(f)}
+    instrumentation = Instrumentation(enabled=profile)
 
     # Load data
-    data_loader = DataLoader()
-    stock_data = data_loader.load_data(tickers, start_date, end_date)
+    with instrumentation.span('load_data', tickers=len(config['tickers'])):
+        stock_data = data_loader.load_data(config['tickers'], config['start_date'], config['end_date'])
+    if stock_data.empty:
+        raise SystemExit('Failed to load stock data. Please check the tickers and date range.')
+    if data_loader.last_report.failed:
+        print(f"Could not load data for: {', '.join(data_loader.last_report.failed)}")
 
     # Create portfolio
-    portfolio = Portfolio(stock_data)
-    portfolio.calculate_returns()
+    with instrumentation.span('calculate_returns'):
+        portfolio = Portfolio(stock_data)
+        portfolio.calculate_returns()
 
-    # Annualize returns and covariance
-    expected_returns = portfolio.returns.mean() * 252
-    covariance_matrix = portfolio.returns.cov() * 252
+        # Annualize returns and covariance
+        expected_returns, covariance_matrix = portfolio.statistics.annualized()
 
     # Determine weights
-    if optimize:
-        optimizer = PortfolioOptimizer(
-            expected_returns,
-            covariance_matrix,
-            risk_free_rate=risk_free_rate
-        )
-        if balanced:
-            optimal_weights = optimizer.minimize_volatility(target_return=expected_returns.mean())
-            print("\nOptimal Balanced Portfolio Weights:")
-        else:
-            optimal_weights = optimizer.maximize_sharpe_ratio()
-            print("\nOptimal Portfolio Weights to Maximize Sharpe Ratio:")
-        display_optimal_weights(stock_data.columns, optimal_weights)
-        weights = optimal_weights
-    elif custom_weights:
-        weights = custom_weights
-        print("\nUsing Custom Weights:")
-        display_optimal_weights(stock_data.columns, weights)
-    else:
-        num_assets = len(expected_returns)
-        weights = [1.0 / num_assets] * num_assets
-        print("\nUsing Equal Weights:")
-        display_optimal_weights(stock_data.columns, weights)
+    with instrumentation.span('optimize') as span:
+        weights, description, iterations = resolve_weights(config, expected_returns, covariance_matrix)
+        span.set(iterations=iterations)
+    print(f"\n{description}:")
+    display_optimal_weights(stock_data.columns, weights)
 
     # Perform Monte Carlo Simulation
-    simulation = MonteCarloSimulation(portfolio.returns, initial_investment, weights)
-    all_cumulative_returns, final_portfolio_values = simulation.run_simulation(
-        num_simulations, time_horizon
-    )
+    with instrumentation.span('run_simulation') as span:
+        simulation = MonteCarloSimulation(
+            portfolio.returns, config['initial_investment'], weights, statistics=portfolio.statistics
+        )
+        all_cumulative_returns, final_portfolio_values = simulation.run_simulation(
+            config['num_simulations'], config['time_horizon'], seed=config['seed']
+        )
+        span.count(config['num_simulations'], 'paths')
 
     # Analyze Results
-    print_simulation_insights(final_portfolio_values, initial_investment)
+    with instrumentation.span('get_simulation_insights'):
+        insights = get_simulation_insights(final_portfolio_values, config['initial_investment'])
+    print("\nMonte Carlo Simulation Insights:")
+    for key, value in insights.items():
+        print(f"{key}: {value}")
 
     # Plot results
-    plot_simulation_results(all_cumulative_returns, final_portfolio_values)
+    if plot:
+        with instrumentation.span('plot'):
+            figure = build_fan_chart_figure(final_portfolio_values, config['end_date'], all_cumulative_returns)
+            figure.write_html(plot)
+        print(f"\nPlot written to {plot}")
+
+    if profile:
+        print(json.dumps(instrumentation.records(), indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('config', nargs='?', default='config.json', help='Config for a single run.')
+    parser.add_argument('--batch', help='Directory of JSON configs or a JSONL file of configs.')
+    parser.add_argument('--output', default='results.parquet', help='Batch results, .parquet or .csv.')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes for a batch.')
+    parser.add_argument('--no-resume', action='store_true', help='Rerun every job of a batch from scratch.')
+    parser.add_argument('--cache-dir', help='Directory of the on-disk price cache.')
+    parser.add_argument('--offline', action='store_true', help='Only use cached prices (needs --cache-dir).')
+    parser.add_argument('--plot', help='Write the single-run chart to this HTML file.')
+    parser.add_argument('--profile', action='store_true', help='Print per-stage timings of a single run.')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    cache = PriceCache(args.cache_dir) if args.cache_dir else None
+    data_loader = DataLoader(cache=cache, offline=args.offline)
+    if args.batch:
+        results = run_batch(args.batch, args.output, data_loader=data_loader, n_workers=args.workers,
+                            resume=not args.no_resume)
+        failed = int((results['status'] != 'ok').sum())
+        print(f"{len(results) - failed} jobs succeeded, {failed} failed; results written to {args.output}")
+    else:
+        run_single(args.config, data_loader, plot=args.plot, profile=args.profile)
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,78 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from portfolio_management.utils.metrics import column_risk_metrics
+
+# Upper bound on the number of (path, candidate) final values held at once
+DEFAULT_BATCH_ELEMENTS = 2 ** 22
+
+METRIC_COLUMNS = (
+    'mean', 'median', 'std', 'var_95', 'cvar_95', 'probability_of_loss', 'sharpe_ratio'
+)
+
+
+@dataclass
+class BatchEvaluation:
+    weights: np.ndarray  # one row per candidate
+    metrics: pd.DataFrame  # one row per candidate, METRIC_COLUMNS
+    final_portfolio_values: np.ndarray = None  # (num_simulations, num_candidates), if kept
+    assets: list = None
+
+    def __len__(self):
+        return len(self.weights)
+
+    def rank(self, by='sharpe_ratio', ascending=False):
+        return self.metrics.sort_values(by, ascending=ascending)
+
+
+def final_value_metrics(final_portfolio_values, initial_investment):
+    # The quantities of get_simulation_insights as raw floats, computed for
+    # every column of a (num_simulations, num_candidates) matrix at once
+    metrics = column_risk_metrics(final_portfolio_values, initial_investment, levels=(0.95,))
+    return {
+        'mean': metrics['mean'],
+        'median': metrics['median'],
+        'std': metrics['std'],
+        'var_95': metrics['var'][0.95],
+        'cvar_95': metrics['cvar'][0.95],
+        'probability_of_loss': metrics['probability_of_loss'],
+        'sharpe_ratio': metrics['sharpe_ratio'],
+    }
+
+
+def evaluate_portfolios(final_growth, weights, initial_investment=1, chunk_size=None, keep_final_values=False):
+    # final_growth is the per-asset growth of one unit at the horizon,
+    # (num_simulations, num_assets), shared by every candidate; each chunk of
+    # candidates costs one matrix multiply plus the column-wise metrics. The
+    # (num_simulations, num_candidates) final values are only kept with
+    # keep_final_values=True, since they can dwarf the chunks.
+    assets = list(weights.columns) if isinstance(weights, pd.DataFrame) else None
+    weights = np.atleast_2d(np.asarray(weights, dtype=float))
+    final_growth = np.asarray(final_growth)
+    num_simulations, num_assets = final_growth.shape
+    if weights.shape[1] != num_assets:
+        raise ValueError(f"Weights have {weights.shape[1]} assets, scenarios have {num_assets}")
+    num_candidates = len(weights)
+    if chunk_size is None:
+        chunk_size = max(1, DEFAULT_BATCH_ELEMENTS // num_simulations)
+
+    metrics = {column: np.empty(num_candidates) for column in METRIC_COLUMNS}
+    final_portfolio_values = (
+        np.empty((num_simulations, num_candidates), dtype=np.result_type(final_growth, np.float64))
+        if keep_final_values else None
+    )
+    for start in range(0, num_candidates, chunk_size):
+        stop = min(start + chunk_size, num_candidates)
+        values = (final_growth @ weights[start:stop].T) * initial_investment
+        for column, chunk_metrics in final_value_metrics(values, initial_investment).items():
+            metrics[column][start:stop] = chunk_metrics
+        if keep_final_values:
+            final_portfolio_values[:, start:stop] = values
+
+    return BatchEvaluation(
+        weights=weights,
+        metrics=pd.DataFrame(metrics, columns=list(METRIC_COLUMNS)),
+        final_portfolio_values=final_portfolio_values,
+        assets=assets,
+    )
@@ -0,0 +1,172 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from portfolio_management.monte_carlo.simulation import MonteCarloSimulation
+from portfolio_management.utils.instrumentation import Instrumentation
+
+JOB_STATES = ('queued', 'loading', 'simulating', 'done', 'cancelled', 'failed')
+FINISHED_STATES = ('done', 'cancelled', 'failed')
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class SimulationJob:
+    # Loads returns and simulates a scenario tensor (time_horizon,
+    # num_simulations, num_assets) on a worker thread, one chunk at a time.
+    # Chunks are written in order, so the paths done so far are a prefix of
+    # the tensor that can be read for interim results while the rest runs.
+    # The chunks and seed streams are those of simulate_asset_growth, so a
+    # finished job holds exactly its scenarios.
+    #
+    # load_returns may return the daily returns, or a (returns, statistics)
+    # pair whose ReturnStatistics (e.g. a cached Portfolio.statistics) is
+    # passed to MonteCarloSimulation instead of recomputing the moments.
+    #
+    # cancel() stops the job at the next chunk boundary. With abandon_after
+    # set, a job nobody has touch()ed for that many seconds cancels itself,
+    # so closed browser sessions do not keep workers busy.
+
+    def __init__(self, load_returns, num_simulations, time_horizon, seed=None, dtype=np.float32,
+                 chunk_size=None, abandon_after=None, key=None, **simulation_options):
+        self.load_returns = load_returns
+        self.num_simulations = int(num_simulations)
+        self.time_horizon = int(time_horizon)
+        self.seed = seed
+        self.dtype = dtype
+        self.chunk_size = chunk_size
+        self.abandon_after = abandon_after
+        self.key = key  # inputs the job was started for
+        self.simulation_options = simulation_options
+        self.instrumentation = Instrumentation(trace_memory=False)
+
+        self.state = 'queued'
+        self.returns = None
+        self.asset_growth = None
+        self.paths_done = 0
+        self.error = None
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+        self._simulation_started = None
+        self._last_seen = time.monotonic()
+
+    def touch(self):
+        self._last_seen = time.monotonic()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _check_cancelled(self):
+        if self.abandon_after is not None and time.monotonic() - self._last_seen > self.abandon_after:
+            self._cancel.set()
+        if self._cancel.is_set():
+            raise JobCancelled
+
+    def run(self):
+        try:
+            self._check_cancelled()
+            self.state = 'loading'
+            with self.instrumentation.span('load_data'):
+                loaded = self.load_returns()
+            self._check_cancelled()
+
+            options = self.simulation_options
+            if isinstance(loaded, tuple):
+                loaded, statistics = loaded
+                options = {**options, 'statistics': statistics}
+            self.returns = loaded
+            simulation = MonteCarloSimulation(self.returns, **options)
+            chunks = simulation.plan_chunks(self.num_simulations, self.time_horizon, self.chunk_size, self.seed)
+            self.asset_growth = np.empty((self.time_horizon, self.num_simulations, len(simulation.weights)),
+                                         dtype=self.dtype)
+            self.state = 'simulating'
+            self._simulation_started = time.perf_counter()
+            with self.instrumentation.span('simulate', horizon=self.time_horizon) as span:
+                for start, stop, seed_sequence in chunks:
+                    self._check_cancelled()
+                    self.asset_growth[:, start:stop] = simulation._asset_growth(
+                        np.random.default_rng(seed_sequence), stop - start, self.time_horizon
+                    )
+                    self.paths_done = stop
+                span.count(self.paths_done, 'paths')
+            self.asset_growth.setflags(write=False)
+            self.state = 'done'
+        except JobCancelled:
+            self.state = 'cancelled'
+        except Exception as error:
+            self.error = error
+            self.state = 'failed'
+        finally:
+            self._finished.set()
+        return self
+
+    @property
+    def finished(self):
+        return self.state in FINISHED_STATES
+
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
+
+    @property
+    def progress(self):
+        return self.paths_done / self.num_simulations if self.num_simulations else 1.0
+
+    @property
+    def eta(self):
+        # Seconds left at the pace of the chunks done so far, None before the first
+        if self._simulation_started is None or self.paths_done == 0:
+            return None
+        if self.finished:
+            return 0.0
+        elapsed = time.perf_counter() - self._simulation_started
+        return elapsed * (self.num_simulations - self.paths_done) / self.paths_done
+
+    def completed_growth(self):
+        # Scenarios of the paths done so far, (time_horizon, paths_done, num_assets)
+        if self.asset_growth is None:
+            return None
+        return self.asset_growth[:, :self.paths_done]
+
+
+class JobRunner:
+    # A bounded pool shared by every session of the app, so concurrent runs
+    # queue instead of oversubscribing the machine.
+    #
+    # start() keeps the jobs it starts by key, so asking again for the same
+    # inputs (from any session) returns the same job and its scenarios
+    # instead of drawing them again. Only the max_jobs most recently
+    # requested are kept: older ones are cancelled and dropped, which bounds
+    # the scenario memory held across sessions. Cancelled and failed jobs
+    # are replaced when their key is asked for again.
+    def __init__(self, max_workers=2, max_jobs=2):
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix='simulation-job')
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, job):
+        self.executor.submit(job.run)
+        return job
+
+    def start(self, key, make_job):
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None or job.state in ('cancelled', 'failed'):
+                job = self.submit(make_job())
+                self._jobs[key] = job
+            self._jobs.move_to_end(key)
+            while len(self._jobs) > self.max_jobs:
+                _, evicted = self._jobs.popitem(last=False)
+                evicted.cancel()
+            return job
+
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def shutdown(self, cancel_pending=True):
+        self.executor.shutdown(wait=True, cancel_futures=cancel_pending)
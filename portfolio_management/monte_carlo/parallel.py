@@ -0,0 +1,91 @@
+import copy
+import os
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from portfolio_management.monte_carlo.sampling import BOOTSTRAP_METHODS
+
+# Below this many (day, path, asset) draws, process startup costs more than it saves
+MIN_PARALLEL_ELEMENTS = 2 ** 24
+
+_worker_simulation = None
+
+
+def _init_worker(simulation):
+    global _worker_simulation
+    _worker_simulation = simulation
+
+
+def _simulate_into_shared_memory(shm_name, shape, chunks, time_horizon):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        all_cumulative_returns = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        for start, stop, seed_sequence in chunks:
+            all_cumulative_returns[:, start:stop] = _worker_simulation.simulate_chunk(
+                start, stop, seed_sequence, time_horizon
+            )
+        del all_cumulative_returns
+    finally:
+        shm.close()
+    return len(chunks)
+
+
+def _worker_copy(simulation):
+    # Ship only what the engine needs; the covariance is factored once here
+    # (unless a factor model stands in for it), or the bootstrap's history
+    # array is built once
+    worker = copy.copy(simulation)
+    if simulation.sampling in BOOTSTRAP_METHODS:
+        worker._history_growth = simulation.history_growth
+    elif simulation.factor_model is None:
+        worker._covariance_factor = simulation.covariance_factor
+    worker.returns = None
+    return worker
+
+
+def _shared_array(shape):
+    shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * 8, 1))
+    array = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    weakref.finalize(array, shm.close)
+    return shm, array
+
+
+def resolve_workers(n_workers):
+    if n_workers is None:
+        return 1
+    if n_workers < 1:
+        return os.cpu_count() or 1
+    return n_workers
+
+
+def run_parallel(simulation, num_simulations, time_horizon, n_workers, chunk_size=None, seed=None,
+                 min_parallel_elements=MIN_PARALLEL_ELEMENTS):
+    n_workers = resolve_workers(n_workers)
+    chunks = simulation.plan_chunks(num_simulations, time_horizon, chunk_size, seed)
+    total_elements = num_simulations * time_horizon * len(simulation.weights)
+    if n_workers <= 1 or len(chunks) <= 1 or total_elements < min_parallel_elements:
+        return simulation.run_simulation(num_simulations, time_horizon, chunk_size=chunk_size, seed=seed)
+
+    shape = (time_horizon, num_simulations)
+    shm, all_cumulative_returns = _shared_array(shape)
+    try:
+        n_workers = min(n_workers, len(chunks))
+        # A few tasks per worker keeps the pool balanced when chunks finish unevenly
+        num_tasks = min(len(chunks), n_workers * 4)
+        tasks = [chunks[i::num_tasks] for i in range(num_tasks)]
+        with ProcessPoolExecutor(n_workers, initializer=_init_worker,
+                                 initargs=(_worker_copy(simulation),)) as executor:
+            futures = [
+                executor.submit(_simulate_into_shared_memory, shm.name, shape, task, time_horizon)
+                for task in tasks
+            ]
+            for future in futures:
+                future.result()
+    finally:
+        # The mapping stays valid until the returned array is released
+        shm.unlink()
+
+    final_portfolio_values = all_cumulative_returns[-1].copy()
+    return all_cumulative_returns, final_portfolio_values
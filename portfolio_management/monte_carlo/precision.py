@@ -0,0 +1,43 @@
+from dataclasses import dataclass
+
+import numpy as np
+from scipy.special import ndtri
+
+
+@dataclass
+class PrecisionResult:
+    final_portfolio_values: np.ndarray
+    num_simulations: int
+    var: float
+    var_half_width: float
+    cvar: float
+    cvar_relative_error: float
+    converged: bool
+    stop_reason: str  # 'target', 'max_paths' or 'max_seconds'
+    seconds: float
+
+
+def tail_precision(final_portfolio_values, initial_investment, tail=0.05, confidence=0.95):
+    # VaR and CVaR as reported by get_simulation_insights, with distribution-free
+    # precision: an order-statistic confidence interval for the tail quantile
+    # and the asymptotic standard error of the expected-shortfall estimator
+    values = np.asarray(final_portfolio_values)
+    n = len(values)
+    z = ndtri(0.5 + confidence / 2)
+    spread = z * np.sqrt(n * tail * (1 - tail))
+    position = n * tail
+    lower = int(np.clip(np.floor(position - spread), 0, n - 1))
+    upper = int(np.clip(np.ceil(position + spread), 0, n - 1))
+    # Linear interpolation between order statistics, as np.percentile does
+    index = (n - 1) * tail
+    below = int(np.floor(index))
+    above = min(below + 1, n - 1)
+    partitioned = np.partition(values, sorted({lower, upper, below, above}))
+    quantile = partitioned[below] + (index - below) * (partitioned[above] - partitioned[below])
+    var_half_width = (partitioned[upper] - partitioned[lower]) / 2
+
+    cvar = initial_investment - values[values <= quantile].mean()
+    shortfall = np.maximum(quantile - values, 0)
+    cvar_half_width = z * shortfall.std() / (tail * np.sqrt(n))
+    cvar_relative_error = cvar_half_width / abs(cvar) if cvar != 0 else np.inf
+    return float(initial_investment - quantile), float(var_half_width), float(cvar), float(cvar_relative_error)
@@ -0,0 +1,113 @@
+import json
+import os
+
+import numpy as np
+
+PATHS_FILE = 'paths.npy'
+FINAL_VALUES_FILE = 'final_values.npy'
+METADATA_FILE = 'metadata.json'
+
+
+def seed_metadata(seed):
+    # Chunk streams are spawned from the seed's entropy and spawn key alone
+    # (see spawn_seed_sequences), so these reproduce the run
+    if seed is None or isinstance(seed, (int, np.integer)):
+        return None if seed is None else int(seed)
+    if isinstance(seed, np.random.Generator):
+        seed = seed.bit_generator.seed_seq
+    if isinstance(seed, np.random.SeedSequence):
+        return {'entropy': seed.entropy, 'spawn_key': list(seed.spawn_key), 'pool_size': seed.pool_size}
+    return None
+
+
+class SimulationResult:
+    # Paths are stored one row per simulation, shape (num_simulations,
+    # time_horizon), so slicing a subset of paths reads contiguous rows even
+    # from a memory-mapped file. all_cumulative_returns exposes the usual
+    # (time_horizon, num_simulations) layout as a transposed view. Final
+    # values are kept separately so reading them never touches the paths.
+
+    def __init__(self, paths, final_portfolio_values, metadata=None, directory=None):
+        self.paths = paths
+        self.final_portfolio_values = final_portfolio_values
+        self.metadata = dict(metadata or {})
+        self.directory = directory
+
+    @classmethod
+    def allocate(cls, num_simulations, time_horizon, dtype=np.float64, directory=None, metadata=None):
+        shape = (num_simulations, time_horizon)
+        if directory is None:
+            return cls(np.empty(shape, dtype=dtype), np.empty(num_simulations, dtype=dtype), metadata)
+        # Memory-mapped files let runs exceed RAM
+        os.makedirs(directory, exist_ok=True)
+        paths = np.lib.format.open_memmap(os.path.join(directory, PATHS_FILE), mode='w+', dtype=dtype, shape=shape)
+        final_portfolio_values = np.lib.format.open_memmap(
+            os.path.join(directory, FINAL_VALUES_FILE), mode='w+', dtype=dtype, shape=(num_simulations,)
+        )
+        result = cls(paths, final_portfolio_values, metadata, directory)
+        result._write_metadata(directory)
+        return result
+
+    @property
+    def num_simulations(self):
+        return self.paths.shape[0]
+
+    @property
+    def time_horizon(self):
+        return self.paths.shape[1]
+
+    @property
+    def dtype(self):
+        return self.paths.dtype
+
+    @property
+    def all_cumulative_returns(self):
+        return self.paths.T
+
+    def sample_paths(self, num_paths=100):
+        # (time_horizon, num_paths) array for plotting
+        return np.asarray(self.paths[:num_paths]).T
+
+    def write(self, start, stop, cumulative_returns):
+        self.paths[start:stop] = cumulative_returns.T
+        self.final_portfolio_values[start:stop] = cumulative_returns[-1]
+
+    def _write_metadata(self, directory):
+        metadata = dict(self.metadata)
+        metadata.update({
+            'num_simulations': self.num_simulations,
+            'time_horizon': self.time_horizon,
+            'dtype': np.dtype(self.dtype).name,
+        })
+        with open(os.path.join(directory, METADATA_FILE), 'w') as f:
+            json.dump(metadata, f, indent=2)
+
+    def flush(self):
+        for array in (self.paths, self.final_portfolio_values):
+            if isinstance(array, np.memmap):
+                array.flush()
+
+    def save(self, directory, chunk_size=65536):
+        if self.directory is not None and os.path.abspath(directory) == os.path.abspath(self.directory):
+            self.flush()
+            self._write_metadata(directory)
+            return self
+        target = SimulationResult.allocate(
+            self.num_simulations, self.time_horizon, self.dtype, directory, self.metadata
+        )
+        # Copy in row chunks so saving a memory-mapped run never loads it whole
+        for start in range(0, self.num_simulations, chunk_size):
+            stop = min(start + chunk_size, self.num_simulations)
+            target.paths[start:stop] = self.paths[start:stop]
+        target.final_portfolio_values[:] = self.final_portfolio_values
+        target.flush()
+        return target
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        # Lazy: arrays are memory-mapped and only the pages that are read get loaded
+        with open(os.path.join(directory, METADATA_FILE)) as f:
+            metadata = json.load(f)
+        paths = np.load(os.path.join(directory, PATHS_FILE), mmap_mode=mmap_mode)
+        final_portfolio_values = np.load(os.path.join(directory, FINAL_VALUES_FILE), mmap_mode=mmap_mode)
+        return cls(paths, final_portfolio_values, metadata, directory)
@@ -0,0 +1,133 @@
+import warnings
+from dataclasses import dataclass
+
+import numpy as np
+from scipy.special import ndtri
+
+# Resample days of the historical returns instead of drawing normal shocks
+BOOTSTRAP_METHODS = ('stationary_bootstrap', 'block_bootstrap')
+SAMPLING_METHODS = ('plain', 'antithetic', 'control_variate', 'sobol') + BOOTSTRAP_METHODS
+
+# scipy's Sobol' direction numbers cover this many dimensions (days * assets)
+MAX_SOBOL_DIMENSIONS = 21201
+
+
+def check_sampling(sampling, time_horizon=None, num_assets=None):
+    if sampling not in SAMPLING_METHODS:
+        raise ValueError(f"Unknown sampling method '{sampling}', expected one of {SAMPLING_METHODS}")
+    if sampling == 'sobol' and time_horizon is not None and time_horizon * num_assets > MAX_SOBOL_DIMENSIONS:
+        raise ValueError(
+            f"Sobol' sampling supports at most {MAX_SOBOL_DIMENSIONS} days x assets, "
+            f"got {time_horizon} x {num_assets}"
+        )
+
+
+def standard_normal_shocks(sampling, rng, num_paths, time_horizon, num_assets):
+    if sampling == 'antithetic':
+        # Pairs (z, -z) inside the chunk share everything but the sign
+        half = rng.standard_normal((time_horizon, (num_paths + 1) // 2, num_assets))
+        return np.concatenate([half, -half], axis=1)[:, :num_paths]
+    if sampling == 'sobol':
+        # Each chunk is an independently scrambled point set, i.e. one
+        # randomized QMC replicate. scipy.stats is slow to import and only
+        # needed here.
+        from scipy.stats import qmc
+        sampler = qmc.Sobol(d=time_horizon * num_assets, scramble=True, seed=rng)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', UserWarning)  # balance warning for non powers of two
+            uniforms = sampler.random(num_paths)
+        shocks = ndtri(uniforms).reshape(num_paths, time_horizon, num_assets)
+        return np.ascontiguousarray(shocks.transpose(1, 0, 2))
+    return rng.standard_normal((time_horizon, num_paths, num_assets))
+
+
+def bootstrap_indices(sampling, rng, num_paths, time_horizon, num_days, block_length):
+    # Rows of the history to replay, (time_horizon, num_paths), drawn for a
+    # whole chunk at once. Blocks start every block_length days
+    # ('block_bootstrap') or with probability 1 / block_length on each day
+    # ('stationary_bootstrap', Politis & Romano), at a uniform row, and run
+    # on through consecutive days, wrapping around the end of the history.
+    # Whole days are resampled, so the cross-asset correlation is kept.
+    days = np.arange(time_horizon)[:, None]
+    if sampling == 'block_bootstrap':
+        block_starts = np.broadcast_to(days % block_length == 0, (time_horizon, num_paths))
+    else:
+        block_starts = rng.random((time_horizon, num_paths)) < 1 / block_length
+        block_starts[0] = True
+    start_day = np.maximum.accumulate(np.where(block_starts, days, 0), axis=0)
+    start_rows = rng.integers(0, num_days, size=(time_horizon, num_paths))
+    rows = np.take_along_axis(start_rows, start_day, axis=0)
+    rows += days - start_day
+    rows %= num_days
+    return rows
+
+
+def control_variate_weights(control, control_mean):
+    # Weights of the linear control-variate empirical distribution: they sum
+    # to one and reproduce the known mean of the control exactly. The
+    # weighted mean of the values is the regression-adjusted estimate
+    # mean(values) - beta (mean(control) - control_mean).
+    deviations = control - control.mean()
+    spread = deviations @ deviations
+    weights = np.full(len(control), 1 / len(control))
+    if spread > 0:
+        weights -= (control.mean() - control_mean) * deviations / spread
+    return weights
+
+
+def weighted_quantiles(values, weights, levels):
+    order = np.argsort(values)
+    cumulative = np.cumsum(weights[order])
+    # Control-variate weights can be negative, so take the first crossing
+    positions = np.searchsorted(np.maximum.accumulate(cumulative), levels)
+    return values[order][np.minimum(positions, len(values) - 1)]
+
+
+def sample_estimates(values, levels, control=None, control_mean=None):
+    if control is None:
+        return values.mean(), np.quantile(values, levels)
+    weights = control_variate_weights(control, control_mean)
+    return weights @ values, weighted_quantiles(values, weights, levels)
+
+
+@dataclass
+class SimulationEstimate:
+    sampling: str
+    num_simulations: int
+    num_batches: int
+    mean: float
+    mean_standard_error: float
+    quantiles: dict
+    quantile_standard_errors: dict
+    final_portfolio_values: np.ndarray
+
+
+def estimate_from_batches(sampling, batches, levels, control_batches=None, control_mean=None):
+    # Standard errors come from the spread of estimates across independent
+    # batches, which holds for every sampling method: antithetic pairs and
+    # Sobol' replicates never straddle a batch boundary, and each batch fits
+    # its own control-variate coefficient
+    levels = np.asarray(levels, dtype=float)
+    final_portfolio_values = np.concatenate(batches)
+    if control_batches is None:
+        control, control_batches = None, [None] * len(batches)
+    else:
+        control = np.concatenate(control_batches)
+    mean, quantiles = sample_estimates(final_portfolio_values, levels, control, control_mean)
+    batch_estimates = [
+        sample_estimates(batch, levels, batch_control, control_mean)
+        for batch, batch_control in zip(batches, control_batches)
+    ]
+    batch_means = np.array([batch_mean for batch_mean, _ in batch_estimates])
+    batch_quantiles = np.array([batch_quantile for _, batch_quantile in batch_estimates])
+    scale = 1 / np.sqrt(len(batches))
+    return SimulationEstimate(
+        sampling=sampling,
+        num_simulations=len(final_portfolio_values),
+        num_batches=len(batches),
+        mean=float(mean),
+        mean_standard_error=float(batch_means.std(ddof=1) * scale),
+        quantiles=dict(zip(levels.tolist(), quantiles.tolist())),
+        quantile_standard_errors=dict(zip(levels.tolist(), (batch_quantiles.std(axis=0, ddof=1) * scale).tolist())),
+        final_portfolio_values=final_portfolio_values,
+    )
@@ -1,27 +1,326 @@
+import time
 import numpy as np
+import pandas as pd
+from portfolio_management.monte_carlo.batch import evaluate_portfolios
+from portfolio_management.monte_carlo.parallel import resolve_workers, run_parallel
+from portfolio_management.monte_carlo.precision import PrecisionResult, tail_precision
+from portfolio_management.monte_carlo.results import SimulationResult, seed_metadata
+from portfolio_management.monte_carlo.sampling import (
+    BOOTSTRAP_METHODS,
+    bootstrap_indices,
+    check_sampling,
+    estimate_from_batches,
+    standard_normal_shocks
+)
+from portfolio_management.monte_carlo.summary import DEFAULT_PERCENTILES, StreamingSummary
+from portfolio_management.utils.linalg import covariance_root
+
+# Upper bound on the number of (day, path, asset) draws held in memory at once
+DEFAULT_CHUNK_ELEMENTS = 2 ** 22
+
+
+def iter_chunks(num_simulations, chunk_size):
+    for start in range(0, num_simulations, chunk_size):
+        yield start, min(start + chunk_size, num_simulations)
+
+
+def spawn_seed_sequences(seed, count):
+    # One independent stream per chunk: results depend on the seed and the
+    # chunk size only, never on how chunks are scheduled across workers.
+    # Children are spawned from a fresh copy, so the caller's SeedSequence
+    # (or Generator) is not advanced and the same seed always gives the same
+    # streams, as recorded by seed_metadata.
+    if isinstance(seed, np.random.Generator):
+        seed = seed.bit_generator.seed_seq
+    if isinstance(seed, np.random.SeedSequence):
+        seed_sequence = np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key, pool_size=seed.pool_size)
+    else:
+        seed_sequence = np.random.SeedSequence(seed)
+    return seed_sequence.spawn(count)
+
+
+def project_scenarios(asset_growth, weights, initial_investment=1):
+    # Per-asset growth of one unit, (time_horizon, num_simulations, num_assets),
+    # to portfolio values (time_horizon, num_simulations)
+    return (asset_growth @ np.asarray(weights, dtype=float)) * initial_investment
+
+
+def summed_returns(asset_growth, weights):
+    # Sum over the horizon of the daily portfolio returns (weights rebalanced
+    # daily) along each path, (num_simulations,). Its expectation is known,
+    # time_horizon * (mean @ weights), and it moves closely with, but is not a
+    # linear function of, the buy-and-hold final value: the control of
+    # 'control_variate'.
+    daily_growth = asset_growth[1:] / asset_growth[:-1]
+    return (asset_growth[0] + daily_growth.sum(axis=0) - len(asset_growth)) @ np.asarray(weights, dtype=float)
+
 
 class MonteCarloSimulation:
-    def __init__(self, returns, initial_investment=1, weights=None):
+    def __init__(self, returns, initial_investment=1, weights=None, sampling='plain', statistics=None,
+                 block_length=20, factor_model=None):
+        # `statistics` (a ReturnStatistics, e.g. Portfolio.statistics) saves
+        # recomputing the mean and covariance of `returns`. The bootstrap
+        # sampling methods replay days of `returns` in blocks of block_length
+        # days on average, with no covariance factorization. A daily
+        # FactorModel replaces the sample covariance: each simulated day then
+        # draws k factor and n idiosyncratic shocks, O(n k) instead of O(n^2).
+        # 'control_variate' draws plain paths and only changes estimate(),
+        # which regresses the final values on summed_returns.
         self.returns = returns
-        self.mean = returns.mean()
-        self.covariance = returns.cov()
+        self.factor_model = factor_model
+        self.mean = statistics.mean if statistics is not None else returns.mean()
+        self._covariance = statistics.covariance if statistics is not None and factor_model is None else None
         self.initial_investment = initial_investment
         num_assets = len(self.mean)
         if weights is None:
             self.weights = np.ones(num_assets) / num_assets
         else:
             self.weights = np.array(weights)
+        check_sampling(sampling)
+        if block_length < 1:
+            raise ValueError(f"block_length must be at least 1, got {block_length}")
+        self.sampling = sampling
+        self.block_length = int(block_length)
+        self._covariance_factor = None
+        self._history_growth = None
 
-    def run_simulation(self, num_simulations, time_horizon):
-        all_cumulative_returns = np.zeros((time_horizon, num_simulations))
-        final_portfolio_values = np.zeros(num_simulations)
+    @property
+    def covariance(self):
+        # Dense n x n matrix, only built when asked for: the factor-model and
+        # bootstrap engines never need it
+        if self._covariance is None:
+            self._covariance = self.factor_model.covariance if self.factor_model is not None else self.returns.cov()
+        return self._covariance
 
-        for sim in range(num_simulations):
-            simulated_returns = np.random.multivariate_normal(
-                self.mean, self.covariance, time_horizon
-            )
-            cumulative_returns = np.cumprod(1 + simulated_returns, axis=0)
-            portfolio_cumulative_returns = cumulative_returns.dot(self.weights)
-            all_cumulative_returns[:, sim] = portfolio_cumulative_returns * self.initial_investment
-            final_portfolio_values[sim] = portfolio_cumulative_returns[-1] * self.initial_investment
+    @property
+    def covariance_factor(self):
+        if self._covariance_factor is None:
+            self._covariance_factor = covariance_root(self.covariance)
+        return self._covariance_factor
+
+    @property
+    def history_growth(self):
+        # 1 + historical daily returns as one contiguous array, gathered from
+        # by the bootstrap
+        if self._history_growth is None:
+            self._history_growth = np.ascontiguousarray(1 + np.asarray(self.returns, dtype=float))
+        return self._history_growth
+
+    @property
+    def shock_dimensions(self):
+        # Normal draws per path and day
+        if self.factor_model is not None:
+            return self.factor_model.num_factors + len(self.weights)
+        return len(self.weights)
+
+    def default_chunk_size(self, time_horizon):
+        chunk_size = max(1, DEFAULT_CHUNK_ELEMENTS // (time_horizon * self.shock_dimensions))
+        if self.sampling == 'sobol':
+            # Sobol' point sets are balanced at powers of two
+            return 2 ** int(np.log2(chunk_size))
+        if self.sampling == 'antithetic' and chunk_size > 1:
+            return chunk_size - chunk_size % 2
+        return chunk_size
+
+    def expected_final_value(self, time_horizon):
+        # Daily returns are i.i.d. across days, so each asset grows by
+        # (1 + mean) per day in expectation
+        growth = (1 + np.asarray(self.mean, dtype=float)) ** time_horizon
+        return self.initial_investment * float(growth @ self.weights)
+
+    def expected_summed_returns(self, time_horizon):
+        return time_horizon * float(np.asarray(self.mean, dtype=float) @ self.weights)
+
+    def plan_chunks(self, num_simulations, time_horizon, chunk_size=None, seed=None):
+        check_sampling(self.sampling, time_horizon, self.shock_dimensions)
+        if chunk_size is None:
+            chunk_size = self.default_chunk_size(time_horizon)
+        chunks = list(iter_chunks(num_simulations, chunk_size))
+        seed_sequences = spawn_seed_sequences(seed, len(chunks))
+        return [(start, stop, seed_sequence) for (start, stop), seed_sequence in zip(chunks, seed_sequences)]
+
+    def simulate_chunk(self, start, stop, seed_sequence, time_horizon):
+        return self._simulate_chunk(np.random.default_rng(seed_sequence), stop - start, time_horizon)
+
+    def _asset_growth(self, rng, num_paths, time_horizon):
+        if self.sampling in BOOTSTRAP_METHODS:
+            rows = bootstrap_indices(self.sampling, rng, num_paths, time_horizon, len(self.history_growth),
+                                     self.block_length)
+            growth = self.history_growth[rows]
+            np.cumprod(growth, axis=0, out=growth)
+            return growth
+        num_assets = len(self.weights)
+        if self.factor_model is not None:
+            loadings, specific_volatility = self.factor_model.simulation_factors
+            num_factors = loadings.shape[1]
+            shocks = standard_normal_shocks(self.sampling, rng, num_paths, time_horizon, self.shock_dimensions)
+            growth = shocks[..., :num_factors] @ loadings.T
+            growth += shocks[..., num_factors:] * specific_volatility
+        else:
+            shocks = standard_normal_shocks(self.sampling, rng, num_paths, time_horizon, num_assets)
+            growth = shocks @ self.covariance_factor.T
+        growth += 1 + np.asarray(self.mean, dtype=float)
+        np.cumprod(growth, axis=0, out=growth)
+        return growth
+
+    def _simulate_chunk(self, rng, num_paths, time_horizon):
+        return project_scenarios(self._asset_growth(rng, num_paths, time_horizon), self.weights, self.initial_investment)
+
+    def simulate_asset_growth(self, num_simulations, time_horizon, dtype=np.float64, chunk_size=None, seed=None):
+        # Scenario tensor (time_horizon, num_simulations, num_assets) drawn from
+        # the same chunk streams as run_simulation: project_scenarios onto
+        # self.weights reproduces run_simulation for the same seed, and onto
+        # other weights evaluates them on common random numbers
+        asset_growth = np.empty((time_horizon, num_simulations, len(self.weights)), dtype=dtype)
+        for start, stop, seed_sequence in self.plan_chunks(num_simulations, time_horizon, chunk_size, seed):
+            asset_growth[:, start:stop] = self._asset_growth(np.random.default_rng(seed_sequence), stop - start, time_horizon)
+        return asset_growth
+
+    def simulate_final_growth(self, num_simulations, time_horizon, chunk_size=None, seed=None):
+        # Horizon slice of simulate_asset_growth, (num_simulations, num_assets),
+        # without holding the full tensor
+        final_growth = np.empty((num_simulations, len(self.weights)))
+        for start, stop, seed_sequence in self.plan_chunks(num_simulations, time_horizon, chunk_size, seed):
+            final_growth[start:stop] = self._asset_growth(np.random.default_rng(seed_sequence), stop - start, time_horizon)[-1]
+        return final_growth
+
+    def evaluate_portfolios(self, weights, num_simulations, time_horizon, chunk_size=None, seed=None,
+                            keep_final_values=False):
+        # Scores many candidate allocations (one row of `weights` each) on the
+        # same scenarios: they are simulated once and every candidate is one
+        # column of a matrix product, instead of one simulation per candidate
+        final_growth = self.simulate_final_growth(num_simulations, time_horizon, chunk_size, seed)
+        if not isinstance(weights, pd.DataFrame) and hasattr(self.mean, 'index'):
+            weights = pd.DataFrame(np.atleast_2d(weights), columns=self.mean.index)
+        return evaluate_portfolios(final_growth, weights, self.initial_investment, keep_final_values=keep_final_values)
+
+    def run_simulation(self, num_simulations, time_horizon, chunk_size=None, seed=None, n_workers=None):
+        # n_workers < 1 means one worker per CPU; run_parallel still falls back
+        # to this serial loop for runs too small to be worth a pool
+        if resolve_workers(n_workers) > 1:
+            return run_parallel(self, num_simulations, time_horizon, n_workers, chunk_size=chunk_size, seed=seed)
+
+        all_cumulative_returns = np.empty((time_horizon, num_simulations))
+        for start, stop, seed_sequence in self.plan_chunks(num_simulations, time_horizon, chunk_size, seed):
+            all_cumulative_returns[:, start:stop] = self.simulate_chunk(start, stop, seed_sequence, time_horizon)
+        final_portfolio_values = all_cumulative_returns[-1].copy()
         return all_cumulative_returns, final_portfolio_values
+
+    def result_metadata(self, time_horizon, chunk_size, seed):
+        return {
+            'tickers': [str(ticker) for ticker in getattr(self.mean, 'index', range(len(self.weights)))],
+            'weights': np.asarray(self.weights, dtype=float).tolist(),
+            'initial_investment': float(self.initial_investment),
+            'time_horizon': int(time_horizon),
+            'seed': seed_metadata(seed),
+            'chunk_size': int(chunk_size),
+            'sampling': self.sampling,
+            'block_length': self.block_length,
+            'num_factors': None if self.factor_model is None else self.factor_model.num_factors,
+            'mean': np.asarray(self.mean, dtype=float).tolist(),
+            **self._covariance_metadata(),
+        }
+
+    def _covariance_metadata(self):
+        # The model the scenarios were drawn from, in O(n k) numbers for a
+        # factor model rather than its dense n x n covariance
+        if self.factor_model is not None:
+            return {'factor_model': {
+                'loadings': self.factor_model.loadings.tolist(),
+                'factor_covariance': self.factor_model.factor_covariance.tolist(),
+                'specific_variance': self.factor_model.specific_variance.tolist(),
+            }}
+        return {'covariance': np.asarray(self.covariance, dtype=float).tolist()}
+
+    def run(self, num_simulations, time_horizon, dtype=np.float64, directory=None, chunk_size=None, seed=None):
+        # Like run_simulation, but returns a SimulationResult that can store
+        # float32 values and be backed by memory-mapped files in `directory`
+        if chunk_size is None:
+            chunk_size = self.default_chunk_size(time_horizon)
+        result = SimulationResult.allocate(
+            num_simulations, time_horizon, dtype=dtype, directory=directory,
+            metadata=self.result_metadata(time_horizon, chunk_size, seed)
+        )
+        for start, stop, seed_sequence in self.plan_chunks(num_simulations, time_horizon, chunk_size, seed):
+            result.write(start, stop, self.simulate_chunk(start, stop, seed_sequence, time_horizon))
+        result.flush()
+        return result
+
+    def run_streaming(self, num_simulations, time_horizon, percentiles=DEFAULT_PERCENTILES,
+                      num_sample_paths=100, chunk_size=None, seed=None):
+        summary = StreamingSummary(
+            num_simulations, time_horizon, self.initial_investment,
+            percentiles=percentiles, num_sample_paths=num_sample_paths
+        )
+        for start, stop, seed_sequence in self.plan_chunks(num_simulations, time_horizon, chunk_size, seed):
+            summary.update(self.simulate_chunk(start, stop, seed_sequence, time_horizon))
+        return summary.result()
+
+    def estimate(self, num_simulations, time_horizon, quantiles=(0.01, 0.05), num_batches=16, seed=None):
+        # Chunks never straddle batches, so every batch is an independent
+        # replicate under any sampling method
+        num_batches = max(2, min(num_batches, num_simulations))
+        chunk_size = min(self.default_chunk_size(time_horizon), -(-num_simulations // num_batches))
+        if self.sampling == 'sobol':
+            chunk_size = 2 ** int(np.log2(chunk_size))
+        elif self.sampling == 'antithetic' and chunk_size > 1:
+            chunk_size -= chunk_size % 2
+
+        finals, controls = [], []
+        for start, stop, seed_sequence in self.plan_chunks(num_simulations, time_horizon, chunk_size, seed):
+            asset_growth = self._asset_growth(np.random.default_rng(seed_sequence), stop - start, time_horizon)
+            finals.append(project_scenarios(asset_growth[-1], self.weights, self.initial_investment))
+            if self.sampling == 'control_variate':
+                controls.append(summed_returns(asset_growth, self.weights))
+        groups = [group for group in np.array_split(np.arange(len(finals)), num_batches) if len(group)]
+        batches = [np.concatenate([finals[i] for i in group]) for group in groups]
+        if self.sampling != 'control_variate':
+            return estimate_from_batches(self.sampling, batches, quantiles)
+        control_batches = [np.concatenate([controls[i] for i in group]) for group in groups]
+        return estimate_from_batches(self.sampling, batches, quantiles, control_batches,
+                                     self.expected_summed_returns(time_horizon))
+
+    def run_until_precision(self, time_horizon, var_half_width=None, cvar_relative_error=None, tail=0.05,
+                            confidence=0.95, batch_size=10000, max_paths=1000000, max_seconds=None, seed=None):
+        # Simulate in batches until every requested target is met: a CI
+        # half-width in dollars on VaR and/or a relative CI half-width on CVaR
+        if var_half_width is None and cvar_relative_error is None:
+            raise ValueError("Specify var_half_width and/or cvar_relative_error")
+        started = time.perf_counter()
+        batch_seeds = iter(spawn_seed_sequences(seed, -(-max_paths // batch_size)))
+        # Filled in place, so each batch only writes its own paths
+        all_final_values = np.empty(max_paths)
+        num_simulations = 0
+        while True:
+            batch = min(batch_size, max_paths - num_simulations)
+            for start, stop, seed_sequence in self.plan_chunks(batch, time_horizon, seed=next(batch_seeds)):
+                all_final_values[num_simulations + start:num_simulations + stop] = self.simulate_chunk(
+                    start, stop, seed_sequence, time_horizon)[-1]
+            num_simulations += batch
+            final_portfolio_values = all_final_values[:num_simulations]
+
+            var, achieved_var, cvar, achieved_cvar = tail_precision(
+                final_portfolio_values, self.initial_investment, tail, confidence
+            )
+            converged = ((var_half_width is None or achieved_var <= var_half_width)
+                         and (cvar_relative_error is None or achieved_cvar <= cvar_relative_error))
+            elapsed = time.perf_counter() - started
+            if converged:
+                stop_reason = 'target'
+            elif num_simulations >= max_paths:
+                stop_reason = 'max_paths'
+            elif max_seconds is not None and elapsed >= max_seconds:
+                stop_reason = 'max_seconds'
+            else:
+                continue
+            return PrecisionResult(
+                final_portfolio_values=final_portfolio_values,
+                num_simulations=num_simulations,
+                var=var,
+                var_half_width=achieved_var,
+                cvar=cvar,
+                cvar_relative_error=achieved_cvar,
+                converged=converged,
+                stop_reason=stop_reason,
+                seconds=elapsed,
+            )
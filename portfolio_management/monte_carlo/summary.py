@@ -0,0 +1,105 @@
+import numpy as np
+from portfolio_management.utils.metrics import max_drawdowns
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+class SimulationSummary:
+    def __init__(self, initial_investment, final_portfolio_values, percentile_bands,
+                 mean_path, sample_paths, max_drawdowns):
+        self.initial_investment = initial_investment
+        self.final_portfolio_values = final_portfolio_values
+        self.percentile_bands = percentile_bands
+        self.mean_path = mean_path
+        self.sample_paths = sample_paths
+        self.max_drawdowns = max_drawdowns
+
+    @property
+    def num_simulations(self):
+        return len(self.final_portfolio_values)
+
+    @property
+    def time_horizon(self):
+        return len(self.mean_path)
+
+
+class StreamingSummary:
+    # Per-timestep percentiles are read from fixed-width histograms, so memory
+    # grows with time_horizon * num_bins rather than with the number of paths.
+    # Bin edges are set from a pilot of the first `pilot_paths` paths (blocks
+    # are buffered until there are that many, however small the chunks),
+    # widened by its spread on each side; later values outside that range
+    # fall into the edge bins.
+
+    def __init__(self, num_simulations, time_horizon, initial_investment,
+                 percentiles=DEFAULT_PERCENTILES, num_sample_paths=100, num_bins=2000, pilot_paths=1000):
+        self.time_horizon = time_horizon
+        self.initial_investment = initial_investment
+        self.percentiles = tuple(percentiles)
+        self.num_bins = num_bins
+        self.final_portfolio_values = np.empty(num_simulations)
+        self.max_drawdowns = np.empty(num_simulations)
+        self.sample_paths = np.empty((time_horizon, min(num_sample_paths, num_simulations)))
+        self._path_sum = np.zeros(time_horizon)
+        self._counts = np.zeros(time_horizon * num_bins, dtype=np.int64)
+        self._lower = None
+        self._width = None
+        self._pilot_paths = min(pilot_paths, num_simulations)
+        self._pilot = []
+        self._seen = 0
+
+    def update(self, paths):
+        num_paths = paths.shape[1]
+        start, stop = self._seen, self._seen + num_paths
+        self.final_portfolio_values[start:stop] = paths[-1]
+        self.max_drawdowns[start:stop] = max_drawdowns(paths, self.initial_investment)
+        if start < self.sample_paths.shape[1]:
+            taken = min(num_paths, self.sample_paths.shape[1] - start)
+            self.sample_paths[:, start:start + taken] = paths[:, :taken]
+        self._path_sum += paths.sum(axis=1)
+        self._seen = stop
+        if self._lower is not None:
+            self._update_histograms(paths)
+            return
+        self._pilot.append(np.array(paths, dtype=float))
+        if self._seen >= self._pilot_paths:
+            self._end_pilot()
+
+    def _end_pilot(self):
+        pilot = np.concatenate(self._pilot, axis=1)
+        self._pilot = []
+        low, high = pilot.min(axis=1), pilot.max(axis=1)
+        spread = np.maximum(high - low, 1e-12 * np.maximum(np.abs(high), 1))
+        self._lower = low - spread
+        self._width = 3 * spread / self.num_bins
+        self._update_histograms(pilot)
+
+    def _update_histograms(self, paths):
+        bins = ((paths - self._lower[:, None]) / self._width[:, None]).astype(np.int64)
+        np.clip(bins, 0, self.num_bins - 1, out=bins)
+        bins += (np.arange(self.time_horizon) * self.num_bins)[:, None]
+        self._counts += np.bincount(bins.ravel(), minlength=self._counts.size)
+
+    def _percentile_band(self, percentile):
+        counts = self._counts.reshape(self.time_horizon, self.num_bins)
+        cumulative = np.cumsum(counts, axis=1)
+        target = percentile / 100 * self._seen
+        bins = np.minimum((cumulative < target).sum(axis=1), self.num_bins - 1)
+        rows = np.arange(self.time_horizon)
+        below = np.where(bins > 0, cumulative[rows, np.maximum(bins - 1, 0)], 0)
+        in_bin = np.maximum(counts[rows, bins], 1)
+        fraction = np.clip((target - below) / in_bin, 0, 1)
+        return self._lower + (bins + fraction) * self._width
+
+    def result(self):
+        if self._pilot:
+            self._end_pilot()
+        seen = self._seen
+        return SimulationSummary(
+            initial_investment=self.initial_investment,
+            final_portfolio_values=self.final_portfolio_values[:seen],
+            percentile_bands={p: self._percentile_band(p) for p in self.percentiles},
+            mean_path=self._path_sum / max(seen, 1),
+            sample_paths=self.sample_paths[:, :min(seen, self.sample_paths.shape[1])],
+            max_drawdowns=self.max_drawdowns[:seen],
+        )
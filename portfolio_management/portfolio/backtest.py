@@ -0,0 +1,116 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from portfolio_management.portfolio.optimizer import PortfolioOptimizer
+from portfolio_management.portfolio.statistics import TRADING_DAYS, ReturnStatistics
+from portfolio_management.utils.metrics import max_drawdowns
+
+STRATEGIES = ('max_sharpe', 'min_volatility', 'equal_weight')
+
+
+@dataclass
+class BacktestResult:
+    equity: pd.Series  # portfolio value net of costs, from the first rebalance date
+    returns: pd.Series  # out-of-sample daily returns net of costs
+    weights: pd.DataFrame  # target weights, one row per rebalance date
+    turnover: pd.Series  # per rebalance date, traded value as a fraction of the portfolio
+    costs: pd.Series  # per rebalance date, costs paid as a fraction of the portfolio
+    iterations: np.ndarray  # solver iterations per rebalance
+
+    def summary(self, periods_per_year=TRADING_DAYS):
+        years = len(self.returns) / periods_per_year
+        volatility = self.returns.std() * np.sqrt(periods_per_year)
+        annualized_return = (self.equity.iloc[-1] / self.equity.iloc[0]) ** (1 / years) - 1
+        return {
+            'annualized_return': float(annualized_return),
+            'annualized_volatility': float(volatility),
+            'sharpe_ratio': float(self.returns.mean() * periods_per_year / volatility),
+            'max_drawdown': float(max_drawdowns(self.equity.values, self.equity.iloc[0])),
+            'average_turnover': float(self.turnover.mean()),
+            'total_costs': float(self.costs.sum()),
+        }
+
+
+def _shrink(covariance_matrix, shrinkage):
+    # Blend towards a diagonal of the average variance; needed when the
+    # window is shorter than the number of assets and the sample covariance
+    # is singular
+    if not shrinkage:
+        return covariance_matrix
+    average_variance = np.trace(covariance_matrix) / len(covariance_matrix)
+    shrunk = covariance_matrix * (1 - shrinkage)
+    shrunk[np.diag_indices_from(shrunk)] += shrinkage * average_variance
+    return shrunk
+
+
+def walk_forward(returns, window=TRADING_DAYS, rebalance_every=1, strategy='max_sharpe', method='qp',
+                 risk_free_rate=0.0, target_return=None, transaction_cost=0.001, shrinkage=0.0,
+                 initial_value=1.0, periods_per_year=TRADING_DAYS):
+    # Walk-forward backtest on daily returns (e.g. Portfolio.returns). Every
+    # `rebalance_every` days the mean and covariance of the last `window`
+    # days are estimated, the optimizer is re-run warm-started from the
+    # previous target weights, and the portfolio trades from its drifted
+    # weights to the new target at the close. The new weights earn the
+    # following days' returns, so the equity curve is out of sample.
+    # transaction_cost is charged per unit of traded value (0.001 = 10 bps);
+    # the first rebalance buys the whole portfolio from cash.
+    #
+    # The window statistics slide incrementally (ReturnStatistics.rolling)
+    # and the loop works on arrays, so a step costs O(n^2) plus the solve.
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}', expected one of {STRATEGIES}")
+    values = np.asarray(returns, dtype=float)
+    num_days, num_assets = values.shape
+    if num_days <= window:
+        raise ValueError(f"Need more than window={window} days of returns, got {num_days}")
+
+    rebalance_ends = range(window, num_days, rebalance_every)
+    target_weights = np.empty((len(rebalance_ends), num_assets))
+    turnover = np.empty(len(rebalance_ends))
+    iterations = np.zeros(len(rebalance_ends), dtype=int)
+    daily_returns = np.empty(num_days - window)
+
+    holdings = np.zeros(num_assets)  # drifted weights, starting from cash
+    target = None
+    windows = ReturnStatistics.rolling(values, window, step=rebalance_every)
+    for i, (end, (_, statistics)) in enumerate(zip(rebalance_ends, windows)):
+        if strategy == 'equal_weight':
+            target = np.full(num_assets, 1.0 / num_assets)
+        else:
+            expected_returns, covariance_matrix = statistics.moments(periods_per_year)
+            optimizer = PortfolioOptimizer(expected_returns, _shrink(covariance_matrix, shrinkage), risk_free_rate)
+            if strategy == 'max_sharpe':
+                target = optimizer.maximize_sharpe_ratio(method=method, x0=target)
+            else:
+                target = optimizer.minimize_volatility(target_return, method=method, x0=target)
+            target = np.maximum(target, 0)
+            target /= target.sum()
+            iterations[i] = optimizer.last_iterations or 0
+        target_weights[i] = target
+        turnover[i] = np.abs(target - holdings).sum()
+
+        # Buy and hold the target until the next rebalance
+        stop = min(end + rebalance_every, num_days)
+        asset_growth = np.cumprod(1 + values[end:stop], axis=0)
+        portfolio_growth = asset_growth @ target
+        net_growth = portfolio_growth * (1 - transaction_cost * turnover[i])
+        daily_returns[end - window:stop - window] = net_growth / np.concatenate([[1.0], net_growth[:-1]]) - 1
+        holdings = target * asset_growth[-1] / portfolio_growth[-1]
+
+    index = returns.index if isinstance(returns, pd.DataFrame) else pd.RangeIndex(num_days)
+    assets = returns.columns if isinstance(returns, pd.DataFrame) else None
+    rebalance_dates = index[[end - 1 for end in rebalance_ends]]
+    net_returns = pd.Series(daily_returns, index=index[window:])
+    equity = pd.concat([
+        pd.Series([float(initial_value)], index=index[window - 1:window]),
+        initial_value * (1 + net_returns).cumprod(),
+    ])
+    return BacktestResult(
+        equity=equity,
+        returns=net_returns,
+        weights=pd.DataFrame(target_weights, index=rebalance_dates, columns=assets),
+        turnover=pd.Series(turnover, index=rebalance_dates),
+        costs=pd.Series(transaction_cost * turnover, index=rebalance_dates),
+        iterations=iterations,
+    )
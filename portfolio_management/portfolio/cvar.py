@@ -0,0 +1,106 @@
+from dataclasses import dataclass
+
+import numpy as np
+from scipy import sparse
+from scipy.optimize import linprog
+
+# Scenario columns written per block while assembling the constraint matrix
+DEFAULT_CHUNK_SCENARIOS = 8192
+
+
+@dataclass
+class CVaRResult:
+    weights: np.ndarray
+    var: float  # loss quantile, as a fraction of the investment
+    cvar: float  # mean loss beyond it
+    success: bool
+    num_scenarios: int
+    message: str = ''
+
+
+def constraint_matrix(scenarios, extra_columns, chunk_size=DEFAULT_CHUNK_SCENARIOS):
+    # [column s = [1; r_s] for every scenario | extra_columns] in CSC form.
+    # Every scenario column holds exactly num_assets + 1 entries, so the
+    # arrays of the whole matrix are allocated once and the scenarios are
+    # copied into them a block at a time: the matrix is the only copy made,
+    # with no dense or sparse intermediates.
+    num_scenarios, num_assets = scenarios.shape
+    column_length = num_assets + 1
+    scenario_entries = num_scenarios * column_length
+    data = np.empty(scenario_entries + extra_columns.nnz)
+    indices = np.empty(len(data), dtype=np.int32)
+    scenario_data = data[:scenario_entries].reshape(num_scenarios, column_length)
+    scenario_indices = indices[:scenario_entries].reshape(num_scenarios, column_length)
+    for start in range(0, num_scenarios, chunk_size):
+        stop = min(start + chunk_size, num_scenarios)
+        scenario_data[start:stop, 0] = 1.0
+        scenario_data[start:stop, 1:] = scenarios[start:stop]
+        scenario_indices[start:stop] = np.arange(column_length)
+    data[scenario_entries:] = extra_columns.data
+    indices[scenario_entries:] = extra_columns.indices
+    indptr = np.concatenate([
+        np.arange(0, scenario_entries, column_length, dtype=np.int64),
+        scenario_entries + extra_columns.indptr.astype(np.int64),
+    ])
+    return sparse.csc_matrix((data, indices, indptr), shape=(column_length, num_scenarios + extra_columns.shape[1]))
+
+
+def min_cvar_portfolio(scenarios, tail=0.05, target_return=None, expected_returns=None, bounds=(0, 1),
+                       max_scenarios=None, seed=None, chunk_size=DEFAULT_CHUNK_SCENARIOS):
+    # Rockafellar-Uryasev: the CVaR of the loss -r'w over the worst `tail` of
+    # S equally likely scenarios is
+    #   min_{w, alpha, u}  alpha + sum(u) / (tail * S)
+    #   s.t.  u_s >= -r_s'w - alpha,  u >= 0,  sum(w) = 1,  mu'w >= target,  l <= w <= h
+    # with alpha the VaR at the optimum. That LP has a row per scenario; its
+    # dual has one row per asset plus one, and a bounded variable per scenario:
+    #   max  lambda + target * eta - h'nu + l'xi
+    #   s.t. sum(p) = 1,  R'p + lambda + eta * mu - nu + xi = 0,
+    #        0 <= p <= 1 / (tail * S),  eta, nu, xi >= 0
+    # which HiGHS solves far faster. The weights and VaR are read back from
+    # the multipliers of its equality rows.
+    #
+    # `scenarios` holds per-asset returns over the horizon, (num_scenarios,
+    # num_assets), e.g. simulated final growth minus one; the target applies
+    # to expected_returns, which default to the mean scenario.
+    scenarios = np.asarray(scenarios)
+    if expected_returns is None:
+        expected_returns = scenarios.mean(axis=0)
+    expected_returns = np.asarray(expected_returns, dtype=float)
+    if max_scenarios is not None and len(scenarios) > max_scenarios:
+        rows = np.sort(np.random.default_rng(seed).choice(len(scenarios), max_scenarios, replace=False))
+        scenarios = scenarios[rows]
+    num_scenarios, num_assets = scenarios.shape
+    lower, upper = (np.broadcast_to(np.asarray(bound, dtype=float), num_assets) for bound in bounds)
+
+    # Columns: p (one per scenario), lambda, eta (only with a target), then
+    # nu and xi for the finite upper and lower weight bounds
+    columns = [sparse.csc_matrix(np.r_[0.0, np.ones(num_assets)][:, None])]
+    objective = [np.zeros(num_scenarios), [1.0]]
+    variable_bounds = [np.tile([0.0, 1.0 / (tail * num_scenarios)], (num_scenarios, 1)), [[-np.inf, np.inf]]]
+    if target_return is not None:
+        columns.append(sparse.csc_matrix(np.r_[0.0, expected_returns][:, None]))
+        objective.append([target_return])
+        variable_bounds.append([[0.0, np.inf]])
+    for sign, bound in ((-1.0, upper), (1.0, lower)):
+        finite = np.flatnonzero(np.isfinite(bound))
+        columns.append(sparse.csc_matrix(
+            (np.full(len(finite), sign), (finite + 1, np.arange(len(finite)))), shape=(num_assets + 1, len(finite))
+        ))
+        objective.append(sign * bound[finite])
+        variable_bounds.append(np.tile([0.0, np.inf], (len(finite), 1)))
+
+    result = linprog(
+        -np.concatenate(objective), A_eq=constraint_matrix(scenarios, sparse.hstack(columns, format='csc'), chunk_size),
+        b_eq=np.r_[1.0, np.zeros(num_assets)], bounds=np.vstack(variable_bounds), method='highs'
+    )
+    if result.status != 0:
+        return CVaRResult(np.full(num_assets, np.nan), np.nan, np.nan, False, num_scenarios, result.message)
+    multipliers = -result.eqlin.marginals
+    return CVaRResult(
+        weights=np.clip(multipliers[1:], lower, upper),
+        var=float(multipliers[0]),
+        cvar=float(-result.fun),
+        success=True,
+        num_scenarios=num_scenarios,
+        message=result.message,
+    )
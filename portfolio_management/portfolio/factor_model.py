@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+from portfolio_management.portfolio.statistics import TRADING_DAYS
+from portfolio_management.utils.linalg import covariance_root
+
+# Floor on idiosyncratic variances, relative to the average asset variance,
+# so the model covariance stays positive definite
+MIN_SPECIFIC_VARIANCE = 1e-6
+
+
+def _top_singular_vectors(matrix, rank, oversampling=10, power_iterations=4):
+    # Thin SVD, or for a low rank the randomized range finder of Halko,
+    # Martinsson & Tropp: O(T n k) instead of O(T n min(T, n)). The test
+    # matrix is seeded, so a given input always gives the same model.
+    if rank + oversampling >= min(matrix.shape):
+        return np.linalg.svd(matrix, full_matrices=False)
+    test_matrix = np.random.default_rng(0).standard_normal((matrix.shape[1], rank + oversampling))
+    basis, _ = np.linalg.qr(matrix @ test_matrix)
+    for _ in range(power_iterations):
+        basis, _ = np.linalg.qr(matrix.T @ basis)
+        basis, _ = np.linalg.qr(matrix @ basis)
+    left, singular_values, components = np.linalg.svd(basis.T @ matrix, full_matrices=False)
+    return basis @ left, singular_values, components
+
+
+class FactorModel:
+    # Covariance of n assets as B F B' + diag(d): loadings B (n x k), factor
+    # covariance F (k x k) and idiosyncratic variances d (n,). Products with
+    # the covariance and Gaussian draws from it cost O(n k) instead of O(n^2),
+    # and the model is positive definite even when there are fewer
+    # observations than assets.
+
+    def __init__(self, loadings, factor_covariance, specific_variance, assets=None):
+        self.loadings = np.asarray(loadings, dtype=float)
+        self.factor_covariance = np.atleast_2d(np.asarray(factor_covariance, dtype=float))
+        self.specific_variance = np.asarray(specific_variance, dtype=float)
+        self.assets = list(assets) if assets is not None else list(range(len(self.specific_variance)))
+        self._simulation_factors = None
+
+    @property
+    def num_factors(self):
+        return self.loadings.shape[1]
+
+    def __len__(self):
+        return len(self.specific_variance)
+
+    @staticmethod
+    def _floor(specific_variance, total_variance):
+        return np.maximum(specific_variance, MIN_SPECIFIC_VARIANCE * np.mean(total_variance))
+
+    @classmethod
+    def from_pca(cls, returns, num_factors):
+        # Statistical factors: the top principal components of the sample
+        # covariance, from an SVD of the demeaned returns. The factors are
+        # scaled to unit variance, so F is the identity.
+        values = np.asarray(returns, dtype=float)
+        num_observations, num_assets = values.shape
+        num_factors = min(num_factors, num_assets, num_observations - 1)
+        deviations = (values - values.mean(axis=0)) / np.sqrt(num_observations - 1)
+        _, singular_values, components = _top_singular_vectors(deviations, num_factors)
+        loadings = components[:num_factors].T * singular_values[:num_factors]
+        total_variance = np.einsum('ij,ij->j', deviations, deviations)
+        specific_variance = cls._floor(total_variance - np.einsum('ij,ij->i', loadings, loadings), total_variance)
+        return cls(loadings, np.eye(num_factors), specific_variance, assets=getattr(returns, 'columns', None))
+
+    @classmethod
+    def from_factors(cls, returns, factor_returns):
+        # User-supplied factors (market, sectors, styles, ...): loadings from
+        # a least-squares regression of each asset on the factor returns over
+        # the same days, residual variances as the idiosyncratic term
+        values = np.asarray(returns, dtype=float)
+        factors = np.asarray(factor_returns, dtype=float).reshape(len(values), -1)
+        num_observations = len(values)
+        deviations = values - values.mean(axis=0)
+        factor_deviations = factors - factors.mean(axis=0)
+        coefficients, *_ = np.linalg.lstsq(factor_deviations, deviations, rcond=None)
+        residuals = deviations - factor_deviations @ coefficients
+        degrees_of_freedom = max(num_observations - factors.shape[1] - 1, 1)
+        specific_variance = cls._floor(
+            np.einsum('ij,ij->j', residuals, residuals) / degrees_of_freedom,
+            np.einsum('ij,ij->j', deviations, deviations) / (num_observations - 1),
+        )
+        factor_covariance = factor_deviations.T @ factor_deviations / (num_observations - 1)
+        return cls(coefficients.T, factor_covariance, specific_variance, assets=getattr(returns, 'columns', None))
+
+    def scaled(self, periods_per_year=TRADING_DAYS):
+        # The model of returns over `periods_per_year` days, e.g. annualized
+        return FactorModel(self.loadings, self.factor_covariance * periods_per_year,
+                           self.specific_variance * periods_per_year, self.assets)
+
+    @property
+    def covariance(self):
+        # Dense n x n matrix, for reporting and for solvers that need it
+        covariance = self.loadings @ self.factor_covariance @ self.loadings.T
+        covariance[np.diag_indices_from(covariance)] += self.specific_variance
+        return pd.DataFrame(covariance, index=self.assets, columns=self.assets)
+
+    def dot(self, weights):
+        # Covariance times weights (a vector, or one column per portfolio)
+        weights = np.asarray(weights, dtype=float)
+        specific = self.specific_variance if weights.ndim == 1 else self.specific_variance[:, None]
+        return self.loadings @ (self.factor_covariance @ (self.loadings.T @ weights)) + specific * weights
+
+    def variance(self, weights):
+        weights = np.asarray(weights, dtype=float)
+        exposures = self.loadings.T @ weights
+        return exposures @ self.factor_covariance @ exposures + self.specific_variance @ weights ** 2
+
+    @property
+    def simulation_factors(self):
+        # (n x k loadings on unit-variance factor shocks, n idiosyncratic
+        # volatilities): B chol(F) z + sqrt(d) e has covariance B F B' + diag(d)
+        if self._simulation_factors is None:
+            factor_root = covariance_root(self.factor_covariance)
+            self._simulation_factors = (self.loadings @ factor_root, np.sqrt(self.specific_variance))
+        return self._simulation_factors
@@ -0,0 +1,163 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import linprog, minimize
+from portfolio_management.portfolio.qp import solve_qp
+
+
+@dataclass
+class EfficientFrontier:
+    target_returns: np.ndarray
+    weights: np.ndarray  # one row per frontier point
+    returns: np.ndarray
+    volatilities: np.ndarray
+    sharpe_ratios: np.ndarray
+    converged: np.ndarray
+    assets: list = None
+
+    def __len__(self):
+        return len(self.target_returns)
+
+    @property
+    def max_sharpe_index(self):
+        return int(np.nanargmax(np.where(self.converged, self.sharpe_ratios, np.nan)))
+
+    def to_frame(self):
+        frame = pd.DataFrame({
+            'target_return': self.target_returns,
+            'return': self.returns,
+            'volatility': self.volatilities,
+            'sharpe_ratio': self.sharpe_ratios,
+            'converged': self.converged,
+        })
+        weights = pd.DataFrame(self.weights, columns=self.assets)
+        return pd.concat([frame, weights], axis=1)
+
+
+class FrontierProblem:
+    # Long-only min-variance problem with the constraint matrix, bounds and
+    # SLSQP fallback constraints built once; only the target return changes
+    # between solves of a sweep.
+
+    def __init__(self, expected_returns, covariance_matrix, bounds=(0, 1)):
+        self.expected_returns = np.asarray(expected_returns, dtype=float)
+        self.covariance_matrix = np.asarray(covariance_matrix, dtype=float)
+        num_assets = len(self.expected_returns)
+        self.lower = np.full(num_assets, float(bounds[0]))
+        self.upper = np.full(num_assets, float(bounds[1]))
+        self.equality_matrix = np.vstack([np.ones(num_assets), self.expected_returns])
+        self.target_return = None
+        self.nit = None  # iterations of the last solve
+        ones = np.ones(num_assets)
+        self.slsqp_bounds = list(zip(self.lower, self.upper))
+        self.slsqp_constraints = [
+            {'type': 'eq', 'fun': lambda w: np.sum(w) - 1, 'jac': lambda w: ones},
+            {'type': 'eq', 'fun': lambda w: w @ self.expected_returns - self.target_return,
+             'jac': lambda w: self.expected_returns},
+        ]
+
+    def _variance(self, weights):
+        gradient = self.covariance_matrix @ weights
+        return weights @ gradient, 2 * gradient
+
+    def _solve_slsqp(self, x0, target_return):
+        self.target_return = target_return
+        constraints = self.slsqp_constraints if target_return is not None else self.slsqp_constraints[:1]
+        result = minimize(
+            self._variance, x0=x0, jac=True, method='SLSQP',
+            bounds=self.slsqp_bounds, constraints=constraints, options={'maxiter': 500, 'ftol': 1e-12}
+        )
+        self.nit = result.nit
+        return result.x, result.success
+
+    def solve(self, x0, target_return=None):
+        # x0 only needs to respect the bounds; the equality rows are restored by the solver
+        if target_return is None:
+            A, b = self.equality_matrix[:1], np.array([1.0])
+        else:
+            A, b = self.equality_matrix, np.array([1.0, target_return])
+        result = solve_qp(self.covariance_matrix, None, A, b, self.lower, self.upper, x0)
+        self.nit = result.nit
+        if result.success:
+            return result.x, True
+        return self._solve_slsqp(x0, target_return)
+
+    def sparse_start(self, target_return=None):
+        # A vertex of the feasible set tilted towards low-variance assets: the
+        # active-set solve then grows the support from a few assets instead
+        # of shrinking it from all of them
+        num_assets = len(self.expected_returns)
+        A, b = (self.equality_matrix[:1], [1.0]) if target_return is None else (self.equality_matrix, [1.0, target_return])
+        result = linprog(np.diag(self.covariance_matrix), A_eq=A, b_eq=b, bounds=self.slsqp_bounds, method='highs')
+        if result.status != 0:
+            return np.clip(np.ones(num_assets) / num_assets, self.lower, self.upper)
+        return result.x
+
+    def max_return_portfolio(self):
+        num_assets = len(self.expected_returns)
+        result = linprog(-self.expected_returns, A_eq=np.ones((1, num_assets)), b_eq=[1],
+                         bounds=self.slsqp_bounds, method='highs')
+        return result.x
+
+    def sweep(self, target_returns, x0, x_max_return):
+        # Each start blends the previous solution with the max-return
+        # portfolio just enough to hit the next target, which keeps it
+        # feasible and close to the new optimum
+        weights = np.empty((len(target_returns), len(x0)))
+        converged = np.zeros(len(target_returns), dtype=bool)
+        mu = self.expected_returns
+        for i, target_return in enumerate(target_returns):
+            current_return, max_return = x0 @ mu, x_max_return @ mu
+            theta = 0.0 if max_return <= current_return else (target_return - current_return) / (max_return - current_return)
+            start = x0 + np.clip(theta, 0.0, 1.0) * (x_max_return - x0)
+            weights[i], converged[i] = self.solve(start, target_return)
+            if converged[i]:
+                x0 = weights[i]
+        return weights, converged
+
+
+def _sweep_segment(expected_returns, covariance_matrix, bounds, target_returns, x0, x_max_return):
+    return FrontierProblem(expected_returns, covariance_matrix, bounds).sweep(target_returns, x0, x_max_return)
+
+
+def efficient_frontier(expected_returns, covariance_matrix, n_points=50, risk_free_rate=0.0,
+                       bounds=(0, 1), n_workers=None):
+    assets = list(expected_returns.index) if isinstance(expected_returns, pd.Series) else None
+    problem = FrontierProblem(expected_returns, covariance_matrix, bounds)
+    mu = problem.expected_returns
+
+    # The frontier runs from the global minimum-variance portfolio to the
+    # highest attainable return
+    x_min_variance, _ = problem.solve(problem.sparse_start())
+    x_max_return = problem.max_return_portfolio()
+    target_returns = np.linspace(x_min_variance @ mu, x_max_return @ mu, n_points)
+
+    if n_workers is None or n_workers <= 1 or n_points < 2 * n_workers:
+        weights, converged = problem.sweep(target_returns, x_min_variance, x_max_return)
+    else:
+        # Each worker sweeps a contiguous segment, warm-starting within it
+        segments = np.array_split(target_returns, n_workers)
+        with ProcessPoolExecutor(n_workers) as executor:
+            futures = [
+                executor.submit(_sweep_segment, mu, problem.covariance_matrix, bounds, segment,
+                                x_min_variance, x_max_return)
+                for segment in segments
+            ]
+            results = [future.result() for future in futures]
+        weights = np.vstack([segment_weights for segment_weights, _ in results])
+        converged = np.concatenate([segment_converged for _, segment_converged in results])
+
+    returns = weights @ mu
+    volatilities = np.sqrt(np.einsum('ij,jk,ik->i', weights, problem.covariance_matrix, weights))
+    sharpe_ratios = (returns - risk_free_rate) / volatilities
+    return EfficientFrontier(
+        target_returns=target_returns,
+        weights=weights,
+        returns=returns,
+        volatilities=volatilities,
+        sharpe_ratios=sharpe_ratios,
+        converged=converged,
+        assets=assets,
+    )
@@ -1,13 +1,57 @@
 import numpy as np
 from scipy.optimize import minimize
+from portfolio_management.portfolio.cvar import min_cvar_portfolio
+from portfolio_management.portfolio.factor_model import FactorModel
+from portfolio_management.portfolio.frontier import FrontierProblem, efficient_frontier
+from portfolio_management.portfolio.qp import solve_qp
+
+METHODS = ('slsqp', 'qp')
+
+
+def covariance_product(covariance_matrix, weights):
+    # Covariance times weights, in O(n k) for a FactorModel
+    if isinstance(covariance_matrix, FactorModel):
+        return covariance_matrix.dot(weights)
+    return np.dot(covariance_matrix, weights)
+
 
 class PortfolioOptimizer:
     def __init__(self, expected_returns, covariance_matrix, risk_free_rate=0.0):
+        # covariance_matrix may be a FactorModel (annualized, see
+        # FactorModel.scaled): SLSQP then evaluates volatilities and their
+        # gradients in O(n k); the QP and frontier solvers use its dense form
         self.expected_returns = expected_returns
         self.covariance_matrix = covariance_matrix
         self.risk_free_rate = risk_free_rate
+        self.last_iterations = None  # solver iterations of the last optimization
+
+    @classmethod
+    def from_statistics(cls, statistics, risk_free_rate=0.0, periods_per_year=252, factor_model=None):
+        # factor_model, a daily FactorModel, replaces the sample covariance
+        expected_returns, covariance_matrix = statistics.annualized(periods_per_year)
+        if factor_model is not None:
+            covariance_matrix = factor_model.scaled(periods_per_year)
+        return cls(expected_returns, covariance_matrix, risk_free_rate=risk_free_rate)
+
+    @property
+    def dense_covariance(self):
+        if isinstance(self.covariance_matrix, FactorModel):
+            return self.covariance_matrix.covariance
+        return self.covariance_matrix
+
+    @staticmethod
+    def _check_method(method):
+        if method not in METHODS:
+            raise ValueError(f"Unknown optimization method '{method}', expected one of {METHODS}")
+
+    def maximize_sharpe_ratio(self, method='slsqp', x0=None):
+        # x0, e.g. the weights of a previous solve on nearby inputs, warm-starts the solver
+        self._check_method(method)
+        if method == 'qp':
+            weights = self._max_sharpe_qp(x0)
+            if weights is not None:
+                return weights
 
-    def maximize_sharpe_ratio(self):
         num_assets = len(self.expected_returns)
         args = (self.expected_returns, self.covariance_matrix, self.risk_free_rate)
         constraints = {'type': 'eq', 'fun': lambda weights: np.sum(weights) - 1}
@@ -15,40 +59,111 @@ class PortfolioOptimizer:
 
         result = minimize(
             self._neg_sharpe_ratio,
-            x0=num_assets * [1.0 / num_assets],
+            x0=num_assets * [1.0 / num_assets] if x0 is None else x0,
             args=args,
             method='SLSQP',
+            jac=self._neg_sharpe_ratio_gradient,
             bounds=bounds,
             constraints=constraints
         )
+        self.last_iterations = result.nit
         return result.x
 
-    def minimize_volatility(self, target_return):
+    def minimize_volatility(self, target_return, method='slsqp', x0=None):
+        # A target_return of None gives the global minimum-variance portfolio
+        self._check_method(method)
         num_assets = len(self.expected_returns)
+        if method == 'qp':
+            problem = FrontierProblem(self.expected_returns, self.dense_covariance)
+            weights, _ = problem.solve(problem.sparse_start(target_return) if x0 is None else x0, target_return)
+            self.last_iterations = problem.nit
+            return weights
+
         args = (self.covariance_matrix,)
-        constraints = (
-            {'type': 'eq', 'fun': lambda weights: np.sum(weights) - 1},
-            {'type': 'eq', 'fun': lambda weights: np.dot(weights, self.expected_returns) - target_return}
-        )
+        constraints = [{'type': 'eq', 'fun': lambda weights: np.sum(weights) - 1}]
+        if target_return is not None:
+            constraints.append(
+                {'type': 'eq', 'fun': lambda weights: np.dot(weights, self.expected_returns) - target_return}
+            )
         bounds = tuple((0, 1) for _ in range(num_assets))
 
         result = minimize(
             self._portfolio_volatility,
-            x0=num_assets * [1.0 / num_assets],
+            x0=num_assets * [1.0 / num_assets] if x0 is None else x0,
             args=args,
             method='SLSQP',
+            jac=self._portfolio_volatility_gradient,
             bounds=bounds,
             constraints=constraints
         )
+        self.last_iterations = result.nit
         return result.x
 
+    def minimize_cvar(self, scenarios, tail=0.05, target_return=None, bounds=(0, 1), max_scenarios=None, seed=None):
+        # Minimizes CVaR over simulated per-asset horizon returns, one row per
+        # scenario (e.g. MonteCarloSimulation.simulate_final_growth(...) - 1).
+        # target_return is a floor on the mean scenario return, so it is on
+        # the horizon of the scenarios, not the annualized expected_returns.
+        # max_scenarios draws a seeded subsample to bound LP size.
+        result = min_cvar_portfolio(
+            scenarios, tail=tail, target_return=target_return, bounds=bounds,
+            max_scenarios=max_scenarios, seed=seed
+        )
+        if not result.success:
+            # e.g. a target above the best achievable mean scenario return
+            raise ValueError(f"CVaR optimization failed: {result.message}")
+        return result.weights
+
+    def _max_sharpe_qp(self, x0=None):
+        # Long-only max-Sharpe as a QP through y = w / k with k > 0 chosen so
+        # that (mu - rf)'y = 1:  min y'Sy  s.t.  (mu - rf)'y = 1, y >= 0,
+        # then w = y / sum(y). Needs at least one asset beating the risk-free rate.
+        excess_returns = np.asarray(self.expected_returns, dtype=float) - self.risk_free_rate
+        best = int(np.argmax(excess_returns))
+        if excess_returns[best] <= 0:
+            return None
+        start = None if x0 is None else np.maximum(np.asarray(x0, dtype=float), 0)
+        if start is not None and start @ excess_returns > 0:
+            # Scaling the given weights onto the constraint keeps their support
+            y0 = start / (start @ excess_returns)
+        else:
+            y0 = np.zeros(len(excess_returns))
+            y0[best] = 1 / excess_returns[best]
+        result = solve_qp(self.dense_covariance, None, excess_returns[None, :], [1.0], 0.0, np.inf, y0)
+        self.last_iterations = result.nit
+        if not result.success:
+            return None
+        return result.x / result.x.sum()
+
+    def efficient_frontier(self, n_points=50, n_workers=None):
+        return efficient_frontier(
+            self.expected_returns,
+            self.dense_covariance,
+            n_points=n_points,
+            risk_free_rate=self.risk_free_rate,
+            n_workers=n_workers
+        )
+
     @staticmethod
     def _neg_sharpe_ratio(weights, expected_returns, covariance_matrix, risk_free_rate):
         portfolio_return = np.dot(weights, expected_returns)
-        portfolio_volatility = np.sqrt(np.dot(weights.T, np.dot(covariance_matrix, weights)))
+        portfolio_volatility = np.sqrt(np.dot(weights, covariance_product(covariance_matrix, weights)))
         sharpe_ratio = (portfolio_return - risk_free_rate) / portfolio_volatility
         return -sharpe_ratio  # Negative because we maximize Sharpe Ratio
 
+    @staticmethod
+    def _neg_sharpe_ratio_gradient(weights, expected_returns, covariance_matrix, risk_free_rate):
+        covariance_weights = covariance_product(covariance_matrix, weights)
+        portfolio_volatility = np.sqrt(np.dot(weights, covariance_weights))
+        excess_return = np.dot(weights, expected_returns) - risk_free_rate
+        return -(np.asarray(expected_returns) / portfolio_volatility
+                 - excess_return * covariance_weights / portfolio_volatility ** 3)
+
     @staticmethod
     def _portfolio_volatility(weights, covariance_matrix):
-        return np.sqrt(np.dot(weights.T, np.dot(covariance_matrix, weights)))
+        return np.sqrt(np.dot(weights, covariance_product(covariance_matrix, weights)))
+
+    @staticmethod
+    def _portfolio_volatility_gradient(weights, covariance_matrix):
+        covariance_weights = covariance_product(covariance_matrix, weights)
+        return covariance_weights / np.sqrt(np.dot(weights, covariance_weights))
@@ -1,9 +1,37 @@
 import pandas as pd
+from portfolio_management.portfolio.statistics import ReturnStatistics
 
 class Portfolio:
     def __init__(self, price_data):
         self.price_data = price_data
         self.returns = None
+        self._statistics = None
 
     def calculate_returns(self):
         self.returns = self.price_data.pct_change().dropna()
+        self._statistics = None
+
+    @property
+    def statistics(self):
+        # Mean and covariance of the daily returns, computed once and shared
+        # by the optimizer and the simulation
+        if self._statistics is None:
+            if self.returns is None:
+                self.calculate_returns()
+            self._statistics = ReturnStatistics.from_returns(self.returns)
+        return self._statistics
+
+    def append_prices(self, new_prices):
+        # Adds price rows after the last one. Only the new returns are
+        # computed, and statistics already built are updated in place.
+        new_prices = new_prices.loc[new_prices.index > self.price_data.index[-1], self.price_data.columns]
+        if new_prices.empty:
+            return self
+        previous = self.price_data.iloc[-1:]
+        self.price_data = pd.concat([self.price_data, new_prices])
+        if self.returns is not None:
+            new_returns = pd.concat([previous, new_prices]).pct_change().iloc[1:].dropna()
+            self.returns = pd.concat([self.returns, new_returns])
+            if self._statistics is not None:
+                self._statistics.update(new_returns)
+        return self
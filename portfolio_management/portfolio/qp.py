@@ -0,0 +1,84 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class QPResult:
+    x: np.ndarray
+    success: bool
+    nit: int
+    multipliers: np.ndarray = None
+
+
+def _solve_kkt(Q_free, A_free, rhs):
+    k, m = A_free.shape[1], A_free.shape[0]
+    kkt = np.zeros((k + m, k + m))
+    kkt[:k, :k] = Q_free
+    kkt[:k, k:] = A_free.T
+    kkt[k:, :k] = A_free
+    try:
+        return np.linalg.solve(kkt, rhs)
+    except np.linalg.LinAlgError:
+        # Too few free variables for the equality rows, or a singular Q block
+        return np.linalg.lstsq(kkt, rhs, rcond=None)[0]
+
+
+def solve_qp(Q, c, A, b, lower, upper, x0, max_iter=None, tol=1e-10):
+    # Primal active-set method for
+    #     min 1/2 x'Qx + c'x   s.t.  Ax = b,  lower <= x <= upper
+    # with Q positive semi-definite. Variables sitting on a bound in x0 start
+    # in the working set, so passing the previous solution of a nearby
+    # problem warm-starts the solve.
+    Q = np.asarray(Q, dtype=float)
+    A = np.atleast_2d(np.asarray(A, dtype=float))
+    b = np.atleast_1d(np.asarray(b, dtype=float))
+    c = np.zeros(len(x0)) if c is None else np.asarray(c, dtype=float)
+    num_vars = len(x0)
+    lower = np.broadcast_to(np.asarray(lower, dtype=float), (num_vars,))
+    upper = np.broadcast_to(np.asarray(upper, dtype=float), (num_vars,))
+    if max_iter is None:
+        max_iter = 10 * num_vars + 50
+
+    x = np.clip(np.asarray(x0, dtype=float), lower, upper)
+    # -1: fixed at lower bound, +1: fixed at upper bound, 0: free
+    side = np.zeros(num_vars, dtype=int)
+    side[x <= lower + tol] = -1
+    side[x >= upper - tol] = 1
+    side[lower == upper] = -1
+
+    multipliers = np.zeros(A.shape[0])
+    for iteration in range(1, max_iter + 1):
+        free = np.flatnonzero(side == 0)
+        gradient = Q @ x + c
+        # The equality rows also absorb any residual, so a start that is
+        # slightly off the constraints is pulled back onto them
+        rhs = np.concatenate([-gradient[free], b - A @ x])
+        solution = _solve_kkt(Q[np.ix_(free, free)], A[:, free], rhs)
+        step, multipliers = solution[:len(free)], solution[len(free):]
+
+        if len(free) == 0 or np.max(np.abs(step)) <= tol * (1 + np.max(np.abs(x[free]))):
+            # Stationary on the working set: release the bound whose
+            # multiplier has the wrong sign, or stop at the optimum
+            reduced = gradient + A.T @ multipliers
+            scale = tol * (1 + np.max(np.abs(gradient)))
+            violation = np.where(side == -1, -reduced, 0) + np.where(side == 1, reduced, 0)
+            violation[lower == upper] = 0
+            candidate = int(np.argmax(violation))
+            if violation[candidate] <= scale:
+                return QPResult(x, True, iteration, multipliers)
+            side[candidate] = 0
+            continue
+
+        x_free = x[free]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratios = np.where(step < 0, (lower[free] - x_free) / step,
+                              np.where(step > 0, (upper[free] - x_free) / step, np.inf))
+        blocking = int(np.argmin(ratios))
+        alpha = min(1.0, max(ratios[blocking], 0.0))
+        x[free] = x_free + alpha * step
+        if alpha < 1.0:
+            index = free[blocking]
+            side[index] = -1 if step[blocking] < 0 else 1
+            x[index] = lower[index] if side[index] == -1 else upper[index]
+    return QPResult(x, False, max_iter, multipliers)
@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+
+class ReturnStatistics:
+    # Sample mean and covariance of daily returns kept as (count, mean,
+    # co-moment matrix). Blocks of rows are merged in with Chan et al.'s
+    # parallel form of Welford's update and can be removed the same way, so
+    # appending a day costs O(n^2) instead of a pass over the whole history.
+
+    def __init__(self, assets, count=0, mean=None, comoment=None):
+        self.assets = list(assets)
+        num_assets = len(self.assets)
+        self.count = int(count)
+        self._mean = np.zeros(num_assets) if mean is None else np.asarray(mean, dtype=float)
+        self._comoment = np.zeros((num_assets, num_assets)) if comoment is None else np.asarray(comoment, dtype=float)
+
+    @staticmethod
+    def _block(returns):
+        values = np.asarray(returns, dtype=float)
+        values = values.reshape(-1, values.shape[-1]) if values.ndim > 1 else values[None, :]
+        count = len(values)
+        if count == 0:
+            return 0, 0.0, 0.0
+        mean = values.mean(axis=0)
+        deviations = values - mean
+        return count, mean, deviations.T @ deviations
+
+    @classmethod
+    def from_returns(cls, returns):
+        assets = returns.columns if isinstance(returns, pd.DataFrame) else range(np.shape(returns)[1])
+        statistics = cls(assets)
+        statistics.update(returns)
+        return statistics
+
+    def copy(self):
+        return ReturnStatistics(self.assets, self.count, self._mean.copy(), self._comoment.copy())
+
+    def _combine(self, count, mean, comoment, sign):
+        if count == 0:
+            return self
+        total = self.count + sign * count
+        if total <= 0:
+            self.count, self._mean, self._comoment = 0, np.zeros_like(self._mean), np.zeros_like(self._comoment)
+            return self
+        if sign > 0:
+            delta = mean - self._mean
+            self._mean = self._mean + delta * (count / total)
+            self._comoment = self._comoment + comoment + np.outer(delta, delta) * (self.count * count / total)
+        else:
+            # Inverse of the merge: recover the statistics of the rows that remain
+            remaining_mean = (self.count * self._mean - count * mean) / total
+            delta = mean - remaining_mean
+            self._comoment = self._comoment - comoment - np.outer(delta, delta) * (total * count / self.count)
+            self._mean = remaining_mean
+        self.count = total
+        return self
+
+    def update(self, returns):
+        # Adds one row or a block of rows of returns
+        return self._combine(*self._block(returns), sign=1)
+
+    def remove(self, returns):
+        # Removes rows that were previously added, e.g. the oldest day of a window
+        return self._combine(*self._block(returns), sign=-1)
+
+    def merge(self, other):
+        return self._combine(other.count, other._mean, other._comoment, sign=1)
+
+    @property
+    def mean(self):
+        return pd.Series(self._mean, index=self.assets)
+
+    @property
+    def covariance(self):
+        # Sample covariance (ddof=1), as DataFrame.cov()
+        covariance = self._comoment / (self.count - 1) if self.count > 1 else np.full_like(self._comoment, np.nan)
+        return pd.DataFrame(covariance, index=self.assets, columns=self.assets)
+
+    def annualized(self, periods_per_year=TRADING_DAYS):
+        # (expected_returns, covariance_matrix) as the optimizer takes them
+        return self.mean * periods_per_year, self.covariance * periods_per_year
+
+    def moments(self, periods_per_year=1):
+        # As annualized, but plain arrays for loops that cannot afford a
+        # Series and DataFrame per step
+        scale = periods_per_year / (self.count - 1) if self.count > 1 else np.nan
+        return self._mean * periods_per_year, self._comoment * scale
+
+    @classmethod
+    def rolling(cls, returns, window, step=1):
+        # Yields (date, statistics of the last `window` rows) every `step`
+        # rows. The window slides by adding the new rows and removing the old
+        # ones; it is rebuilt from scratch once per `window` rows so rounding
+        # from the subtractions never accumulates.
+        values = np.asarray(returns, dtype=float)
+        index = returns.index if isinstance(returns, pd.DataFrame) else np.arange(len(values))
+        assets = returns.columns if isinstance(returns, pd.DataFrame) else range(values.shape[1])
+        statistics, last_rebuild = None, None
+        for end in range(window, len(values) + 1, step):
+            if statistics is None or end - last_rebuild >= window:
+                statistics = cls(assets).update(values[end - window:end])
+                last_rebuild = end
+            else:
+                statistics.update(values[end - step:end])
+                statistics.remove(values[end - step - window:end - window])
+            yield index[end - 1], statistics.copy()
+
+
+class ExponentialStatistics:
+    # Exponentially weighted mean and covariance, updated one row at a time:
+    #     d = x - mean;  mean += alpha * d;  cov = (1 - alpha) * (cov + alpha * d d')
+    # which equals pandas' ewm(alpha=alpha, adjust=False) with bias=True.
+
+    def __init__(self, assets, alpha=None, halflife=None):
+        if (alpha is None) == (halflife is None):
+            raise ValueError("Specify exactly one of alpha and halflife")
+        self.assets = list(assets)
+        self.alpha = alpha if alpha is not None else 1 - 0.5 ** (1 / halflife)
+        self.count = 0
+        self._mean = np.zeros(len(self.assets))
+        self._covariance = np.zeros((len(self.assets), len(self.assets)))
+
+    @classmethod
+    def from_returns(cls, returns, alpha=None, halflife=None):
+        statistics = cls(returns.columns, alpha=alpha, halflife=halflife)
+        statistics.update(returns)
+        return statistics
+
+    def update(self, returns):
+        values = np.asarray(returns, dtype=float)
+        for row in values.reshape(-1, len(self.assets)):
+            if self.count == 0:
+                self._mean = row.copy()
+            else:
+                deviation = row - self._mean
+                self._mean += self.alpha * deviation
+                self._covariance = (1 - self.alpha) * (self._covariance + self.alpha * np.outer(deviation, deviation))
+            self.count += 1
+        return self
+
+    @property
+    def mean(self):
+        return pd.Series(self._mean, index=self.assets)
+
+    @property
+    def covariance(self):
+        return pd.DataFrame(self._covariance, index=self.assets, columns=self.assets)
+
+    def annualized(self, periods_per_year=TRADING_DAYS):
+        return self.mean * periods_per_year, self.covariance * periods_per_year
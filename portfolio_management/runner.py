@@ -0,0 +1,210 @@
+import glob
+import json
+import logging
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from portfolio_management.data.data_loader import DataLoader
+from portfolio_management.data.sources import to_timestamp
+from portfolio_management.monte_carlo.batch import METRIC_COLUMNS
+from portfolio_management.monte_carlo.simulation import MonteCarloSimulation
+from portfolio_management.portfolio.optimizer import PortfolioOptimizer
+from portfolio_management.portfolio.portfolio import Portfolio
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_KEYS = ('tickers', 'start_date', 'end_date')
+
+CONFIG_DEFAULTS = {
+    'initial_investment': 1000,
+    'num_simulations': 10000,
+    'time_horizon': 252,
+    'risk_free_rate': 0.0,
+    'weights': None,
+    'seed': None,
+}
+
+
+def load_configs(path):
+    # A directory of *.json configs (job id: the file name) or a JSONL file
+    # with one config per line (job id: its 'id' key, else the line number)
+    jobs = []
+    if os.path.isdir(path):
+        for file_name in sorted(glob.glob(os.path.join(path, '*.json'))):
+            with open(file_name) as f:
+                config = json.load(f)
+            jobs.append((str(config.get('id', os.path.splitext(os.path.basename(file_name))[0])), config))
+    else:
+        with open(path) as f:
+            for line_number, line in enumerate(f, start=1):
+                if line.strip():
+                    config = json.loads(line)
+                    jobs.append((str(config.get('id', f'line-{line_number}')), config))
+    job_ids = [job_id for job_id, _ in jobs]
+    duplicates = sorted({job_id for job_id in job_ids if job_ids.count(job_id) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate job ids: {', '.join(duplicates)}")
+    return jobs
+
+
+def resolve_weights(config, expected_returns, covariance_matrix):
+    # (weights, description, solver iterations) for a config, as main.py
+    # has always chosen them: optimized, custom or equal
+    optimization = config.get('optimization', {})
+    if optimization.get('optimize', False):
+        optimizer = PortfolioOptimizer(expected_returns, covariance_matrix, risk_free_rate=config['risk_free_rate'])
+        if optimization.get('balanced', True):
+            weights = optimizer.minimize_volatility(target_return=expected_returns.mean())
+            description = 'Optimal Balanced Portfolio Weights'
+        else:
+            weights = optimizer.maximize_sharpe_ratio()
+            description = 'Optimal Portfolio Weights to Maximize Sharpe Ratio'
+        return np.asarray(weights), description, optimizer.last_iterations
+    if config.get('weights'):
+        weights = np.asarray(config['weights'], dtype=float)
+        if len(weights) != len(expected_returns):
+            raise ValueError(f"Got {len(weights)} weights for {len(expected_returns)} tickers")
+        return weights, 'Using Custom Weights', None
+    num_assets = len(expected_returns)
+    return np.full(num_assets, 1.0 / num_assets), 'Using Equal Weights', None
+
+
+def run_job(job_id, config, stock_data):
+    # One config against its slice of the shared prices. Never raises: a
+    # failure becomes a row with status 'failed' so the batch carries on.
+    started = time.perf_counter()
+    row = {'job_id': job_id, 'status': 'ok', 'error': None}
+    try:
+        config = {**CONFIG_DEFAULTS, **config}
+        tickers = list(config['tickers'])
+        missing = [ticker for ticker in tickers if ticker not in stock_data or stock_data[ticker].isna().all()]
+        if missing:
+            raise ValueError(f"No price data for {', '.join(missing)}")
+        portfolio = Portfolio(stock_data[tickers].dropna(how='all'))
+        portfolio.calculate_returns()
+        if len(portfolio.returns) < 2:
+            raise ValueError("Not enough overlapping price history")
+
+        expected_returns, covariance_matrix = portfolio.statistics.annualized()
+        weights, _, iterations = resolve_weights(config, expected_returns, covariance_matrix)
+
+        simulation = MonteCarloSimulation(
+            portfolio.returns, config['initial_investment'], weights, statistics=portfolio.statistics
+        )
+        evaluation = simulation.evaluate_portfolios(
+            weights, int(config['num_simulations']), int(config['time_horizon']), seed=config['seed']
+        )
+        row.update(evaluation.metrics.iloc[0].to_dict())
+        row.update({
+            'tickers': ','.join(tickers),
+            'initial_investment': float(config['initial_investment']),
+            'num_simulations': int(config['num_simulations']),
+            'time_horizon': int(config['time_horizon']),
+            'optimizer_iterations': iterations,
+        })
+        row.update({f'weight_{ticker}': float(weight) for ticker, weight in zip(tickers, weights)})
+    except Exception as e:
+        row.update({'status': 'failed', 'error': f'{type(e).__name__}: {e}'})
+        logger.debug("Job %s failed:\n%s", job_id, traceback.format_exc())
+    row['seconds'] = time.perf_counter() - started
+    return row
+
+
+def read_checkpoint(path):
+    # Rows of finished jobs; a partially written last line is ignored
+    rows = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                rows[row['job_id']] = row
+    return rows
+
+
+def load_shared_prices(jobs, data_loader):
+    # Every distinct ticker is loaded once, over the union of the jobs'
+    # date ranges; each job then slices its own tickers and dates
+    tickers = sorted({ticker for _, config in jobs for ticker in config['tickers']})
+    if not tickers:
+        return pd.DataFrame()
+    start_date = min(pd.Timestamp(config['start_date']) for _, config in jobs)
+    end_date = max(pd.Timestamp(config['end_date']) for _, config in jobs)
+    return data_loader.load_data(tickers, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
+
+
+def write_results(rows, output):
+    frame = pd.DataFrame(rows)
+    leading = [column for column in ('job_id', 'status', 'error', 'tickers') if column in frame]
+    weights = sorted(column for column in frame if column.startswith('weight_'))
+    rest = [column for column in frame if column not in leading and column not in weights]
+    frame = frame[leading + [column for column in METRIC_COLUMNS if column in rest]
+                  + [column for column in rest if column not in METRIC_COLUMNS] + weights]
+    if output.endswith('.parquet'):
+        frame.to_parquet(output, index=False)
+    else:
+        frame.to_csv(output, index=False)
+    return frame
+
+
+def run_batch(configs, output, data_loader=None, n_workers=None, resume=True):
+    # Runs every config and writes one row per job to `output` (.parquet or
+    # .csv). Finished jobs are appended to <output>.checkpoint.jsonl as they
+    # complete, so an interrupted batch picks up where it stopped: jobs that
+    # succeeded are skipped, failed ones are retried.
+    jobs = load_configs(configs) if isinstance(configs, str) else list(configs)
+    checkpoint = output + '.checkpoint.jsonl'
+    done = read_checkpoint(checkpoint) if resume else {}
+    if not resume and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    pending = [(job_id, config) for job_id, config in jobs if done.get(job_id, {}).get('status') != 'ok']
+    logger.info("%d jobs, %d already done, %d to run", len(jobs), len(jobs) - len(pending), len(pending))
+
+    with open(checkpoint, 'a') as f:
+        def record(row):
+            done[row['job_id']] = row
+            f.write(json.dumps(row, default=float) + '\n')
+            f.flush()
+            if row['status'] != 'ok':
+                logger.warning("Job %s failed: %s", row['job_id'], row['error'])
+
+        invalid = [(job_id, [key for key in REQUIRED_KEYS if key not in config]) for job_id, config in pending]
+        for job_id, missing in invalid:
+            if missing:
+                record({'job_id': job_id, 'status': 'failed', 'error': f"Missing config keys: {', '.join(missing)}"})
+        pending = [(job_id, config) for job_id, config in pending if all(key in config for key in REQUIRED_KEYS)]
+
+        if pending:
+            stock_data = load_shared_prices(pending, data_loader if data_loader is not None else DataLoader())
+
+            def job_prices(config):
+                if stock_data.empty:
+                    return stock_data
+                # The end date is exclusive, as in DataLoader.load_data
+                tickers = [ticker for ticker in config['tickers'] if ticker in stock_data]
+                in_range = ((stock_data.index >= to_timestamp(config['start_date']))
+                            & (stock_data.index < to_timestamp(config['end_date'])))
+                return stock_data.loc[in_range, tickers]
+
+            if n_workers is None or n_workers <= 1:
+                for job_id, config in pending:
+                    record(run_job(job_id, config, job_prices(config)))
+            else:
+                with ProcessPoolExecutor(n_workers) as executor:
+                    futures = {executor.submit(run_job, job_id, config, job_prices(config)): job_id
+                               for job_id, config in pending}
+                    for future in as_completed(futures):
+                        try:
+                            row = future.result()
+                        except Exception as e:
+                            # The worker itself died (e.g. out of memory)
+                            row = {'job_id': futures[future], 'status': 'failed', 'error': f'{type(e).__name__}: {e}'}
+                        record(row)
+
+    return write_results([done[job_id] for job_id, _ in jobs if job_id in done], output)
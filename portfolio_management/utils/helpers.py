@@ -1,23 +1,35 @@
 import numpy as np
 import pandas as pd
-import streamlit as st
-import plotly.graph_objs as go
-from plotly.subplots import make_subplots
-from dateutil.relativedelta import relativedelta
+from portfolio_management.utils.metrics import risk_metrics
+
+# streamlit and plotly are imported by the functions that draw, so headless
+# users of the insights (CLI, batch workers, tests) never load them
+
+FAN_PERCENTILES = (5, 25, 50, 75, 95)
 
 def convert_time_steps_to_dates(start_date_str, time_steps):
     # Convert the start date string to a datetime object
     start_date = pd.to_datetime(start_date_str)
-    
-    # Calculate the actual dates
-    actual_dates = [pd.to_datetime(start_date + relativedelta(days=int(step))).strftime('%Y-%m-%d') for step in time_steps]
-    
-    return actual_dates
 
-def plot_interactive_simulation_results(all_cumulative_returns, final_portfolio_values, start_date):
+    # Calculate the actual dates in one vectorized pass
+    actual_dates = (start_date + pd.to_timedelta(np.asarray(time_steps, dtype=int), unit='D')).strftime('%Y-%m-%d')
+
+    return actual_dates.tolist()
+
+def _date_axis_milliseconds(start_date, time_steps):
+    # Plotly date axes accept epoch milliseconds, which serialize as compact
+    # numeric arrays instead of one string per point
+    dates = pd.to_datetime(start_date) + pd.to_timedelta(np.asarray(time_steps, dtype=int), unit='D')
+    return dates.values.astype('datetime64[ms]').astype(np.int64).astype(float)
+
+def build_simulation_figure(all_cumulative_returns, final_portfolio_values, start_date):
+    import plotly.graph_objs as go
+    from plotly.subplots import make_subplots
+
     # Plot cumulative return paths
     num_simulations_to_plot = min(100, all_cumulative_returns.shape[1])  # Limit to avoid clutter
     time_steps = np.arange(all_cumulative_returns.shape[0])
+    dates = convert_time_steps_to_dates(start_date, time_steps)
 
     fig = make_subplots(rows=1, cols=2, subplot_titles=(
         'Monte Carlo Simulation - Cumulative Returns',
@@ -28,7 +40,7 @@ def plot_interactive_simulation_results(all_cumulative_returns, final_portfolio_
     for i in range(num_simulations_to_plot):
         fig.add_trace(
             go.Scatter(
-                x=convert_time_steps_to_dates(start_date, time_steps),
+                x=dates,
                 y=all_cumulative_returns[:, i],
                 mode='lines',
                 line=dict(width=1),
@@ -41,7 +53,6 @@ def plot_interactive_simulation_results(all_cumulative_returns, final_portfolio_
     fig.update_yaxes(title_text='Portfolio Value ($)', row=1, col=1)
 
     # Histogram of Final Portfolio Values
-    hist_data = [final_portfolio_values]
     fig.add_trace(
         go.Histogram(
             x=final_portfolio_values,
@@ -64,35 +75,118 @@ def plot_interactive_simulation_results(all_cumulative_returns, final_portfolio_
     fig.update_yaxes(title_text='Frequency', row=1, col=2)
 
     fig.update_layout(height=500, width=1000)
+    return fig
+
+def build_fan_chart_figure(final_portfolio_values, start_date, all_cumulative_returns=None, summary=None,
+                           num_sample_paths=100, max_time_points=500, num_bins=50):
+    # Percentile bands as a few filled traces, sample paths packed into one
+    # WebGL trace and a server-side binned histogram. Long horizons are
+    # decimated to max_time_points, so the payload does not grow with the
+    # number of paths or days. Pass a SimulationSummary from run_streaming
+    # instead of the full path matrix to skip computing the bands here.
+    import plotly.graph_objs as go
+    from plotly.subplots import make_subplots
 
+    time_horizon = summary.time_horizon if summary is not None else all_cumulative_returns.shape[0]
+    steps = np.unique(np.linspace(0, time_horizon - 1, min(time_horizon, max_time_points)).astype(int))
+    x = _date_axis_milliseconds(start_date, steps)
+    if summary is not None:
+        bands = {percentile: band[steps] for percentile, band in summary.percentile_bands.items()}
+        sample_paths = summary.sample_paths[steps, :num_sample_paths]
+    else:
+        decimated = all_cumulative_returns[steps]
+        bands = dict(zip(FAN_PERCENTILES, np.percentile(decimated, FAN_PERCENTILES, axis=1)))
+        sample_paths = decimated[:, :num_sample_paths]
+
+    fig = make_subplots(rows=1, cols=2, subplot_titles=(
+        'Monte Carlo Simulation - Cumulative Returns',
+        'Distribution of Final Portfolio Values'
+    ))
+
+    if sample_paths.shape[1]:
+        # NaN after each path breaks the line, so all paths form one trace
+        num_paths = sample_paths.shape[1]
+        gap = np.full((1, num_paths), np.nan)
+        fig.add_trace(
+            go.Scattergl(
+                x=np.tile(np.append(x, np.nan), num_paths),
+                y=np.vstack([sample_paths, gap]).T.ravel().astype(np.float32),
+                mode='lines',
+                line=dict(width=1, color='rgba(100, 100, 100, 0.25)'),
+                connectgaps=False,
+                hoverinfo='skip',
+                name='Sample paths'
+            ),
+            row=1,
+            col=1
+        )
+
+    for lower, upper, color in ((5, 95, 'rgba(31, 119, 180, 0.2)'), (25, 75, 'rgba(31, 119, 180, 0.4)')):
+        if lower in bands and upper in bands:
+            fig.add_trace(go.Scatter(x=x, y=bands[lower], mode='lines', line=dict(width=0),
+                                     showlegend=False, hoverinfo='skip'), row=1, col=1)
+            fig.add_trace(go.Scatter(x=x, y=bands[upper], mode='lines', line=dict(width=0),
+                                     fill='tonexty', fillcolor=color, name=f'{lower}th-{upper}th percentile'),
+                          row=1, col=1)
+    if 50 in bands:
+        fig.add_trace(go.Scatter(x=x, y=bands[50], mode='lines', line=dict(color='rgb(31, 119, 180)', width=2),
+                                 name='Median'), row=1, col=1)
+    fig.update_xaxes(title_text='Date', type='date', row=1, col=1)
+    fig.update_yaxes(title_text='Portfolio Value ($)', row=1, col=1)
+
+    counts, edges = np.histogram(final_portfolio_values, bins=num_bins)
+    fig.add_trace(
+        go.Bar(
+            x=(edges[:-1] + edges[1:]) / 2,
+            y=counts,
+            width=np.diff(edges),
+            marker_color='blue',
+            opacity=0.75,
+            showlegend=False
+        ),
+        row=1,
+        col=2
+    )
+    fig.add_vline(x=np.mean(final_portfolio_values), line=dict(color='red', dash='dash'), row=1, col=2)
+    fig.add_vline(x=np.percentile(final_portfolio_values, 5), line=dict(color='green', dash='dash'), row=1, col=2)
+    fig.update_xaxes(title_text='Final Portfolio Value ($)', row=1, col=2)
+    fig.update_yaxes(title_text='Frequency', row=1, col=2)
+
+    fig.update_layout(height=500, width=1000, bargap=0)
+    return fig
+
+def plot_interactive_simulation_results(all_cumulative_returns, final_portfolio_values, start_date, mode='paths', summary=None):
+    if mode == 'fan':
+        fig = build_fan_chart_figure(final_portfolio_values, start_date, all_cumulative_returns, summary=summary)
+    elif mode == 'paths':
+        fig = build_simulation_figure(all_cumulative_returns, final_portfolio_values, start_date)
+    else:
+        raise ValueError(f"Unknown plot mode '{mode}', expected 'paths' or 'fan'")
+    import streamlit as st
     st.plotly_chart(fig)
 
-def get_simulation_insights(sim_results, initial_investment):
-    mean_return = np.mean(sim_results)
-    median_return = np.median(sim_results)
-    std_dev = np.std(sim_results)
-    percentile_5 = np.percentile(sim_results, 5)
-    var_95 = initial_investment - percentile_5  # VaR at 95% confidence
-    cvar_95 = initial_investment - np.mean(sim_results[sim_results <= percentile_5])
-    prob_loss = np.mean(sim_results < initial_investment) * 100
-    sharpe_ratio = (mean_return - initial_investment) / std_dev  # Assuming risk-free rate is 0
-
-    insights = {
-        'Initial Investment': f"${initial_investment:,.2f}",
-        'Expected Final Portfolio Value': f"${mean_return:,.2f}",
-        'Median Final Portfolio Value': f"${median_return:,.2f}",
-        'Standard Deviation of Final Portfolio Value': f"${std_dev:,.2f}",
-        'Value at Risk (VaR 95%)': f"${var_95:,.2f}",
-        'Conditional Value at Risk (CVaR 95%)': f"${cvar_95:,.2f}",
-        'Probability of Loss': f"{prob_loss:.2f}%",
-        'Sharpe Ratio': f"{sharpe_ratio:.4f}"
+def format_insights(metrics, level=0.95):
+    # Presentation layer over utils.metrics.RiskMetrics
+    percent = f"{level * 100:g}%"
+    return {
+        'Initial Investment': f"${metrics.initial_investment:,.2f}",
+        'Expected Final Portfolio Value': f"${metrics.mean:,.2f}",
+        'Median Final Portfolio Value': f"${metrics.median:,.2f}",
+        'Standard Deviation of Final Portfolio Value': f"${metrics.std:,.2f}",
+        f'Value at Risk (VaR {percent})': f"${metrics.var[level]:,.2f}",
+        f'Conditional Value at Risk (CVaR {percent})': f"${metrics.cvar[level]:,.2f}",
+        'Probability of Loss': f"{metrics.probability_of_loss * 100:.2f}%",
+        'Sharpe Ratio': f"{metrics.sharpe_ratio:.4f}"
     }
-    return insights
+
+def get_simulation_insights(sim_results, initial_investment, level=0.95):
+    return format_insights(risk_metrics(sim_results, initial_investment, levels=(level,)), level)
 
 def display_optimal_weights(tickers, weights, streamlit_display=False):
     weights_df = pd.DataFrame({'Ticker': tickers, 'Weight': weights})
     weights_df['Weight'] = weights_df['Weight'].map("{:.4f}".format)
     if streamlit_display:
+        import streamlit as st
         st.table(weights_df)
     else:
         print(weights_df)
@@ -0,0 +1,168 @@
+import json
+import logging
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class _NullSpan:
+    # Shared by every span of a disabled Instrumentation, so an
+    # instrumented stage costs one method call when metrics are off
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+    def count(self, items, unit):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _MemoryTracer:
+    # tracemalloc is process-wide, so the open spans of every Instrumentation
+    # and thread share one tracer. Tracing starts with the first open span
+    # (unless something else already traces) and stops after the last one.
+    # Before the peak is reset for a new span, it is folded into every open
+    # span, so no span loses the high-water mark reached before the reset.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._open = []
+        self._started = False
+
+    def _fold_peak(self):
+        if tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            for span in self._open:
+                span._peak = max(span._peak, peak)
+
+    def enter(self, span):
+        with self._lock:
+            if not self._open and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started = True
+            self._fold_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            span._start_memory = span._peak = current
+            self._open.append(span)
+
+    def exit(self, span):
+        with self._lock:
+            self._fold_peak()
+            self._open.remove(span)
+            span.peak_memory_bytes = span._peak - span._start_memory
+            if not self._open and self._started:
+                tracemalloc.stop()
+                self._started = False
+
+
+_MEMORY_TRACER = _MemoryTracer()
+
+
+class Span:
+    def __init__(self, instrumentation, name, attributes):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.attributes = dict(attributes)
+        self.wall_seconds = None
+        self.cpu_seconds = None
+        self.peak_memory_bytes = None
+        self._counts = []
+        self._peak = 0
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def count(self, items, unit):
+        # Reported as <unit>_per_second once the span closes
+        self._counts.append((items, unit))
+
+    def __enter__(self):
+        self.instrumentation._enter(self)
+        self._started_cpu = time.process_time()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.wall_seconds = time.perf_counter() - self._started
+        self.cpu_seconds = time.process_time() - self._started_cpu
+        for items, unit in self._counts:
+            self.attributes[unit] = items
+            self.attributes[f'{unit}_per_second'] = items / self.wall_seconds if self.wall_seconds > 0 else float('inf')
+        if exc_type is not None:
+            self.attributes['error'] = exc_type.__name__
+        self.instrumentation._exit(self)
+        return False
+
+    def to_dict(self):
+        record = {
+            'span': self.name,
+            'wall_seconds': self.wall_seconds,
+            'cpu_seconds': self.cpu_seconds,
+            'peak_memory_mb': None if self.peak_memory_bytes is None else self.peak_memory_bytes / 2 ** 20,
+        }
+        record.update(self.attributes)
+        return record
+
+
+class Instrumentation:
+    # Collects one record per pipeline stage:
+    #
+    #     instrumentation = Instrumentation(enabled=True)
+    #     with instrumentation.span('run_simulation') as span:
+    #         ...
+    #         span.count(num_simulations, 'paths')
+    #
+    # Peak memory is the allocation high-water mark above the memory in use
+    # when the span opened, traced with tracemalloc (which slows allocation
+    # heavy code, so it can be switched off with trace_memory=False). Nested
+    # spans are supported; the tracer is shared by every instance, so while
+    # other threads trace too a span's peak includes their allocations.
+    # Finished spans are kept in `spans` and, with log=True, written to the
+    # module logger as one JSON object each.
+
+    def __init__(self, enabled=True, trace_memory=True, log=False):
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.log = log
+        self.spans = []
+
+    def span(self, name, **attributes):
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, attributes)
+
+    def _enter(self, span):
+        if self.trace_memory:
+            _MEMORY_TRACER.enter(span)
+
+    def _exit(self, span):
+        if self.trace_memory:
+            _MEMORY_TRACER.exit(span)
+        self.spans.append(span)
+        if self.log:
+            logger.info(json.dumps(span.to_dict(), default=str))
+
+    def records(self):
+        return [span.to_dict() for span in self.spans]
+
+    def metrics(self):
+        # {span name: record}; a name used more than once keeps its last span
+        return {span.name: span.to_dict() for span in self.spans}
+
+    def to_frame(self):
+        return pd.DataFrame(self.records())
+
+    def clear(self):
+        self.spans = []
@@ -0,0 +1,13 @@
+import numpy as np
+
+
+def covariance_root(covariance):
+    # A matrix L with L L' = covariance, for drawing correlated shocks
+    covariance = np.asarray(covariance, dtype=float)
+    try:
+        return np.linalg.cholesky(covariance)
+    except np.linalg.LinAlgError:
+        # PSD but singular (collinear assets, fewer observations than assets):
+        # fall back to the symmetric eigendecomposition with clipped eigenvalues
+        eigenvalues, eigenvectors = np.linalg.eigh((covariance + covariance.T) / 2)
+        return eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))
@@ -0,0 +1,144 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+DEFAULT_LEVELS = (0.95, 0.99)
+
+# Upper bound on the number of (day, path) values per block of path metrics
+DEFAULT_PATH_CHUNK_ELEMENTS = 2 ** 22
+
+
+@dataclass
+class RiskMetrics:
+    initial_investment: float
+    num_simulations: int
+    mean: float
+    median: float
+    std: float
+    probability_of_loss: float  # fraction of paths ending below the investment
+    sharpe_ratio: float  # assuming a risk-free rate of 0
+    var: dict  # confidence level -> loss in dollars
+    cvar: dict
+
+    def to_dict(self):
+        record = {
+            'initial_investment': self.initial_investment,
+            'num_simulations': self.num_simulations,
+            'mean': self.mean,
+            'median': self.median,
+            'std': self.std,
+            'probability_of_loss': self.probability_of_loss,
+            'sharpe_ratio': self.sharpe_ratio,
+        }
+        for level in self.var:
+            record[f'var_{level:g}'] = self.var[level]
+            record[f'cvar_{level:g}'] = self.cvar[level]
+        return record
+
+
+def _interpolation_points(n, probability):
+    # Order statistics and weight of np.percentile's default (linear) method
+    index = (n - 1) * probability
+    below = int(np.floor(index))
+    return below, min(below + 1, n - 1), index - below
+
+
+def column_risk_metrics(final_portfolio_values, initial_investment, levels=DEFAULT_LEVELS):
+    # The quantities of risk_metrics for every column of a (num_simulations,
+    # num_columns) matrix, as arrays. One np.partition along the paths
+    # places the median and both neighbours of every VaR quantile; a
+    # cumulative sum over the lower tail then gives every CVaR. Values match
+    # np.median / np.percentile and the mean of the values at or below each
+    # quantile, without sorting.
+    values = np.asarray(final_portfolio_values, dtype=float)
+    n = len(values)
+    levels = [float(level) for level in levels]
+    points = {probability: _interpolation_points(n, probability) for probability in [0.5] + [1 - level for level in levels]}
+    kth = sorted({position for below, above, _ in points.values() for position in (below, above)})
+    partitioned = np.partition(values, kth, axis=0)
+
+    def quantile(probability):
+        below, above, weight = points[probability]
+        return partitioned[below] + weight * (partitioned[above] - partitioned[below])
+
+    tail_end = max(points[1 - level][0] for level in levels) + 1 if levels else 0
+    tail_sums = np.cumsum(partitioned[:tail_end], axis=0)
+    var, cvar = {}, {}
+    for level in levels:
+        below, above, _ = points[1 - level]
+        cutoff = quantile(1 - level)
+        tail_sum, tail_count = tail_sums[below], np.full(cutoff.shape, below + 1)
+        if above > below and np.any(partitioned[above] <= cutoff):
+            # Ties at the quantile: everything past `below` is >= it, so only
+            # exact duplicates of the cutoff can join the tail
+            ties = np.count_nonzero(partitioned[below + 1:] == cutoff, axis=0)
+            tail_sum, tail_count = tail_sum + ties * cutoff, tail_count + ties
+        var[level] = initial_investment - cutoff
+        cvar[level] = initial_investment - tail_sum / tail_count
+
+    mean = values.mean(axis=0)
+    std = np.sqrt(np.mean(np.square(values - mean), axis=0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe_ratio = (mean - initial_investment) / std
+    return {
+        'mean': mean,
+        'median': quantile(0.5),
+        'std': std,
+        'probability_of_loss': np.count_nonzero(values < initial_investment, axis=0) / n,
+        'sharpe_ratio': sharpe_ratio,
+        'var': var,
+        'cvar': cvar,
+    }
+
+
+def risk_metrics(final_portfolio_values, initial_investment, levels=DEFAULT_LEVELS):
+    values = np.asarray(final_portfolio_values, dtype=float).ravel()
+    metrics = column_risk_metrics(values[:, None], initial_investment, levels)
+    return RiskMetrics(
+        initial_investment=float(initial_investment),
+        num_simulations=len(values),
+        mean=float(metrics['mean'][0]),
+        median=float(metrics['median'][0]),
+        std=float(metrics['std'][0]),
+        probability_of_loss=float(metrics['probability_of_loss'][0]),
+        sharpe_ratio=float(metrics['sharpe_ratio'][0]),
+        var={level: float(var[0]) for level, var in metrics['var'].items()},
+        cvar={level: float(cvar[0]) for level, cvar in metrics['cvar'].items()},
+    )
+
+
+def max_drawdowns(paths, initial_value):
+    peaks = np.maximum.accumulate(paths, axis=0)
+    np.maximum(peaks, initial_value, out=peaks)
+    return np.max(1 - paths / peaks, axis=0)
+
+
+@dataclass
+class PathMetrics:
+    max_drawdown: np.ndarray  # per path, fraction of the running peak
+    time_under_water: np.ndarray  # per path, fraction of days below the running peak
+    longest_drawdown: np.ndarray  # per path, longest run of days below the running peak
+
+
+def path_metrics(all_cumulative_returns, initial_value, chunk_size=None):
+    # Vectorized over a (time_horizon, num_simulations) path matrix, a block
+    # of paths at a time so the (day, path) temporaries stay bounded. The
+    # running peak starts at the initial value.
+    paths = all_cumulative_returns
+    time_horizon, num_simulations = paths.shape
+    if chunk_size is None:
+        chunk_size = max(1, DEFAULT_PATH_CHUNK_ELEMENTS // max(time_horizon, 1))
+    result = PathMetrics(np.empty(num_simulations), np.empty(num_simulations), np.empty(num_simulations, dtype=np.int64))
+    days = np.arange(time_horizon)[:, None]
+    for start in range(0, num_simulations, chunk_size):
+        stop = min(start + chunk_size, num_simulations)
+        block = np.asarray(paths[:, start:stop], dtype=float)
+        peaks = np.maximum.accumulate(block, axis=0)
+        np.maximum(peaks, initial_value, out=peaks)
+        under_water = block < peaks
+        result.max_drawdown[start:stop] = np.max(1 - block / peaks, axis=0)
+        result.time_under_water[start:stop] = under_water.mean(axis=0)
+        # Days since the last day at a peak, zero on peak days
+        last_peak_day = np.maximum.accumulate(np.where(under_water, -1, days), axis=0)
+        result.longest_drawdown[start:stop] = np.max(np.where(under_water, days - last_peak_day, 0), axis=0)
+    return result
@@ -0,0 +1,46 @@
+import unittest
+import numpy as np
+import pandas as pd
+from portfolio_management.portfolio.backtest import walk_forward
+from portfolio_management.portfolio.optimizer import PortfolioOptimizer
+
+class TestWalkForward(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        daily_returns = rng.normal(0.0004, 0.012, size=(400, 6)) + rng.normal(0, 0.008, size=(400, 1))
+        self.returns = pd.DataFrame(daily_returns, index=pd.bdate_range('2015-01-01', periods=400),
+                                    columns=[f'ASSET{i}' for i in range(6)])
+
+    def test_matches_refitting_every_window(self):
+        window, every, cost = 120, 20, 0.002
+        result = walk_forward(self.returns, window=window, rebalance_every=every, strategy='min_volatility',
+                              transaction_cost=cost)
+        values = self.returns.values
+        holdings, expected_returns = np.zeros(6), []
+        for end in range(window, len(values), every):
+            history = self.returns.iloc[end - window:end]
+            target = PortfolioOptimizer(history.mean() * 252, history.cov() * 252).minimize_volatility(None, method='qp')
+            np.testing.assert_allclose(result.weights.loc[history.index[-1]], target, atol=1e-8)
+            growth = np.cumprod(1 + values[end:end + every], axis=0)
+            portfolio_growth = growth @ target * (1 - cost * np.abs(target - holdings).sum())
+            expected_returns.extend(portfolio_growth / np.concatenate([[1.0], portfolio_growth[:-1]]) - 1)
+            holdings = target * growth[-1] / (growth[-1] @ target)
+
+        np.testing.assert_allclose(result.returns.values, expected_returns, atol=1e-12)
+        self.assertEqual(result.equity.index[0], self.returns.index[window - 1])
+        self.assertAlmostEqual(result.equity.iloc[-1], np.prod(1 + np.array(expected_returns)))
+        self.assertAlmostEqual(result.turnover.iloc[0], 1.0)
+
+    def test_strategies(self):
+        for strategy in ('max_sharpe', 'min_volatility', 'equal_weight'):
+            result = walk_forward(self.returns, window=60, strategy=strategy, shrinkage=0.1)
+            self.assertEqual(len(result.returns), 340)
+            np.testing.assert_allclose(result.weights.sum(axis=1), 1.0)
+            self.assertTrue((result.weights.values >= 0).all())
+            self.assertEqual(set(result.summary()), {'annualized_return', 'annualized_volatility', 'sharpe_ratio',
+                                                     'max_drawdown', 'average_turnover', 'total_costs'})
+        with self.assertRaises(ValueError):
+            walk_forward(self.returns, strategy='momentum')
+
+if __name__ == '__main__':
+    unittest.main()
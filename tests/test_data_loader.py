@@ -1,5 +1,14 @@
+import os
+import sys
+import tempfile
+import types
 import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+from portfolio_management.data.cache import PriceCache
 from portfolio_management.data.data_loader import DataLoader
+from portfolio_management.data.sources import DirectorySource, InMemorySource, YFinanceSource
 
 class TestDataLoader(unittest.TestCase):
     def test_load_data(self):
@@ -11,5 +20,143 @@ class TestDataLoader(unittest.TestCase):
         self.assertFalse(data.empty, "Data should not be empty")
         self.assertTrue(all(ticker in data.columns for ticker in tickers), "All tickers should be in the data")
 
+class TestDataLoaderCache(unittest.TestCase):
+    def setUp(self):
+        dates = pd.bdate_range('2020-01-01', '2020-12-31')
+        rng = np.random.default_rng(0)
+        self.prices = pd.DataFrame({
+            'AAPL': 100 * np.cumprod(1 + rng.normal(0, 0.01, len(dates))),
+            'MSFT': 200 * np.cumprod(1 + rng.normal(0, 0.01, len(dates)))
+        }, index=dates)
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_warm_load_is_served_from_cache(self):
+        source = InMemorySource(self.prices)
+        data_loader = DataLoader(source=source, cache=PriceCache(self.directory.name))
+        cold = data_loader.load_data(['AAPL', 'MSFT'], '2020-01-01', '2020-07-01')
+        self.assertEqual(len(source.requests), 2)
+        self.assertEqual(data_loader.last_report.loaded, ['AAPL', 'MSFT'])
+
+        warm = data_loader.load_data(['AAPL', 'MSFT'], '2020-01-01', '2020-07-01')
+        self.assertEqual(len(source.requests), 2, "Warm loads should not hit the source")
+        self.assertTrue(all(status.from_cache for status in data_loader.last_report.statuses.values()))
+        pd.testing.assert_frame_equal(cold, warm)
+        pd.testing.assert_frame_equal(warm, self.prices.loc[:'2020-06-30'], check_names=False, check_freq=False)
+
+    def test_only_uncovered_dates_are_fetched(self):
+        source = InMemorySource(self.prices)
+        data_loader = DataLoader(source=source, cache=PriceCache(self.directory.name))
+        data_loader.load_data(['AAPL'], '2020-03-01', '2020-06-01')
+        data = data_loader.load_data(['AAPL'], '2020-01-01', '2020-09-01')
+        self.assertEqual(source.requests[1:], [
+            ('AAPL', pd.Timestamp('2020-01-01'), pd.Timestamp('2020-03-01')),
+            ('AAPL', pd.Timestamp('2020-06-01'), pd.Timestamp('2020-09-01')),
+        ])
+        pd.testing.assert_series_equal(data['AAPL'], self.prices['AAPL'].loc[:'2020-08-31'], check_names=False, check_freq=False)
+
+    def test_empty_fetch_is_not_cached_as_covered(self):
+        # A transient failure that returns no rows must not become a
+        # permanent gap in the cache
+        source = InMemorySource(self.prices, empty_failures={'AAPL': 1})
+        data_loader = DataLoader(source=source, cache=PriceCache(self.directory.name))
+        self.assertTrue(data_loader.load_data(['AAPL'], '2020-01-01', '2020-07-01').empty)
+        self.assertEqual(data_loader.last_report.statuses['AAPL'].status, 'empty')
+
+        data = data_loader.load_data(['AAPL'], '2020-01-01', '2020-07-01')
+        self.assertEqual(len(source.requests), 2)
+        self.assertEqual(data_loader.last_report.loaded, ['AAPL'])
+        pd.testing.assert_series_equal(data['AAPL'], self.prices['AAPL'].loc[:'2020-06-30'], check_names=False, check_freq=False)
+
+    def test_offline_mode_serves_only_from_cache(self):
+        cache = PriceCache(self.directory.name)
+        DataLoader(source=InMemorySource(self.prices), cache=cache).load_data(['AAPL'], '2020-01-01', '2020-12-31')
+        source = InMemorySource(self.prices)
+        data = DataLoader(source=source, cache=cache, offline=True).load_data(['AAPL', 'MSFT'], '2020-01-01', '2021-06-30')
+        self.assertEqual(source.requests, [])
+        self.assertEqual(list(data.columns), ['AAPL'])
+
+class TestDataLoaderSources(unittest.TestCase):
+    def setUp(self):
+        dates = pd.bdate_range('2021-01-01', '2021-03-31')
+        self.prices = pd.DataFrame({
+            ticker: np.linspace(100, 120, len(dates)) * (i + 1) for i, ticker in enumerate(['AAPL', 'MSFT', 'GOOG', 'AMZN'])
+        }, index=dates)
+
+    def test_failures_are_reported_per_ticker(self):
+        source = InMemorySource(self.prices, failures={'MSFT': 1, 'GOOG': 10})
+        data_loader = DataLoader(source=source, retries=2, backoff=0)
+        data = data_loader.load_data(['AAPL', 'MSFT', 'GOOG', 'XXXX'], '2021-01-01', '2021-04-01')
+        report = data_loader.last_report
+        self.assertEqual(list(data.columns), ['AAPL', 'MSFT'])
+        self.assertEqual(report.statuses['MSFT'].attempts, 2)
+        self.assertEqual(report.statuses['GOOG'].status, 'error')
+        self.assertEqual(report.statuses['GOOG'].attempts, 3)
+        self.assertEqual(report.statuses['XXXX'].status, 'empty')
+        self.assertEqual(report.failed, ['GOOG', 'XXXX'])
+
+    def _fake_yfinance(self, failures, legacy):
+        # yfinance swallows request errors and returns an empty frame unless
+        # told to raise: 0.2.x takes raise_errors and records batch failures
+        # in shared._ERRORS, 1.x reads config.debug.hide_exceptions and
+        # leaves failed tickers out of a batch
+        prices = self.prices.loc[:'2021-03-31']
+
+        def history(ticker, start, end, auto_adjust, **kwargs):
+            if legacy:
+                raise_errors = kwargs.pop('raise_errors', False)
+            else:
+                raise_errors = not yfinance.config.debug.hide_exceptions
+            self.assertEqual(kwargs, {})
+            if failures.get(ticker, 0) > 0:
+                failures[ticker] -= 1
+                if raise_errors:
+                    raise ConnectionError(f"Simulated failure for {ticker}")
+                return pd.DataFrame()
+            return prices[[ticker]].rename(columns={ticker: 'Adj Close'})
+
+        def download(tickers, start, end, progress, auto_adjust):
+            if legacy:
+                yfinance.shared._ERRORS = {ticker.upper(): 'Simulated failure' for ticker in tickers if ticker in failures}
+            return pd.concat({'Adj Close': prices[[ticker for ticker in tickers if ticker not in failures]]}, axis=1)
+
+        yfinance = types.SimpleNamespace(
+            Ticker=lambda ticker: types.SimpleNamespace(history=lambda **kwargs: history(ticker, **kwargs)),
+            download=download,
+        )
+        if legacy:
+            yfinance.shared = types.SimpleNamespace(_ERRORS={})
+        else:
+            yfinance.config = types.SimpleNamespace(debug=types.SimpleNamespace(hide_exceptions=True))
+        return yfinance
+
+    def test_yfinance_failures_are_retried_and_reported(self):
+        for legacy in (True, False):
+            with self.subTest(legacy=legacy):
+                yfinance = self._fake_yfinance({'MSFT': 1, 'GOOG': 10}, legacy)
+                with mock.patch.dict(sys.modules, yfinance=yfinance):
+                    data_loader = DataLoader(source=YFinanceSource(), retries=2, backoff=0)
+                    data = data_loader.load_data(['AAPL', 'MSFT', 'GOOG'], '2021-01-01', '2021-04-01')
+                report = data_loader.last_report
+                self.assertEqual(list(data.columns), ['AAPL', 'MSFT'])
+                self.assertEqual((report.statuses['MSFT'].status, report.statuses['MSFT'].attempts), ('ok', 2))
+                self.assertEqual((report.statuses['GOOG'].status, report.statuses['GOOG'].attempts), ('error', 3))
+                self.assertIn('Simulated failure', report.statuses['GOOG'].error)
+
+    def test_batch_sources_are_called_with_multiple_symbols(self):
+        source = InMemorySource(self.prices, batch_size=3)
+        data = DataLoader(source=source).load_data(list(self.prices.columns), '2021-01-01', '2021-04-01')
+        self.assertEqual(sorted(len(tickers) for tickers, _, _ in source.batch_requests), [1, 3])
+        self.assertEqual(source.requests, [])
+        pd.testing.assert_frame_equal(data, self.prices, check_names=False, check_freq=False)
+
+    def test_directory_source(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for ticker in self.prices.columns:
+                self.prices[[ticker]].rename(columns={ticker: 'Adj Close'}).to_csv(os.path.join(directory, f'{ticker}.csv'))
+            data = DataLoader(source=DirectorySource(directory)).load_data(['AAPL', 'AMZN'], '2021-02-01', '2021-03-01')
+        expected = self.prices.loc['2021-02-01':'2021-02-28', ['AAPL', 'AMZN']]
+        pd.testing.assert_frame_equal(data, expected, check_names=False, check_freq=False)
+
 if __name__ == '__main__':
     unittest.main()
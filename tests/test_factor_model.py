@@ -0,0 +1,55 @@
+import unittest
+import numpy as np
+import pandas as pd
+from portfolio_management.monte_carlo.simulation import MonteCarloSimulation
+from portfolio_management.portfolio.factor_model import FactorModel
+from portfolio_management.portfolio.optimizer import PortfolioOptimizer
+
+class TestFactorModel(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        market = rng.normal(0.0004, 0.01, size=(600, 1))
+        daily_returns = market * rng.uniform(0.5, 1.5, size=12) + rng.normal(0.0002, 0.015, size=(600, 12))
+        self.market = pd.Series(market[:, 0])
+        self.returns = pd.DataFrame(daily_returns, columns=[f'ASSET{i}' for i in range(12)])
+
+    def test_covariance_products(self):
+        full_rank = FactorModel.from_pca(self.returns, 12)
+        np.testing.assert_allclose(full_rank.covariance.values, self.returns.cov().values, atol=1e-9)
+
+        model = FactorModel.from_factors(self.returns, self.market)
+        self.assertEqual(model.num_factors, 1)
+        weights = np.random.default_rng(0).dirichlet(np.ones(12), size=3).T
+        covariance = model.covariance.values
+        np.testing.assert_allclose(model.dot(weights), covariance @ weights)
+        np.testing.assert_allclose(model.variance(weights[:, 0]), weights[:, 0] @ covariance @ weights[:, 0])
+        # Assets load on the market with their betas, and the residual is idiosyncratic
+        np.testing.assert_allclose(model.loadings[:, 0], np.polyfit(self.market, self.returns, 1)[0])
+
+    def test_simulation_draws_from_factored_covariance(self):
+        model = FactorModel.from_pca(self.returns, 3)
+        simulation = MonteCarloSimulation(self.returns, factor_model=model)
+        self.assertEqual(simulation.shock_dimensions, 15)
+        daily_growth = simulation.simulate_asset_growth(50000, 1, seed=0)[0]
+        np.testing.assert_allclose(np.cov(daily_growth.T), model.covariance.values, atol=5e-6)
+        np.testing.assert_allclose(daily_growth.mean(axis=0) - 1, self.returns.mean().values, atol=1e-3)
+        # The dense covariance is neither built nor stored with results
+        self.assertIsNone(simulation._covariance)
+        metadata = simulation.result_metadata(1, 1000, 0)
+        self.assertNotIn('covariance', metadata)
+        np.testing.assert_array_equal(metadata['factor_model']['loadings'], model.loadings)
+        self.assertIsNone(simulation._covariance)
+
+    def test_optimizer_uses_factored_covariance(self):
+        model = FactorModel.from_pca(self.returns, 3).scaled(252)
+        expected_returns = self.returns.mean() * 252
+        factored = PortfolioOptimizer(expected_returns, model, risk_free_rate=0.02)
+        dense = PortfolioOptimizer(expected_returns, model.covariance, risk_free_rate=0.02)
+        for method in ('slsqp', 'qp'):
+            np.testing.assert_allclose(factored.maximize_sharpe_ratio(method), dense.maximize_sharpe_ratio(method),
+                                       atol=1e-6)
+            np.testing.assert_allclose(factored.minimize_volatility(None, method), dense.minimize_volatility(None, method),
+                                       atol=1e-6)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,24 @@
+import unittest
+import numpy as np
+from portfolio_management.utils.helpers import build_fan_chart_figure, convert_time_steps_to_dates
+
+class TestHelpers(unittest.TestCase):
+    def test_convert_time_steps_to_dates(self):
+        dates = convert_time_steps_to_dates('2024-02-27', [0, 1, 2, 3])
+        self.assertEqual(dates, ['2024-02-27', '2024-02-28', '2024-02-29', '2024-03-01'])
+
+    def test_fan_chart_is_decimated(self):
+        rng = np.random.default_rng(0)
+        all_cumulative_returns = 1000 * np.cumprod(1 + rng.normal(0.0005, 0.01, size=(2000, 300)), axis=0)
+        final_portfolio_values = all_cumulative_returns[-1]
+        fig = build_fan_chart_figure(final_portfolio_values, '2024-01-01', all_cumulative_returns,
+                                     num_sample_paths=10, max_time_points=100)
+        # One sample-path trace, two filled bands of two traces each, the median and the histogram
+        self.assertEqual(len(fig.data), 7)
+        self.assertEqual(fig.data[0].type, 'scattergl')
+        self.assertEqual(len(fig.data[0].y), 10 * 101)
+        self.assertEqual(len(fig.data[-2].y), 100)
+        self.assertEqual(int(np.sum(fig.data[-1].y)), 300)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import subprocess
+import sys
+import unittest
+
+CORE_MODULES = (
+    'portfolio_management.main',
+    'portfolio_management.runner',
+    'portfolio_management.data.data_loader',
+    'portfolio_management.monte_carlo.simulation',
+    'portfolio_management.monte_carlo.jobs',
+    'portfolio_management.portfolio.optimizer',
+    'portfolio_management.portfolio.backtest',
+    'portfolio_management.portfolio.factor_model',
+    'portfolio_management.utils.helpers',
+    'portfolio_management.utils.metrics',
+)
+# Loaded only by the app, by plotting and by YFinanceSource fetches
+LAZY_MODULES = ('streamlit', 'plotly', 'yfinance', 'scipy.stats')
+
+class TestImports(unittest.TestCase):
+    def test_core_modules_do_not_load_ui_or_network_dependencies(self):
+        # A fresh interpreter, since this test process may have loaded them already
+        code = (
+            f"import sys\nfor name in {CORE_MODULES!r}: __import__(name)\n"
+            f"print(' '.join(name for name in {LAZY_MODULES!r} if name in sys.modules))"
+        )
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), '')
+
+    def test_optimizer_does_not_load_the_simulation_engine(self):
+        code = (
+            "import sys\nimport portfolio_management.portfolio.optimizer\n"
+            "print(' '.join(name for name in sys.modules if name.startswith('portfolio_management.monte_carlo')))"
+        )
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), '')
+
+if __name__ == '__main__':
+    unittest.main()
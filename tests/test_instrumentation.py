@@ -0,0 +1,52 @@
+import tracemalloc
+import unittest
+import numpy as np
+from portfolio_management.utils.instrumentation import Instrumentation
+
+class TestInstrumentation(unittest.TestCase):
+    def test_nested_spans(self):
+        instrumentation = Instrumentation()
+        with instrumentation.span('outer', stage='test'):
+            kept = np.ones(2 ** 20)
+            with instrumentation.span('inner') as span:
+                temporary = np.ones(2 ** 21)
+                del temporary
+                span.count(1000, 'paths')
+        metrics = instrumentation.metrics()
+        self.assertEqual([record['span'] for record in instrumentation.records()], ['inner', 'outer'])
+        self.assertAlmostEqual(metrics['inner']['peak_memory_mb'], 16, delta=1)
+        # The child's peak counts towards the parent on top of what the parent holds
+        self.assertAlmostEqual(metrics['outer']['peak_memory_mb'], 24, delta=1)
+        self.assertEqual(metrics['outer']['stage'], 'test')
+        self.assertEqual(metrics['inner']['paths'], 1000)
+        self.assertGreater(metrics['inner']['paths_per_second'], 0)
+        self.assertGreaterEqual(metrics['outer']['wall_seconds'], metrics['inner']['wall_seconds'])
+        self.assertFalse(tracemalloc.is_tracing())
+        del kept
+
+    def test_instances_share_the_memory_tracer(self):
+        first, second = Instrumentation(), Instrumentation()
+        other = second.span('other').__enter__()  # starts tracing
+        with first.span('stage') as stage:
+            temporary = np.ones(2 ** 21)
+            del temporary
+            # Neither resetting the peak for a span of another instance nor
+            # closing the span that started tracing may affect this one
+            with second.span('inner'):
+                pass
+            other.__exit__(None, None, None)
+            self.assertTrue(tracemalloc.is_tracing())
+        self.assertAlmostEqual(stage.peak_memory_bytes / 2 ** 20, 16, delta=1)
+        self.assertAlmostEqual(other.peak_memory_bytes / 2 ** 20, 16, delta=1)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_disabled_records_nothing(self):
+        instrumentation = Instrumentation(enabled=False)
+        with instrumentation.span('stage') as span:
+            span.set(iterations=3)
+            span.count(10, 'paths')
+        self.assertEqual(instrumentation.records(), [])
+        self.assertTrue(instrumentation.to_frame().empty)
+
+if __name__ == '__main__':
+    unittest.main()
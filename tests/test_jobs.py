@@ -0,0 +1,96 @@
+import threading
+import time
+import unittest
+import numpy as np
+import pandas as pd
+from portfolio_management.monte_carlo.jobs import JobRunner, SimulationJob
+from portfolio_management.monte_carlo.simulation import MonteCarloSimulation
+from portfolio_management.portfolio.statistics import ReturnStatistics
+
+class TestSimulationJob(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        self.returns = pd.DataFrame(rng.normal(0.001, 0.02, size=(100, 3)), columns=['AAPL', 'MSFT', 'GOOG'])
+        self.runner = JobRunner(max_workers=1)
+
+    def tearDown(self):
+        self.runner.shutdown()
+
+    def test_finished_job_holds_the_seeded_scenarios(self):
+        job = self.runner.submit(SimulationJob(lambda: self.returns, 500, 20, seed=4, chunk_size=64))
+        self.assertTrue(job.wait(30))
+        self.assertEqual(job.state, 'done')
+        self.assertEqual((job.paths_done, job.progress, job.eta), (500, 1.0, 0.0))
+        expected = MonteCarloSimulation(self.returns).simulate_asset_growth(500, 20, dtype=np.float32, chunk_size=64, seed=4)
+        np.testing.assert_array_equal(job.completed_growth(), expected)
+        self.assertEqual(list(job.instrumentation.to_frame()['span']), ['load_data', 'simulate'])
+
+    def test_job_simulates_from_loaded_statistics(self):
+        # Shifting the mean shows the supplied statistics are used rather
+        # than moments recomputed from the returns
+        statistics = ReturnStatistics.from_returns(self.returns + 0.01)
+        job = SimulationJob(lambda: (self.returns, statistics), 200, 10, seed=4).run()
+        self.assertEqual(job.state, 'done')
+        expected = MonteCarloSimulation(self.returns, statistics=statistics).simulate_asset_growth(
+            200, 10, dtype=np.float32, seed=4)
+        np.testing.assert_array_equal(job.completed_growth(), expected)
+        self.assertIs(job.returns, self.returns)
+
+    def test_cancel_keeps_completed_paths(self):
+        release = threading.Event()
+
+        def load_returns():
+            release.wait(30)
+            return self.returns
+
+        job = self.runner.submit(SimulationJob(load_returns, 100000, 50, seed=0, chunk_size=100))
+        queued = self.runner.submit(SimulationJob(lambda: self.returns, 100, 5))
+        release.set()
+        while job.paths_done < 300:
+            self.assertFalse(job.finished)
+            time.sleep(0.001)
+        self.assertEqual(queued.state, 'queued')
+        self.assertIsNotNone(job.eta)
+        job.cancel()
+        self.assertTrue(job.wait(30))
+        self.assertEqual(job.state, 'cancelled')
+        self.assertLess(job.paths_done, 100000)
+        self.assertEqual(job.completed_growth().shape, (50, job.paths_done, 3))
+        self.assertTrue(queued.wait(30))
+        self.assertEqual(queued.state, 'done')
+
+    def test_runner_reuses_jobs_by_key_and_keeps_the_latest(self):
+        runner = JobRunner(max_workers=1, max_jobs=2)
+        self.addCleanup(runner.shutdown)
+        make_job = lambda: SimulationJob(lambda: self.returns, 100, 5, seed=1)
+        first = runner.start('a', make_job)
+        self.assertIs(runner.start('a', make_job), first)
+        self.assertTrue(first.wait(30))
+        self.assertIs(runner.start('a', make_job), first)
+
+        second = runner.start('b', make_job)
+        runner.start('a', make_job)
+        runner.start('c', make_job)  # evicts 'b', the least recently requested
+        self.assertIsNone(runner.get('b'))
+        self.assertIs(runner.get('a'), first)
+        self.assertTrue(second.wait(30))
+
+        abandoned = runner.start('d', lambda: SimulationJob(lambda: self.returns, 100, 5, abandon_after=0.0))
+        self.assertTrue(abandoned.wait(30))
+        self.assertEqual(abandoned.state, 'cancelled')
+        self.assertIsNot(runner.start('d', make_job), abandoned)
+
+    def test_failed_and_abandoned_jobs(self):
+        def missing_data():
+            raise ValueError('no prices')
+
+        failed = self.runner.submit(SimulationJob(missing_data, 100, 5))
+        failed.wait(30)
+        self.assertEqual(failed.state, 'failed')
+        self.assertEqual(str(failed.error), 'no prices')
+
+        abandoned = SimulationJob(lambda: self.returns, 100, 5, abandon_after=0.0)
+        self.assertEqual(abandoned.run().state, 'cancelled')
+
+if __name__ == '__main__':
+    unittest.main()
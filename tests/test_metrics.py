@@ -0,0 +1,42 @@
+import unittest
+import numpy as np
+from portfolio_management.utils.helpers import get_simulation_insights
+from portfolio_management.utils.metrics import path_metrics, risk_metrics
+
+class TestRiskMetrics(unittest.TestCase):
+    def test_matches_numpy_reference(self):
+        rng = np.random.default_rng(0)
+        # Rounded values put ties at the quantiles
+        for values in (1000 * np.exp(rng.normal(0, 0.2, 5001)), np.round(1000 * np.exp(rng.normal(0, 0.2, 4000)))):
+            metrics = risk_metrics(values, 1000, levels=(0.9, 0.95, 0.99))
+            self.assertAlmostEqual(metrics.median, np.median(values))
+            self.assertAlmostEqual(metrics.std, np.std(values))
+            self.assertAlmostEqual(metrics.probability_of_loss, np.mean(values < 1000))
+            for level in (0.9, 0.95, 0.99):
+                quantile = np.percentile(values, (1 - level) * 100)
+                self.assertAlmostEqual(metrics.var[level], 1000 - quantile)
+                self.assertAlmostEqual(metrics.cvar[level], 1000 - values[values <= quantile].mean())
+            self.assertEqual(metrics.to_dict()['cvar_0.95'], metrics.cvar[0.95])
+
+    def test_insights_are_formatted_metrics(self):
+        values = np.array([900.0, 1000.0, 1100.0, 1200.0])
+        insights = get_simulation_insights(values, 1000)
+        self.assertEqual(insights['Value at Risk (VaR 95%)'], '$85.00')
+        self.assertEqual(insights['Conditional Value at Risk (CVaR 95%)'], '$100.00')
+        self.assertEqual(insights['Probability of Loss'], '25.00%')
+        self.assertIn('Value at Risk (VaR 99%)', get_simulation_insights(values, 1000, level=0.99))
+
+    def test_path_metrics(self):
+        paths = np.array([
+            [100.0, 110.0, 90.0],
+            [120.0, 105.0, 95.0],
+            [90.0, 100.0, 101.0],
+            [130.0, 99.0, 102.0],
+        ])
+        metrics = path_metrics(paths, 100.0, chunk_size=2)
+        np.testing.assert_allclose(metrics.max_drawdown, [0.25, 0.1, 0.1])
+        np.testing.assert_allclose(metrics.time_under_water, [0.25, 0.75, 0.5])
+        np.testing.assert_array_equal(metrics.longest_drawdown, [1, 3, 2])
+
+if __name__ == '__main__':
+    unittest.main()
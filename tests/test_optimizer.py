@@ -1,6 +1,8 @@
 import unittest
 import numpy as np
 from portfolio_management.portfolio.optimizer import PortfolioOptimizer
+from portfolio_management.portfolio.cvar import min_cvar_portfolio
+from portfolio_management.portfolio.qp import solve_qp
 
 class TestPortfolioOptimizer(unittest.TestCase):
     def test_maximize_sharpe_ratio(self):
@@ -11,5 +13,77 @@ class TestPortfolioOptimizer(unittest.TestCase):
         self.assertAlmostEqual(weights.sum(), 1.0, places=5, msg="Weights should sum to 1")
         self.assertTrue(all(0 <= w <= 1 for w in weights), "Weights should be between 0 and 1")
 
+    def test_qp_method_matches_slsqp(self):
+        rng = np.random.default_rng(1)
+        daily_returns = rng.normal(0.0005, 0.01, size=(500, 15)) + rng.normal(0, 0.01, size=(500, 1))
+        expected_returns = daily_returns.mean(axis=0) * 252
+        covariance_matrix = np.cov(daily_returns.T) * 252
+        optimizer = PortfolioOptimizer(expected_returns, covariance_matrix, risk_free_rate=0.02)
+        args = (expected_returns, covariance_matrix, 0.02)
+        slsqp_sharpe = -optimizer._neg_sharpe_ratio(optimizer.maximize_sharpe_ratio(), *args)
+        qp_weights = optimizer.maximize_sharpe_ratio(method='qp')
+        self.assertAlmostEqual(qp_weights.sum(), 1.0)
+        self.assertGreaterEqual(-optimizer._neg_sharpe_ratio(qp_weights, *args), slsqp_sharpe - 1e-6)
+
+        target_return = np.median(expected_returns)
+        qp_weights = optimizer.minimize_volatility(target_return, method='qp')
+        slsqp_weights = optimizer.minimize_volatility(target_return)
+        self.assertAlmostEqual(qp_weights @ expected_returns, target_return)
+        self.assertLessEqual(optimizer._portfolio_volatility(qp_weights, covariance_matrix),
+                             optimizer._portfolio_volatility(slsqp_weights, covariance_matrix) + 1e-8)
+
+    def test_minimize_cvar(self):
+        rng = np.random.default_rng(2)
+        scenarios = rng.normal(0.02, 0.1, size=(2000, 8)) + rng.normal(0, 0.05, size=(2000, 1))
+        optimizer = PortfolioOptimizer(scenarios.mean(axis=0), np.cov(scenarios.T))
+        target_return = np.median(scenarios.mean(axis=0))
+        weights = optimizer.minimize_cvar(scenarios, target_return=target_return, bounds=(0, 0.5))
+        self.assertAlmostEqual(weights.sum(), 1.0)
+        self.assertTrue(np.all(weights >= -1e-9) and np.all(weights <= 0.5 + 1e-9))
+        self.assertGreaterEqual(scenarios.mean(axis=0) @ weights, target_return - 1e-9)
+
+        # The LP optimum is the empirical CVaR (mean of the worst 5% of
+        # losses) of its weights, and no worse than equal weights
+        result = min_cvar_portfolio(scenarios, target_return=target_return, bounds=(0, 0.5))
+        worst_losses = np.sort(-scenarios @ result.weights)[-100:]
+        self.assertAlmostEqual(result.cvar, worst_losses.mean())
+        self.assertLessEqual(result.var, worst_losses[0] + 1e-9)
+        self.assertLessEqual(result.cvar, np.sort(-scenarios.mean(axis=1))[-100:].mean())
+
+        subsampled = min_cvar_portfolio(scenarios, target_return=target_return, max_scenarios=500, seed=0)
+        self.assertEqual(subsampled.num_scenarios, 500)
+        self.assertTrue(subsampled.success)
+        self.assertFalse(min_cvar_portfolio(scenarios, target_return=1.0).success)
+        with self.assertRaises(ValueError):
+            optimizer.minimize_cvar(scenarios, target_return=1.0)
+
+        # Building the constraint matrix in blocks does not change the LP
+        chunked = min_cvar_portfolio(scenarios, target_return=target_return, bounds=(0, 0.5), chunk_size=7)
+        np.testing.assert_allclose(chunked.weights, result.weights, atol=1e-9)
+
+    def test_efficient_frontier(self):
+        rng = np.random.default_rng(0)
+        daily_returns = rng.normal(0.0005, 0.01, size=(500, 20)) + rng.normal(0, 0.01, size=(500, 1))
+        expected_returns = daily_returns.mean(axis=0) * 252
+        covariance_matrix = np.cov(daily_returns.T) * 252
+        optimizer = PortfolioOptimizer(expected_returns, covariance_matrix, risk_free_rate=0.02)
+        frontier = optimizer.efficient_frontier(n_points=25)
+        self.assertEqual(frontier.weights.shape, (25, 20))
+        self.assertTrue(frontier.converged.all())
+        np.testing.assert_allclose(frontier.weights.sum(axis=1), 1.0)
+        np.testing.assert_allclose(frontier.returns, frontier.target_returns, atol=1e-10)
+        self.assertTrue(np.all(frontier.weights >= 0))
+        self.assertTrue(np.all(np.diff(frontier.volatilities) >= -1e-12), "Volatility should rise along the frontier")
+        for i in (0, 12, 24):
+            weights = optimizer.minimize_volatility(frontier.target_returns[i])
+            self.assertLessEqual(frontier.volatilities[i], np.sqrt(weights @ covariance_matrix @ weights) + 1e-8)
+
+    def test_solve_qp_matches_closed_form(self):
+        covariance_matrix = np.diag([0.04, 0.09, 0.16])
+        result = solve_qp(covariance_matrix, None, np.ones((1, 3)), [1.0], 0.0, 1.0, np.array([1.0, 0.0, 0.0]))
+        inverse_variances = 1 / np.diag(covariance_matrix)
+        self.assertTrue(result.success)
+        np.testing.assert_allclose(result.x, inverse_variances / inverse_variances.sum())
+
 if __name__ == '__main__':
     unittest.main()
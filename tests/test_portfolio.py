@@ -2,6 +2,7 @@ import unittest
 import pandas as pd
 import numpy as np
 from portfolio_management.portfolio.portfolio import Portfolio
+from portfolio_management.portfolio.statistics import ExponentialStatistics, ReturnStatistics
 
 class TestPortfolio(unittest.TestCase):
     def test_calculate_returns(self):
@@ -15,5 +16,37 @@ class TestPortfolio(unittest.TestCase):
         self.assertIsNotNone(portfolio.returns, "Returns should not be None")
         self.assertEqual(portfolio.returns.shape, (4, 2), "Returns should have correct shape")
 
+    def test_append_prices_updates_statistics(self):
+        rng = np.random.default_rng(0)
+        dates = pd.bdate_range('2020-01-01', periods=300)
+        prices = pd.DataFrame(100 * np.cumprod(1 + rng.normal(0.0005, 0.01, size=(300, 3)), axis=0),
+                              index=dates, columns=['AAPL', 'MSFT', 'GOOG'])
+        portfolio = Portfolio(prices.iloc[:200])
+        statistics = portfolio.statistics
+        portfolio.append_prices(prices.iloc[150:260])
+        portfolio.append_prices(prices.iloc[260:])
+
+        expected = prices.pct_change().dropna()
+        pd.testing.assert_frame_equal(portfolio.returns, expected)
+        self.assertIs(portfolio.statistics, statistics)
+        self.assertEqual(statistics.count, 299)
+        pd.testing.assert_series_equal(statistics.mean, expected.mean())
+        pd.testing.assert_frame_equal(statistics.covariance, expected.cov())
+
+    def test_rolling_and_exponential_statistics(self):
+        rng = np.random.default_rng(1)
+        returns = pd.DataFrame(rng.normal(0.0005, 0.01, size=(400, 3)), columns=['A', 'B', 'C'])
+        windows = list(ReturnStatistics.rolling(returns, window=120, step=5))
+        self.assertEqual(len(windows), 57)
+        for end, statistics in windows[::10]:
+            pd.testing.assert_frame_equal(statistics.covariance, returns.loc[end - 119:end].cov())
+
+        statistics = ReturnStatistics.from_returns(returns).remove(returns.iloc[:100])
+        pd.testing.assert_series_equal(statistics.mean, returns.iloc[100:].mean())
+
+        exponential = ExponentialStatistics.from_returns(returns, alpha=0.06)
+        expected = returns.ewm(alpha=0.06, adjust=False).cov(bias=True).loc[399]
+        pd.testing.assert_frame_equal(exponential.covariance, expected, check_names=False)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,91 @@
+import json
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from portfolio_management.data.data_loader import DataLoader
+from portfolio_management.data.sources import InMemorySource
+from portfolio_management.runner import load_configs, run_batch, run_job
+
+class TestBatchRunner(unittest.TestCase):
+    def setUp(self):
+        dates = pd.bdate_range('2021-01-01', '2021-12-31')
+        rng = np.random.default_rng(0)
+        self.prices = {
+            ticker: pd.Series(100 * np.cumprod(1 + rng.normal(0.0005, 0.01, len(dates))), index=dates)
+            for ticker in ['AAPL', 'MSFT', 'GOOG']
+        }
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        base = {'start_date': '2021-01-01', 'end_date': '2021-12-31', 'num_simulations': 200,
+                'time_horizon': 20, 'seed': 1}
+        configs = [
+            {'id': 'equal', 'tickers': ['AAPL', 'MSFT'], **base},
+            {'id': 'sharpe', 'tickers': ['AAPL', 'MSFT', 'GOOG'], 'optimization': {'optimize': True, 'balanced': False}, **base},
+            {'id': 'custom', 'tickers': ['MSFT', 'GOOG'], 'weights': [0.25, 0.75], **base},
+            {'id': 'unknown', 'tickers': ['AAPL', 'NOPE'], **base},
+            {'id': 'incomplete', 'tickers': ['AAPL']},
+        ]
+        self.configs = os.path.join(self.directory.name, 'configs.jsonl')
+        with open(self.configs, 'w') as f:
+            f.writelines(json.dumps(config) + '\n' for config in configs)
+
+    def test_batch_isolates_failures_and_resumes(self):
+        output = os.path.join(self.directory.name, 'results.csv')
+        source = InMemorySource(self.prices, batch_size=10)
+        results = run_batch(self.configs, output, data_loader=DataLoader(source=source))
+
+        # Shared tickers are requested once for the whole batch
+        self.assertEqual(len(source.batch_requests), 1)
+        self.assertEqual(sorted(source.batch_requests[0][0]), ['AAPL', 'GOOG', 'MSFT', 'NOPE'])
+        statuses = dict(zip(results['job_id'], results['status']))
+        self.assertEqual(statuses, {'equal': 'ok', 'sharpe': 'ok', 'custom': 'ok', 'unknown': 'failed',
+                                    'incomplete': 'failed'})
+        written = pd.read_csv(output).set_index('job_id')
+        self.assertAlmostEqual(written.loc['custom', 'weight_GOOG'], 0.75)
+        self.assertAlmostEqual(written.loc['sharpe', ['weight_AAPL', 'weight_MSFT', 'weight_GOOG']].sum(), 1.0)
+        self.assertTrue(np.isnan(written.loc['equal', 'weight_GOOG']))
+        self.assertIn('NOPE', written.loc['unknown', 'error'])
+
+        # A rerun only retries the failed jobs and gives the same results
+        source = InMemorySource(self.prices, batch_size=10)
+        rerun = run_batch(self.configs, output, data_loader=DataLoader(source=source))
+        self.assertEqual(sorted(source.batch_requests[0][0]), ['AAPL', 'NOPE'])
+        pd.testing.assert_series_equal(rerun['cvar_95'], results['cvar_95'])
+
+    def test_batch_job_matches_its_own_date_range(self):
+        # A job ending before another job's end date sees the same prices as
+        # a single run of its config: end dates are exclusive
+        short = {'id': 'short', 'tickers': ['AAPL', 'MSFT'], 'start_date': '2021-01-01', 'end_date': '2021-06-30',
+                 'num_simulations': 200, 'time_horizon': 20, 'seed': 1}
+        configs = os.path.join(self.directory.name, 'dates.jsonl')
+        with open(configs, 'w') as f:
+            f.writelines(json.dumps(config) + '\n' for config in (short, {**short, 'id': 'long', 'end_date': '2021-12-31'}))
+        results = run_batch(configs, os.path.join(self.directory.name, 'dates.csv'),
+                            data_loader=DataLoader(source=InMemorySource(self.prices)))
+
+        stock_data = DataLoader(source=InMemorySource(self.prices)).load_data(
+            short['tickers'], short['start_date'], short['end_date'])
+        single = run_job('short', short, stock_data)
+        batch = results.set_index('job_id').loc['short']
+        self.assertEqual(stock_data.index[-1], pd.Timestamp('2021-06-29'))
+        self.assertAlmostEqual(batch['cvar_95'], single['cvar_95'])
+        self.assertAlmostEqual(batch['mean'], single['mean'])
+
+    def test_directory_of_configs_in_worker_pool(self):
+        config_directory = os.path.join(self.directory.name, 'configs')
+        os.makedirs(config_directory)
+        for _, config in load_configs(self.configs)[:3]:
+            config.pop('id')
+            with open(os.path.join(config_directory, f"{config['tickers'][0]}-{len(config['tickers'])}.json"), 'w') as f:
+                json.dump(config, f)
+        output = os.path.join(self.directory.name, 'results.parquet')
+        results = run_batch(config_directory, output, data_loader=DataLoader(source=InMemorySource(self.prices)),
+                            n_workers=2)
+        self.assertEqual(list(results['job_id']), ['AAPL-2', 'AAPL-3', 'MSFT-2'])
+        self.assertTrue((results['status'] == 'ok').all())
+        pd.testing.assert_frame_equal(pd.read_parquet(output), results)
+
+if __name__ == '__main__':
+    unittest.main()
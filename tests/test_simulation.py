@@ -1,7 +1,15 @@
+import json
+import tempfile
 import unittest
+from unittest import mock
 import pandas as pd
 import numpy as np
-from portfolio_management.monte_carlo.simulation import MonteCarloSimulation
+from portfolio_management.monte_carlo.simulation import MonteCarloSimulation, project_scenarios
+from portfolio_management.monte_carlo.parallel import run_parallel
+from portfolio_management.monte_carlo.results import SimulationResult, seed_metadata
+from portfolio_management.monte_carlo.batch import evaluate_portfolios
+from portfolio_management.utils.helpers import get_simulation_insights
+from portfolio_management.utils.linalg import covariance_root
 
 class TestMonteCarloSimulation(unittest.TestCase):
     def test_run_simulation(self):
@@ -15,5 +23,186 @@ class TestMonteCarloSimulation(unittest.TestCase):
         self.assertEqual(all_cumulative_returns.shape, (5, 10), "Cumulative returns should have correct shape")
         self.assertEqual(final_portfolio_values.shape, (10,), "Final portfolio values should have correct shape")
 
+    def test_asset_growth_reprojects_onto_weights(self):
+        rng = np.random.default_rng(1)
+        returns = pd.DataFrame(rng.normal(0.001, 0.02, size=(50, 3)), columns=['AAPL', 'MSFT', 'GOOG'])
+        asset_growth = MonteCarloSimulation(returns).simulate_asset_growth(40, 15, chunk_size=16, seed=7)
+        self.assertEqual(asset_growth.shape, (15, 40, 3))
+        # Any weights projected from the same scenarios match a fresh run with that seed
+        for weights in ([1 / 3, 1 / 3, 1 / 3], [0.6, 0.0, 0.4]):
+            simulation = MonteCarloSimulation(returns, initial_investment=500, weights=weights)
+            expected, _ = simulation.run_simulation(40, 15, chunk_size=16, seed=7)
+            np.testing.assert_allclose(project_scenarios(asset_growth, weights, 500), expected)
+
+    def test_evaluate_portfolios_matches_single_runs(self):
+        rng = np.random.default_rng(2)
+        returns = pd.DataFrame(rng.normal(0.001, 0.02, size=(60, 4)), columns=['A', 'B', 'C', 'D'])
+        candidates = rng.dirichlet(np.ones(4), size=7)
+        simulation = MonteCarloSimulation(returns, initial_investment=1000)
+        evaluation = simulation.evaluate_portfolios(candidates, 500, 10, chunk_size=64, seed=3, keep_final_values=True)
+        self.assertEqual(evaluation.final_portfolio_values.shape, (500, 7))
+        self.assertEqual(evaluation.assets, ['A', 'B', 'C', 'D'])
+
+        _, final_portfolio_values = MonteCarloSimulation(returns, 1000, candidates[4]).run_simulation(
+            500, 10, chunk_size=64, seed=3
+        )
+        np.testing.assert_allclose(evaluation.final_portfolio_values[:, 4], final_portfolio_values)
+        insights = get_simulation_insights(final_portfolio_values, 1000)
+        metrics = evaluation.metrics.iloc[4]
+        self.assertEqual(f"${metrics['cvar_95']:,.2f}", insights['Conditional Value at Risk (CVaR 95%)'])
+        self.assertEqual(f"${metrics['var_95']:,.2f}", insights['Value at Risk (VaR 95%)'])
+
+        # Chunking over candidates does not change the metrics
+        final_growth = simulation.simulate_final_growth(500, 10, chunk_size=64, seed=3)
+        chunked = evaluate_portfolios(final_growth, candidates, 1000, chunk_size=2)
+        pd.testing.assert_frame_equal(chunked.metrics, evaluation.metrics)
+        self.assertIsNone(chunked.final_portfolio_values)
+
+    def test_run_simulation_is_reproducible(self):
+        rng = np.random.default_rng(0)
+        returns = pd.DataFrame(rng.normal(0.001, 0.02, size=(50, 3)), columns=['AAPL', 'MSFT', 'GOOG'])
+        simulation = MonteCarloSimulation(returns, initial_investment=1000)
+        first, first_final = simulation.run_simulation(100, 20, chunk_size=7, seed=42)
+        second, second_final = simulation.run_simulation(100, 20, chunk_size=7, seed=np.random.default_rng(42))
+        np.testing.assert_array_equal(first, second)
+        np.testing.assert_array_equal(first_final, first[-1])
+        self.assertEqual(first.shape, (20, 100))
+
+        # A SeedSequence is not advanced by a run, and its recorded metadata
+        # reproduces the run
+        seed_sequence = np.random.SeedSequence(7, spawn_key=(3,))
+        first, _ = simulation.run_simulation(100, 20, chunk_size=7, seed=seed_sequence)
+        second, _ = simulation.run_simulation(100, 20, chunk_size=7, seed=seed_sequence)
+        np.testing.assert_array_equal(first, second)
+        recorded = json.loads(json.dumps(seed_metadata(seed_sequence)))
+        restored = np.random.SeedSequence(recorded['entropy'], spawn_key=recorded['spawn_key'],
+                                          pool_size=recorded['pool_size'])
+        np.testing.assert_array_equal(simulation.run_simulation(100, 20, chunk_size=7, seed=restored)[0], first)
+
+    def test_covariance_root_handles_singular_matrix(self):
+        covariance = np.array([[0.04, 0.04], [0.04, 0.04]])
+        factor = covariance_root(covariance)
+        np.testing.assert_allclose(factor @ factor.T, covariance, atol=1e-12)
+
+    def test_run_streaming_matches_dense_run(self):
+        rng = np.random.default_rng(1)
+        returns = pd.DataFrame(rng.normal(0.0005, 0.01, size=(100, 2)), columns=['AAPL', 'MSFT'])
+        simulation = MonteCarloSimulation(returns, initial_investment=1000)
+        all_cumulative_returns, final_portfolio_values = simulation.run_simulation(2000, 30, chunk_size=250, seed=3)
+        summary = simulation.run_streaming(2000, 30, num_sample_paths=10, chunk_size=250, seed=3)
+        np.testing.assert_array_equal(summary.final_portfolio_values, final_portfolio_values)
+        np.testing.assert_array_equal(summary.sample_paths, all_cumulative_returns[:, :10])
+        np.testing.assert_allclose(summary.mean_path, all_cumulative_returns.mean(axis=1))
+        for percentile, band in summary.percentile_bands.items():
+            np.testing.assert_allclose(band, np.percentile(all_cumulative_returns, percentile, axis=1), rtol=1e-3)
+        self.assertTrue(np.all((summary.max_drawdowns >= 0) & (summary.max_drawdowns < 1)))
+
+    def test_run_streaming_bands_with_tiny_chunks(self):
+        # Bin edges come from a pilot of many paths, not from the first chunk
+        rng = np.random.default_rng(1)
+        returns = pd.DataFrame(rng.normal(0.0005, 0.01, size=(100, 2)), columns=['AAPL', 'MSFT'])
+        simulation = MonteCarloSimulation(returns, initial_investment=1000)
+        all_cumulative_returns, _ = simulation.run_simulation(3000, 30, chunk_size=1, seed=3)
+        summary = simulation.run_streaming(3000, 30, chunk_size=1, seed=3)
+        for percentile, band in summary.percentile_bands.items():
+            np.testing.assert_allclose(band, np.percentile(all_cumulative_returns, percentile, axis=1), rtol=1e-3)
+
+    def test_parallel_run_matches_serial_run(self):
+        rng = np.random.default_rng(2)
+        returns = pd.DataFrame(rng.normal(0.0005, 0.01, size=(100, 2)), columns=['AAPL', 'MSFT'])
+        simulation = MonteCarloSimulation(returns, initial_investment=1000)
+        serial, serial_final = simulation.run_simulation(200, 10, chunk_size=30, seed=5)
+        parallel, parallel_final = run_parallel(
+            simulation, 200, 10, n_workers=2, chunk_size=30, seed=5, min_parallel_elements=0
+        )
+        np.testing.assert_array_equal(parallel, serial)
+        np.testing.assert_array_equal(parallel_final, serial_final)
+
+    def test_run_simulation_uses_every_cpu_when_workers_below_one(self):
+        returns = pd.DataFrame(np.random.default_rng(2).normal(0.0005, 0.01, size=(100, 2)), columns=['AAPL', 'MSFT'])
+        simulation = MonteCarloSimulation(returns, initial_investment=1000)
+        with mock.patch('portfolio_management.monte_carlo.parallel.os.cpu_count', return_value=4), \
+                mock.patch('portfolio_management.monte_carlo.simulation.run_parallel') as run_parallel_mock:
+            simulation.run_simulation(200, 10, n_workers=0)
+            simulation.run_simulation(200, 10, n_workers=1)
+        self.assertEqual(run_parallel_mock.call_count, 1)
+
+    def test_sampling_methods_report_standard_errors(self):
+        rng = np.random.default_rng(4)
+        returns = pd.DataFrame(rng.normal(0.0005, 0.01, size=(200, 3)), columns=['AAPL', 'MSFT', 'GOOG'])
+        estimates = {
+            sampling: MonteCarloSimulation(returns, 1000, sampling=sampling).estimate(4096, 20, seed=7)
+            for sampling in ('plain', 'antithetic', 'control_variate', 'sobol')
+        }
+        for estimate in estimates.values():
+            self.assertEqual(set(estimate.quantiles), {0.01, 0.05})
+            self.assertTrue(all(error > 0 for error in estimate.quantile_standard_errors.values()))
+        self.assertLess(estimates['antithetic'].mean_standard_error, estimates['plain'].mean_standard_error / 2)
+        self.assertLess(estimates['sobol'].mean_standard_error, estimates['plain'].mean_standard_error / 2)
+        self.assertLess(estimates['control_variate'].mean_standard_error, estimates['plain'].mean_standard_error / 5)
+        expected = MonteCarloSimulation(returns, 1000).expected_final_value(20)
+        self.assertAlmostEqual(estimates['control_variate'].mean, expected,
+                               delta=4 * estimates['control_variate'].mean_standard_error)
+        self.assertAlmostEqual(estimates['plain'].mean, expected, delta=4 * estimates['plain'].mean_standard_error)
+
+    def test_antithetic_paths_mirror_each_other(self):
+        returns = pd.DataFrame(np.random.default_rng(5).normal(0, 0.01, size=(100, 2)), columns=['AAPL', 'MSFT'])
+        simulation = MonteCarloSimulation(returns, sampling='antithetic')
+        simulation.mean[:] = 0
+        all_cumulative_returns, _ = simulation.run_simulation(10, 1, chunk_size=10, seed=0)
+        np.testing.assert_allclose(all_cumulative_returns[0, :5] - 1, -(all_cumulative_returns[0, 5:] - 1))
+
+    def test_bootstrap_replays_historical_days_in_blocks(self):
+        rng = np.random.default_rng(4)
+        returns = pd.DataFrame(rng.normal(0.001, 0.02, size=(60, 3)), columns=['AAPL', 'MSFT', 'GOOG'])
+        for sampling in ('stationary_bootstrap', 'block_bootstrap'):
+            simulation = MonteCarloSimulation(returns, sampling=sampling, block_length=5)
+            asset_growth = simulation.simulate_asset_growth(200, 30, chunk_size=64, seed=3)
+            np.testing.assert_array_equal(asset_growth, simulation.simulate_asset_growth(200, 30, chunk_size=64, seed=3))
+            daily_growth = np.concatenate([asset_growth[:1], asset_growth[1:] / asset_growth[:-1]])
+            # Every simulated day is a whole historical day, all assets together
+            distances = np.abs(daily_growth[:, :, None, :] - 1 - returns.values[None, None]).max(axis=-1)
+            rows = distances.argmin(axis=-1)
+            self.assertLess(distances.min(axis=-1).max(), 1e-12)
+            continues = np.diff(rows, axis=0) % len(returns) == 1
+            if sampling == 'block_bootstrap':
+                np.testing.assert_array_equal(continues.all(axis=1), np.arange(1, 30) % 5 != 0)
+            else:
+                self.assertAlmostEqual(continues.mean(), 0.8, delta=0.05)
+
+    def test_run_until_precision_stops_at_target_or_budget(self):
+        returns = pd.DataFrame(np.random.default_rng(6).normal(0.0005, 0.01, size=(200, 2)), columns=['AAPL', 'MSFT'])
+        simulation = MonteCarloSimulation(returns, initial_investment=1000)
+        result = simulation.run_until_precision(20, var_half_width=2.0, batch_size=2000, seed=1)
+        self.assertTrue(result.converged)
+        self.assertEqual(result.stop_reason, 'target')
+        self.assertLessEqual(result.var_half_width, 2.0)
+        self.assertEqual(result.num_simulations % 2000, 0)
+        self.assertEqual(len(result.final_portfolio_values), result.num_simulations)
+
+        capped = simulation.run_until_precision(20, cvar_relative_error=1e-6, batch_size=1000, max_paths=3000, seed=1)
+        self.assertFalse(capped.converged)
+        self.assertEqual(capped.stop_reason, 'max_paths')
+        self.assertEqual(capped.num_simulations, 3000)
+
+    def test_run_to_memory_mapped_float32_result(self):
+        returns = pd.DataFrame(np.random.default_rng(7).normal(0.0005, 0.01, size=(100, 2)), columns=['AAPL', 'MSFT'])
+        simulation = MonteCarloSimulation(returns, initial_investment=1000, weights=[0.7, 0.3])
+        all_cumulative_returns, final_portfolio_values = simulation.run_simulation(300, 15, chunk_size=64, seed=9)
+        with tempfile.TemporaryDirectory() as directory:
+            result = simulation.run(300, 15, dtype=np.float32, directory=directory, chunk_size=64, seed=9)
+            self.assertEqual(result.all_cumulative_returns.shape, (15, 300))
+            del result
+            reloaded = SimulationResult.load(directory)
+            self.assertIsInstance(reloaded.paths, np.memmap)
+            self.assertEqual(reloaded.dtype, np.float32)
+            self.assertEqual(reloaded.metadata['tickers'], ['AAPL', 'MSFT'])
+            self.assertEqual(reloaded.metadata['weights'], [0.7, 0.3])
+            self.assertEqual(reloaded.metadata['seed'], 9)
+            np.testing.assert_allclose(reloaded.all_cumulative_returns, all_cumulative_returns, rtol=1e-6)
+            np.testing.assert_allclose(reloaded.final_portfolio_values, final_portfolio_values, rtol=1e-6)
+            np.testing.assert_allclose(reloaded.sample_paths(5), all_cumulative_returns[:, :5], rtol=1e-6)
+            del reloaded
+
 if __name__ == '__main__':
     unittest.main()